@@ -0,0 +1,200 @@
+#!/usr/bin/python
+"""
+Replays a recorded salt event stream through MultiJob and compares the
+throughput of the old polling dispatch loop against the event driven
+dispatcher.
+
+The stream is either generated (10k returns by default) or loaded from a
+file containing one JSON object per line with the keys 'tag' and 'data', as
+captured from the master event bus with full=True.
+
+Example:
+    python benchmarks/bench_dispatch.py --jobs 100 --minions 100
+
+"""
+
+import argparse
+import json
+import time
+from cloud_workloads.remote.job import MultiJob, SaltJob
+
+
+class ReplayEvent(object):
+    """
+    Stands in for salt.utils.event.SaltEvent. Hands out recorded events in
+    order, skipping those that do not match the requested tag prefix the same
+    way SaltEvent.get_event does.
+
+    """
+
+    def __init__(self, events):
+        self.events = events
+        self.position = 0
+
+    def get_event(self, wait=5, tag='', full=False):
+        while self.position < len(self.events):
+            event = self.events[self.position]
+            self.position += 1
+            if event['tag'].startswith(tag):
+                return event if full else event['data']
+        return None
+
+
+class ReplayClient(object):
+    """
+    Stands in for salt.client.LocalClient. Publishes hand out the recorded
+    jids in order.
+
+    """
+
+    def __init__(self, publishes, events):
+        self.publishes = list(publishes)
+        self.event = ReplayEvent(events)
+
+    def run_job(self, **kwargs):
+        return self.publishes.pop(0)
+
+
+class LegacySaltJob(SaltJob):
+    """SaltJob with the set based completion check."""
+
+    def is_finished(self):
+        return self.minions.issubset(self.finished_minions)
+
+    def add_minion_return(self, raw):
+        if raw is not None:
+            self.events[raw['id']] = raw
+            if 'return' in raw:
+                self.finished_minions.add(raw['id'])
+                self.ret[raw['id']] = raw['return']
+
+
+class LegacyMultiJob(MultiJob):
+    """MultiJob with the polling loop that scans every job per event."""
+
+    def add(self, job):
+        pub_data = self.client.run_job(**(job.kwargs))
+        job.set_pub_data(pub_data)
+        self._jobs[job.jid] = job
+
+    def is_finished(self):
+        return all([job.is_finished() for job in self._jobs.itervalues()])
+
+    def should_process_event(self, event):
+        jid = event.get('jid')
+        ret = event.get('return')
+        if jid is None or ret is None:
+            return False
+        if jid not in self._jobs:
+            return False
+        return not self._jobs[jid].is_finished()
+
+    def wait(self, timeout):
+        timeout_at = time.time() + timeout
+        while True:
+            if time.time() > timeout_at:
+                break
+            event = self.client.event.get_event(tag='', wait=0.25)
+            if event is None:
+                continue
+            if self.should_process_event(event):
+                job = self._jobs[event.get('jid')]
+                job.add_minion_return(event)
+                if job.is_finished():
+                    self.handler.handle_finish(job)
+                    if job.chain:
+                        self.add(job.chain)
+            if self.is_finished():
+                break
+        return {jid: job.ret for jid, job in self._jobs.iteritems()}
+
+
+def generate(jobs, minions):
+    """
+    Generates publishes and a recorded event stream. Every return is fired
+    twice, once with the legacy jid tag and once with the namespaced tag, and
+    each job also fires its 'new' event, as the master does.
+
+    @param jobs - Integer number of jobs
+    @param minions - Integer number of minions per job
+    @return - Tuple of publishes and events
+
+    """
+    ids = ['minion-%05d' % i for i in xrange(minions)]
+    publishes = []
+    events = []
+    for j in xrange(jobs):
+        jid = '2014%016d' % j
+        publishes.append({'jid': jid, 'minions': ids})
+        events.append({'tag': 'salt/job/%s/new' % jid,
+                       'data': {'jid': jid, 'minions': ids}})
+    for minion_id in ids:
+        for pub in publishes:
+            data = {'jid': pub['jid'], 'id': minion_id, 'return': True,
+                    'retcode': 0, 'success': True, 'fun': 'test.ping'}
+            events.append({'tag': pub['jid'], 'data': data})
+            events.append({'tag': 'salt/job/%s/ret/%s' % (pub['jid'],
+                                                         minion_id),
+                           'data': data})
+    return publishes, events
+
+
+def load(filename):
+    """
+    Loads a recorded event stream. Publishes are rebuilt from the 'new'
+    events.
+
+    @param filename - String name of the JSON lines file
+    @return - Tuple of publishes and events
+
+    """
+    events = []
+    with open(filename) as f:
+        for line in f:
+            if line.strip():
+                events.append(json.loads(line))
+    publishes = [{'jid': e['data']['jid'], 'minions': e['data']['minions']}
+                 for e in events
+                 if e['tag'].startswith('salt/job/')
+                 and e['tag'].endswith('/new')]
+    return publishes, events
+
+
+def replay(multi_class, job_class, publishes, events):
+    """
+    Replays events through a MultiJob and returns the elapsed time.
+
+    @return - Float seconds
+
+    """
+    multi = multi_class(client=ReplayClient(publishes, events))
+    for i in xrange(len(publishes)):
+        multi.add(job_class({'fun': 'test.ping', 'arg': (), 'tgt': '*'}))
+    start = time.time()
+    multi.wait(3600)
+    return time.time() - start
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(prog='bench_dispatch')
+    parser.add_argument('--jobs', type=int, default=100)
+    parser.add_argument('--minions', type=int, default=100)
+    parser.add_argument('--events', help="Recorded event stream to replay.")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.events:
+        publishes, events = load(args.events)
+    else:
+        publishes, events = generate(args.jobs, args.minions)
+    returns = sum(len(p['minions']) for p in publishes)
+    print "Replaying %s events, %s returns" % (len(events), returns)
+
+    for name, multi_class, job_class in [
+            ('polling', LegacyMultiJob, LegacySaltJob),
+            ('dispatcher', MultiJob, SaltJob)]:
+        elapsed = replay(multi_class, job_class, publishes, events)
+        print "%-10s %8.3fs %10.0f returns/s" % (name, elapsed,
+                                                 returns / elapsed)
@@ -0,0 +1,96 @@
+#!/usr/bin/python
+"""
+Parses a synthetic simulation.log serially and with the parallel parser at
+1, 2, 4 and 8 workers, checking that every parse gives the same stats.
+Then times loading the log through its stats sidecar, first when the
+sidecar has to be written and again once it exists.
+
+Example:
+    python benchmarks/bench_parse.py --requests 2000000 --backend columnar
+
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from bench_stats import generate
+from cloud_workloads.common.gatling import cache, parallel
+from cloud_workloads.common.gatling.columnar import ColumnarStats
+from cloud_workloads.common.gatling.stats import Stats
+
+
+def summary(stats):
+    """
+    Returns what the views show of a Stats, for comparing parses.
+
+    @return - Tuple
+
+    """
+    return (stats.start_time, stats.end_time, len(stats.requests),
+            len(stats.scenarios), stats.requests_per_second_plot,
+            stats.sessions_per_second_plot, stats.response_times_plot,
+            stats.percentiles, stats.request_percentiles)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(prog='bench_parse')
+    parser.add_argument('--requests', type=int, default=2000000)
+    parser.add_argument('--users', type=int, default=500)
+    parser.add_argument('--seconds', type=int, default=900)
+    parser.add_argument('--workers', type=int, nargs='+',
+                        default=[1, 2, 4, 8])
+    parser.add_argument('--log', help="Existing simulation.log to use.")
+    parser.add_argument('--backend', choices=['objects', 'columnar'],
+                        default='columnar',
+                        help="Stats backend to parse with.")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    stats_class = ColumnarStats if args.backend == 'columnar' else Stats
+    filename = args.log
+    if filename is None:
+        fd, filename = tempfile.mkstemp(suffix='.log')
+        os.close(fd)
+        print "Generating %s requests over %ss" % (args.requests,
+                                                   args.seconds)
+        generate(filename, args.requests, args.users, args.seconds)
+
+    try:
+        print "%s bytes, %s CPUs" % (os.path.getsize(filename),
+                                     parallel.multiprocessing.cpu_count())
+        start = time.time()
+        stats = stats_class()
+        with open(filename) as f:
+            stats.update(f)
+        serial = time.time() - start
+        expected = summary(stats)
+        del stats
+        print "serial    %8.2fs" % serial
+
+        for workers in args.workers:
+            start = time.time()
+            stats = parallel.parse(filename, workers, stats_class)
+            elapsed = time.time() - start
+            same = summary(stats) == expected
+            del stats
+            print "%-2s workers %7.2fs  %5.2fx  %s" % (
+                workers, elapsed, serial / elapsed,
+                "identical" if same else "DIFFERENT")
+
+        for label in ['cold', 'warm']:
+            start = time.time()
+            stats = cache.load(filename, stats_class)
+            elapsed = time.time() - start
+            same = summary(stats) == expected
+            del stats
+            print "sidecar %s %6.2fs  %5.2fx  %s" % (
+                label, elapsed, serial / elapsed,
+                "identical" if same else "DIFFERENT")
+    finally:
+        if args.log is None:
+            os.remove(filename)
+        if os.path.exists(cache.sidecar_path(filename)):
+            os.remove(cache.sidecar_path(filename))
@@ -0,0 +1,144 @@
+#!/usr/bin/python
+"""
+Builds the gatling throughput plots from a synthetic simulation.log and
+compares the old per second scans against the single pass computations.
+
+The old scans are O(seconds x requests) and take hours on multi-million
+line logs, so by default they are only timed over a sample of seconds and
+extrapolated. Pass --full to time them over every second.
+
+Example:
+    python benchmarks/bench_stats.py --requests 2000000 --seconds 900
+
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+from cloud_workloads.common.gatling.columnar import ColumnarStats
+from cloud_workloads.common.gatling.stats import Stats
+
+
+def generate(filename, requests, users, seconds, start=1400000000000):
+    """
+    Writes a synthetic simulation.log. Users run about the whole length of
+    the simulation and requests are spread evenly across it.
+
+    @param filename - String name of the file to write
+    @param requests - Integer number of request lines
+    @param users - Integer number of scenario lines
+    @param seconds - Integer length of the simulation
+    @param start - Integer timestamp of the start of the simulation
+
+    """
+    rand = random.Random(0)
+    length = seconds * 1000
+    with open(filename, 'w') as f:
+        f.write("RUN\t%s\tsimulation\tsynthetic\n" % start)
+        for user in xrange(users):
+            begin = start + rand.randint(1, 5000)
+            end = start + length - rand.randint(0, 5000)
+            f.write("SCENARIO\tscenario\t%s\t%s\t%s\n" % (user, begin, end))
+        for i in xrange(requests):
+            request_start = start + rand.randint(0, length)
+            response_start = request_start + rand.randint(5, 1500)
+            response_end = response_start + rand.randint(0, 200)
+            status = 'OK' if rand.random() < 0.99 else 'KO'
+            f.write("REQUEST\tscenario\t%s\t\trequest_%s\t%s\t%s\t%s\t%s\t%s"
+                    "\t\n" % (i % users, i % 20, request_start,
+                              request_start, response_start, response_end,
+                              status))
+
+
+def legacy_requests_per_second(stats, times):
+    """The per second scan requests_per_second_plot used to do."""
+    points = []
+    total = 0
+    for time_ in times:
+        def finished(total, request):
+            if time_ > request.response_end:
+                total += 1
+            return total
+        new_total = reduce(finished, stats.requests, 0)
+        points.append({'x': time_, 'y': new_total - total})
+        total = new_total
+    return points
+
+
+def legacy_sessions_per_second(stats, times):
+    """The per second scan sessions_per_second_plot used to do."""
+    points = []
+    for time_ in times:
+        def active(total, session):
+            if time_ >= session.start_time and time_ <= session.end_time:
+                total += 1
+            return total
+        points.append({'x': time_, 'y': reduce(active, stats.scenarios, 0)})
+    return points
+
+
+def timed(func, *args):
+    """
+    Calls func and returns how long it took.
+
+    @return - Float seconds
+
+    """
+    start = time.time()
+    func(*args)
+    return time.time() - start
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(prog='bench_stats')
+    parser.add_argument('--requests', type=int, default=2000000)
+    parser.add_argument('--users', type=int, default=500)
+    parser.add_argument('--seconds', type=int, default=900)
+    parser.add_argument('--sample', type=int, default=5,
+                        help="Seconds the old scans are timed over.")
+    parser.add_argument('--full', action='store_true',
+                        help="Time the old scans over every second.")
+    parser.add_argument('--log', help="Existing simulation.log to use.")
+    parser.add_argument('--backend', choices=['objects', 'columnar'],
+                        default='objects',
+                        help="Stats backend to parse with.")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    filename = args.log
+    if filename is None:
+        fd, filename = tempfile.mkstemp(suffix='.log')
+        os.close(fd)
+        print "Generating %s requests over %ss" % (args.requests,
+                                                   args.seconds)
+        generate(filename, args.requests, args.users, args.seconds)
+
+    try:
+        stats = ColumnarStats() if args.backend == 'columnar' else Stats()
+        start = time.time()
+        with open(filename) as f:
+            stats.update(f)
+        print "Parsed %s requests, %s sessions in %.1fs" % (
+            len(stats.requests), len(stats.scenarios), time.time() - start)
+    finally:
+        if args.log is None:
+            os.remove(filename)
+
+    times = list(stats.times)
+    sample = times if args.full else times[:args.sample]
+    scale = float(len(times)) / max(len(sample), 1)
+    label = "measured" if args.full else "estimated"
+
+    for name, legacy, plot in [
+            ('requests', legacy_requests_per_second,
+             lambda: stats.requests_per_second_plot),
+            ('sessions', legacy_sessions_per_second,
+             lambda: stats.sessions_per_second_plot)]:
+        old = timed(legacy, stats, sample) * scale
+        new = timed(plot)
+        print "%-9s old %10.2fs (%s)  new %8.3fs  %8.0fx" % (
+            name, old, label, new, old / max(new, 1e-6))
@@ -28,6 +28,7 @@ class HtmlArchive(object):
              |--asset3.css
           |--<newestdate>
              |--index.html
+             |--results.json
              |--asset1.js
              |--asset2.js
              |--asset3.css
@@ -110,11 +111,13 @@ class HtmlArchive(object):
                 })
         return assets
 
-    def archive(self, text):
+    def archive(self, text, export=None):
         """
         Creates a timestamped directory to store text as index.html
 
         @param text - String html to write to index.html
+        @param export - Optional string JSON results to write to
+            results.json
 
         """
         # Create directory to contain the real results.
@@ -126,6 +129,9 @@ class HtmlArchive(object):
         filename = os.path.join(resultdir, 'index.html')
         with open(filename, 'w') as f:
             f.write(text)
+        if export is not None:
+            with open(os.path.join(resultdir, 'results.json'), 'w') as f:
+                f.write(export)
 
         # Copy js and css assets to resultdir
         self.copy_assets(self.assets, resultdir)
@@ -12,6 +12,15 @@ DEFAULT_RENDERER = {
     'html_doc_root': '/var/www'
 }
 
+# Default scheduling options.
+# 'sequential' runs one workload at a time. 'concurrent' runs workloads in
+# parallel whenever the pool has enough free minions for them. 'pipelined'
+# measures one workload at a time while deploying the next and undeploying
+# the previous one.
+DEFAULT_SCHEDULER = {
+    'mode': 'sequential'
+}
+
 
 class YamlConfig(dict):
     """
@@ -57,3 +66,12 @@ class YamlConfig(dict):
 
         """
         return self.get('renderer', DEFAULT_RENDERER)
+
+    def get_scheduler(self):
+        """
+        Returns the scheduler portion of the config with defaults applied.
+
+        """
+        scheduler = dict(DEFAULT_SCHEDULER)
+        scheduler.update(self.get('scheduler') or {})
+        return scheduler
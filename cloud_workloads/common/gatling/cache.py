@@ -0,0 +1,105 @@
+import cPickle
+import hashlib
+import os
+import parallel
+from stats import PARSER_VERSION, Stats
+
+# First field of the sidecar header
+MAGIC = 'cloud-workloads-stats'
+
+
+def digest(path, block_size=1 << 20):
+    """
+    Returns the sha1 of a file's contents.
+
+    :param path: String path
+    :param block_size: Integer bytes read at a time
+    :returns: String hex digest
+    """
+    sha1 = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), ''):
+            sha1.update(block)
+    return sha1.hexdigest()
+
+
+def sidecar_path(path):
+    """
+    Returns where the parsed stats of a log are cached.
+
+    :param path: String path of the simulation.log
+    :returns: String
+    """
+    return path + '.stats'
+
+
+def header(stats_class, log_digest):
+    """
+    Returns the first line of a sidecar. Stats are only reused when the
+    whole line matches.
+
+    :param stats_class: Stats class
+    :param log_digest: String digest of the log
+    :returns: String
+    """
+    return '%s\t%s\t%s\t%s\n' % (MAGIC, PARSER_VERSION, stats_class.__name__,
+                                 log_digest)
+
+
+def read(path, stats_class=Stats, log_digest=None):
+    """
+    Reads the cached stats of a log.
+
+    :param path: String path of the simulation.log
+    :param stats_class: Stats class wanted
+    :param log_digest: String digest of the log, computed if not given
+    :returns: Stats or None if there is no current sidecar
+    """
+    log_digest = log_digest or digest(path)
+    try:
+        with open(sidecar_path(path), 'rb') as f:
+            if f.readline() != header(stats_class, log_digest):
+                return None
+            return cPickle.load(f)
+    except Exception:
+        # A sidecar that cannot be read is only a cache miss
+        return None
+
+
+def write(path, stats, log_digest=None):
+    """
+    Writes the sidecar of a log. The file is replaced atomically so a
+    crash never leaves a truncated sidecar behind.
+
+    :param path: String path of the simulation.log
+    :param stats: Stats parsed from the log
+    :param log_digest: String digest of the log, computed if not given
+    """
+    log_digest = log_digest or digest(path)
+    tmp_path = '%s.tmp' % sidecar_path(path)
+    with open(tmp_path, 'wb') as f:
+        f.write(header(type(stats), log_digest))
+        cPickle.dump(stats, f, cPickle.HIGHEST_PROTOCOL)
+    os.rename(tmp_path, sidecar_path(path))
+
+
+def load(path, stats_class=Stats, workers=None):
+    """
+    Returns the stats of a simulation.log, from its sidecar when the log
+    and parser are unchanged since it was written, otherwise by parsing the
+    log and writing a new sidecar.
+
+    :param path: String path of the simulation.log
+    :param stats_class: Stats class to parse into
+    :param workers: Integer number of parser processes. See parallel.parse.
+    :returns: Stats
+    """
+    log_digest = digest(path)
+    stats = read(path, stats_class, log_digest)
+    if stats is None:
+        stats = parallel.parse(path, workers, stats_class)
+        try:
+            write(path, stats, log_digest)
+        except (IOError, OSError) as e:
+            print "Unable to cache stats of %s: %s" % (path, e)
+    return stats
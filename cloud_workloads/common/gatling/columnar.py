@@ -0,0 +1,431 @@
+from array import array
+from stats import LatencyStats, RunAction, Stats, active_per_interval, \
+    finished_per_interval
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Millisecond timestamps need 64 bits. Doubles hold them exactly where a C
+# long is only 32 bits.
+TIMESTAMP_TYPECODE = 'l' if array('l').itemsize >= 8 else 'd'
+
+
+class Names(object):
+    """
+    Interns strings into small integer ids.
+    """
+
+    def __init__(self):
+        self.ids = {}
+        self.names = []
+
+    def intern(self, name):
+        """
+        Returns the id of a name, assigning a new one the first time a name
+        is seen.
+
+        :param name: String
+        :returns: Integer id
+        """
+        id_ = self.ids.get(name)
+        if id_ is None:
+            id_ = self.ids[name] = len(self.names)
+            self.names.append(name)
+        return id_
+
+
+class Columns(object):
+    """
+    Typed columns of equal length. Rows are appended one value per column.
+    """
+
+    def __init__(self, typecodes):
+        """
+        :param typecodes: Dictionary of array typecodes keyed by column name
+        """
+        self.names = sorted(typecodes)
+        for name, typecode in typecodes.iteritems():
+            setattr(self, name, array(typecode))
+
+    def __len__(self):
+        return len(getattr(self, self.names[0]))
+
+    def extend(self, other, mapped=None):
+        """
+        Appends the rows of other columns with the same names.
+
+        :param other: Columns
+        :param mapped: Dictionary of lists keyed by column name. Values of
+            those columns are replaced by list[value].
+        """
+        mapped = mapped or {}
+        for name in self.names:
+            values = getattr(other, name)
+            ids = mapped.get(name)
+            # Nothing to replace when every value maps to itself
+            if ids is not None and ids != range(len(ids)):
+                if numpy is not None and len(values):
+                    values = numpy.array(ids, dtype=values.typecode)[
+                        other.column(name)]
+                    values = array(values.dtype.char, values.tostring())
+                else:
+                    values = array(values.typecode, (ids[v] for v in values))
+            getattr(self, name).extend(values)
+
+    def __getstate__(self):
+        # Arrays pickle element by element in python 2, raw bytes are far
+        # cheaper to send between processes
+        return dict((name, (getattr(self, name).typecode,
+                            getattr(self, name).tostring()))
+                    for name in self.names)
+
+    def __setstate__(self, state):
+        self.names = sorted(state)
+        for name, (typecode, data) in state.iteritems():
+            values = array(typecode)
+            values.fromstring(data)
+            setattr(self, name, values)
+
+    def column(self, name):
+        """
+        Returns a column as a numpy array when numpy is installed, otherwise
+        as the underlying array. The numpy array shares the memory.
+
+        :param name: String column name
+        :returns: numpy.ndarray or array.array
+        """
+        values = getattr(self, name)
+        if numpy is not None and len(values):
+            return numpy.frombuffer(values, dtype=values.typecode)
+        return values
+
+
+class Rows(object):
+    """
+    Read only sequence of row views over columns. Rows are only built when
+    they are accessed.
+    """
+
+    def __init__(self, columns, row_class, stats):
+        self.columns = columns
+        self.row_class = row_class
+        self.stats = stats
+
+    def __len__(self):
+        return len(self.columns)
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return self.row_class(self.stats, i)
+
+    def __iter__(self):
+        for i in xrange(len(self)):
+            yield self.row_class(self.stats, i)
+
+
+class RequestRow(object):
+    """
+    View of one request in ColumnarStats. Has the same properties as
+    RequestAction.
+    """
+
+    __slots__ = ('_stats', '_i')
+
+    action = 'REQUEST'
+
+    def __init__(self, stats, i):
+        self._stats = stats
+        self._i = i
+
+    @property
+    def scenario_name(self):
+        return self._stats.names.names[self._stats._requests.scenario[self._i]]
+
+    @property
+    def user_id(self):
+        return self._stats._requests.user_id[self._i]
+
+    @property
+    def request_name(self):
+        return self._stats.names.names[self._stats._requests.name[self._i]]
+
+    @property
+    def request_start(self):
+        return int(self._stats._requests.request_start[self._i])
+
+    @property
+    def request_end(self):
+        return int(self._stats._requests.request_end[self._i])
+
+    @property
+    def response_start(self):
+        return int(self._stats._requests.response_start[self._i])
+
+    @property
+    def response_end(self):
+        return int(self._stats._requests.response_end[self._i])
+
+    @property
+    def response_time(self):
+        return self.response_start - self.request_start
+
+    @property
+    def status(self):
+        return self._stats.names.names[self._stats._requests.status[self._i]]
+
+    @property
+    def success(self):
+        return self.status == 'OK'
+
+    @property
+    def info(self):
+        return self._stats._info.get(self._i, '')
+
+
+class ScenarioRow(object):
+    """
+    View of one scenario in ColumnarStats. Has the same properties as
+    ScenarioAction.
+    """
+
+    __slots__ = ('_stats', '_i')
+
+    action = 'SCENARIO'
+
+    def __init__(self, stats, i):
+        self._stats = stats
+        self._i = i
+
+    @property
+    def name(self):
+        return self._stats.names.names[self._stats._scenarios.name[self._i]]
+
+    @property
+    def user_id(self):
+        return self._stats._scenarios.user_id[self._i]
+
+    @property
+    def start_time(self):
+        return int(self._stats._scenarios.start_time[self._i])
+
+    @property
+    def end_time(self):
+        return int(self._stats._scenarios.end_time[self._i])
+
+
+class ColumnarStats(Stats):
+    """
+    Stats backend that keeps the simulation.log in typed columns instead of
+    one list of strings per line. Request, scenario and status names are
+    interned. Timestamps are converted once while parsing.
+
+    The requests and scenarios properties hand out row views with the same
+    properties as RequestAction and ScenarioAction. Plots are computed
+    straight from the columns, vectorized with numpy when it is installed.
+    """
+
+    def __init__(self):
+        self.names = Names()
+        self._requests = Columns({
+            'scenario': 'i',
+            'user_id': 'l',
+            'name': 'i',
+            'request_start': TIMESTAMP_TYPECODE,
+            'request_end': TIMESTAMP_TYPECODE,
+            'response_start': TIMESTAMP_TYPECODE,
+            'response_end': TIMESTAMP_TYPECODE,
+            'status': 'i'
+        })
+        self._scenarios = Columns({
+            'name': 'i',
+            'user_id': 'l',
+            'start_time': TIMESTAMP_TYPECODE,
+            'end_time': TIMESTAMP_TYPECODE
+        })
+        # Extra info is rare, keep it keyed by request row
+        self._info = {}
+        self._runs = []
+        # Id of the interned 'OK' status
+        self._ok = self.names.intern('OK')
+        self.latency = LatencyStats()
+        self.start_time = None
+        self.end_time = None
+
+    @property
+    def scenarios(self):
+        """
+        Returns all scenarios
+
+        :return: Sequence of ScenarioRow
+        """
+        return Rows(self._scenarios, ScenarioRow, self)
+
+    @property
+    def requests(self):
+        """
+        Returns all requests
+
+        :return: Sequence of RequestRow
+        """
+        return Rows(self._requests, RequestRow, self)
+
+    @property
+    def runs(self):
+        """
+        Returns all runs
+
+        :return: List
+        """
+        return self._runs
+
+    @property
+    def requests_per_second_plot(self):
+        """
+        Counts the number of requests that have completed from
+        second to second and records them into a plot for graphing.
+
+        :return: List of datapoints
+        """
+        times = self.times
+        ends = self._requests.column('response_end')
+        if numpy is not None and len(self._requests):
+            buckets = (ends - self.start_time) // 1000 + 1
+            buckets[ends < self.start_time] = 0
+            buckets = buckets[buckets < len(times)].astype(numpy.int64)
+            counts = numpy.bincount(buckets, minlength=len(times)).tolist()
+        else:
+            counts = finished_per_interval(ends, self.start_time, len(times))
+        return [{'x': time, 'y': count} for time, count in zip(times, counts)]
+
+    @property
+    def sessions_per_second_plot(self):
+        """
+        Counts the number of active sessions at each 1000 ms interval and
+        records them into a plot for graphing.
+
+        :return: List of datapoints
+        """
+        times = self.times
+        counts = active_per_interval(
+            zip(self._scenarios.start_time, self._scenarios.end_time),
+            self.start_time,
+            len(times))
+        return [{'x': time, 'y': count} for time, count in zip(times, counts)]
+
+    @property
+    def response_times_plot(self):
+        """
+        Creates a distribution of response times grouping them into
+        4 main groups.
+
+        :return: Dictionary
+        """
+        if numpy is None or not len(self._requests):
+            return super(ColumnarStats, self).response_times_plot
+
+        ok = self._requests.column('status') == self._ok
+        times = (self._requests.column('response_start') -
+                 self._requests.column('request_start'))[ok]
+        fast = int((times <= 800).sum())
+        slow = int((times > 1200).sum())
+        return {
+            't <= 800ms': fast,
+            '800ms < t <= 1200ms': len(times) - fast - slow,
+            't > 1200ms': slow,
+            'failed': int(len(ok) - ok.sum())
+        }
+
+    def add_request(self, line):
+        """
+        Appends a split REQUEST line to the columns.
+
+        :param line: List of strings
+        """
+        requests = self._requests
+        intern = self.names.intern
+        request_start = int(line[5])
+        response_start = int(line[7])
+        response_end = int(line[8])
+        status = intern(line[9])
+        requests.scenario.append(intern(line[1]))
+        requests.user_id.append(int(line[2]))
+        requests.name.append(intern(line[4]))
+        requests.request_start.append(request_start)
+        requests.request_end.append(int(line[6]))
+        requests.response_start.append(response_start)
+        requests.response_end.append(response_end)
+        requests.status.append(status)
+        if status == self._ok:
+            self.latency.record(line[4], response_end,
+                                response_start - request_start)
+        else:
+            self.latency.record_error(response_end)
+        if len(line) > 10 and line[10]:
+            self._info[len(requests) - 1] = line[10]
+
+    def add_scenario(self, line):
+        """
+        Appends a split SCENARIO line to the columns.
+
+        :param line: List of strings
+        """
+        scenarios = self._scenarios
+        start_time = int(line[3])
+        end_time = int(line[4])
+        scenarios.name.append(self.names.intern(line[1]))
+        scenarios.user_id.append(int(line[2]))
+        scenarios.start_time.append(start_time)
+        scenarios.end_time.append(end_time)
+        self.add_scenario_times(start_time, end_time)
+
+    def __getstate__(self):
+        # Columns already pickle compactly
+        return self.__dict__
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+
+    def merge(self, other):
+        """
+        Adds the rows of another ColumnarStats to this one, e.g. the
+        simulation.log of another injector that ran at the same time.
+
+        :param other: ColumnarStats
+        :returns: self
+        """
+        ids = [self.names.intern(name) for name in other.names.names]
+        offset = len(self._requests)
+        self._requests.extend(other._requests, {'scenario': ids,
+                                                'name': ids,
+                                                'status': ids})
+        self._scenarios.extend(other._scenarios, {'name': ids})
+        for i, info in other._info.iteritems():
+            self._info[offset + i] = info
+        self._runs.extend(other._runs)
+        self.latency.merge(other.latency)
+        self.merge_times(other)
+        return self
+
+    def update(self, simulation_log_io):
+        """
+        Parses simulation.log lines. May be called repeatedly with
+        consecutive parts of a log that is still being written.
+
+        :param simulation_log_io: Iterable of lines
+        """
+        add = {
+            'REQUEST': self.add_request,
+            'SCENARIO': self.add_scenario,
+            'RUN': lambda line: self._runs.append(RunAction(line))
+        }
+        for line in simulation_log_io:
+            line = line.strip("\n").split("\t")
+            func = add.get(line[0])
+            if func is not None:
+                func(line)
+
@@ -0,0 +1,265 @@
+import os
+import pipes
+import re
+import uuid
+from cloud_workloads.common.histogram import Histogram
+from cloud_workloads.remote.transfer import read_range
+from stats import LatencyStats
+
+# Return codes of gatling.sh when the java process was killed
+KILLED_RETCODES = set([137, 143])
+
+# Abort rules are off unless configured
+DEFAULT_ABORT = {
+    # Seconds of the most recent traffic the rules look at
+    'window': 10,
+    # Seconds after the first request before any rule applies
+    'grace': 20,
+    # Fewest requests in the window for the error rate to count
+    'min_requests': 50,
+    # Abort when more than this fraction of requests in the window failed
+    'error_rate': None,
+    # Abort when the p95 response time in the window exceeds this many ms
+    'p95_ceiling': None,
+    # Abort when throughput in the window drops below this fraction of the
+    # best window seen so far
+    'throughput_collapse': None
+}
+
+# Offset reported by ntpdate -q, in seconds
+NTPDATE_OFFSET = re.compile(r'offset (-?[0-9.]+)')
+
+
+def split_users(users, count):
+    """
+    Splits users as evenly as possible across injectors. The first
+    injectors take one more user when they do not divide evenly.
+
+    :param users: Integer users to split
+    :param count: Integer number of injectors
+    :returns: List of integers
+    """
+    base, extra = divmod(users, count)
+    return [base + 1 if i < extra else base for i in xrange(count)]
+
+
+def parse_ntpdate_offset(output):
+    """
+    Returns the clock offset from the output of ntpdate -q.
+
+    :param output: String stdout of ntpdate -q
+    :returns: Float milliseconds or None if no offset was reported
+    """
+    match = NTPDATE_OFFSET.search(output or '')
+    if match is None:
+        return None
+    return float(match.group(1)) * 1000
+
+
+class LogTail(object):
+    """
+    Follows a simulation.log that gatling is still writing on a minion.
+    The log is the newest one created under the results directory after
+    start() is called. Every poll fetches up to chunk_size bytes written
+    since the last poll, gzipped in transit, and feeds the complete lines
+    into a Stats object.
+    """
+
+    def __init__(self, client, minion, results_dir, timeout=60,
+                 chunk_size=16 << 20, copy_to=None):
+        """
+        :param client: cloud_workloads.remote.client.Client
+        :param minion: Minion gatling runs on
+        :param results_dir: String gatling results directory on the minion
+        :param timeout: Integer seconds to wait for each remote command
+        :param chunk_size: Integer most bytes of the log read per poll
+        :param copy_to: Optional local path to keep a copy of the log at
+        """
+        self.client = client
+        self.minion = minion
+        self.results_dir = results_dir
+        self.timeout = timeout
+        self.chunk_size = chunk_size
+        self.copy_to = copy_to
+        self.copy = None
+        self.marker = '/tmp/cloud-workloads-%s.marker' % uuid.uuid4()
+        self.path = None
+        self.offset = 0
+        self.remainder = ''
+
+    def run(self, command, retcodes=None):
+        """
+        Runs a shell command on the minion.
+
+        :param command: String command
+        :param retcodes: Set of acceptable return codes
+        :returns: String stdout
+        """
+        resp = self.client.cmd(self.minion.id_,
+                               'cmd.run_all',
+                               arg=(command,),
+                               retcodes=retcodes,
+                               timeout=self.timeout)
+        return resp.values()[0].get('stdout') or ''
+
+    def start(self):
+        """
+        Marks the time before gatling starts so that older logs are never
+        picked up.
+        """
+        self.run('touch %s' % pipes.quote(self.marker))
+
+    def find(self):
+        """
+        Looks for the newest simulation.log written after start().
+
+        :returns: String path or None
+        """
+        path = self.run(
+            "find %s -name simulation.log -newer %s -printf '%%T@ %%p\\n' "
+            "| sort -n | tail -1 | cut -d' ' -f2-" % (
+                pipes.quote(self.results_dir), pipes.quote(self.marker)))
+        return path.strip() or None
+
+    def open_copy(self):
+        """
+        Opens the local copy of the log. Keeping a copy is best effort, so
+        the copy is given up on with a warning when it cannot be created.
+
+        :returns: File or None
+        """
+        try:
+            directory = os.path.dirname(self.copy_to)
+            if not os.path.isdir(directory):
+                os.makedirs(directory)
+            return open(self.copy_to, 'wb')
+        except (IOError, OSError) as e:
+            print "Unable to keep a copy of %s: %s" % (self.path, e)
+            self.copy_to = None
+            return None
+
+    def poll(self, stats):
+        """
+        Feeds lines written since the last poll into stats.
+
+        :param stats: Stats
+        :returns: Integer number of bytes read
+        """
+        if self.path is None:
+            self.path = self.find()
+            if self.path is None:
+                return 0
+
+        data = read_range(self.client, self.minion, self.path, self.offset,
+                          self.chunk_size, self.timeout)
+        self.offset += len(data)
+        if self.copy is None and self.copy_to is not None and data:
+            self.copy = self.open_copy()
+        if self.copy is not None:
+            self.copy.write(data)
+
+        lines = (self.remainder + data).split('\n')
+        self.remainder = lines.pop()
+        stats.update(lines)
+        return len(data)
+
+    def finish(self, stats):
+        """
+        Reads whatever is left of the log, including a last line without a
+        newline, and removes the marker.
+
+        :param stats: Stats
+        """
+        while self.poll(stats) == self.chunk_size:
+            pass
+        if self.remainder:
+            stats.update([self.remainder])
+            self.remainder = ''
+        if self.copy is not None:
+            self.copy.close()
+        self.run('rm -f %s' % pipes.quote(self.marker))
+
+
+class AbortRules(object):
+    """
+    Decides whether an iteration is doomed from the traffic seen so far.
+    Rules look at the most recent complete seconds of responses, from the
+    end of the grace period until the configured duration has passed, so
+    the natural ramp down at the end never triggers them.
+    """
+
+    def __init__(self, config, duration):
+        """
+        :param config: Dictionary of abort settings. See DEFAULT_ABORT.
+        :param duration: Integer seconds the iteration injects users for
+        """
+        self.config = dict(DEFAULT_ABORT)
+        self.config.update(config or {})
+        self.duration = duration
+        self.peak = 0.0
+
+    @property
+    def enabled(self):
+        """
+        Whether any rule is configured.
+
+        :returns: Boolean
+        """
+        return any(self.config[key] is not None for key in
+                   ['error_rate', 'p95_ceiling', 'throughput_collapse'])
+
+    def check(self, stats):
+        """
+        Checks the rules against the responses parsed so far.
+
+        :param stats: Stats being filled while gatling runs, or a list of
+            them when several injectors run at once
+        :returns: String reason to abort or None
+        """
+        if isinstance(stats, list):
+            latency = LatencyStats()
+            for injector_stats in stats:
+                latency.merge(injector_stats.latency)
+        else:
+            latency = stats.latency
+        seconds = set(latency.by_second).union(latency.errors_by_second)
+        if not self.enabled or not seconds:
+            return None
+
+        first = min(seconds)
+        # The newest second is probably still filling up
+        last = max(seconds) - 1000
+        elapsed = (last - first) / 1000
+        if elapsed < self.config['grace'] or elapsed > self.duration:
+            return None
+
+        window = self.config['window']
+        histogram = Histogram()
+        errors = 0
+        for second in xrange(last - (window - 1) * 1000, last + 1, 1000):
+            if second in latency.by_second:
+                histogram.merge(latency.by_second[second])
+            errors += latency.errors_by_second.get(second, 0)
+        total = histogram.count + errors
+
+        error_rate = self.config['error_rate']
+        if error_rate is not None and total >= self.config['min_requests']:
+            rate = float(errors) / total
+            if rate > error_rate:
+                return "error rate %.1f%% over the last %ss" % (rate * 100,
+                                                               window)
+
+        p95_ceiling = self.config['p95_ceiling']
+        if p95_ceiling is not None and histogram.count:
+            p95 = histogram.value_at_percentile(95)
+            if p95 > p95_ceiling:
+                return "p95 response time %sms over the last %ss" % (p95,
+                                                                     window)
+
+        collapse = self.config['throughput_collapse']
+        throughput = float(histogram.count) / window
+        self.peak = max(self.peak, throughput)
+        if collapse is not None and throughput < collapse * self.peak:
+            return "throughput fell to %.1f/s from a peak of %.1f/s" % (
+                throughput, self.peak)
+        return None
@@ -0,0 +1,106 @@
+import mmap
+import multiprocessing
+import threading
+from stats import Stats
+
+
+def split(path, parts):
+    """
+    Splits a file into byte ranges that start and end on line boundaries.
+
+    :param path: String path of the file
+    :param parts: Integer number of ranges wanted
+    :returns: List of (start, end) tuples covering the file in order. May be
+        fewer than parts for small files.
+    """
+    with open(path, 'rb') as f:
+        f.seek(0, 2)
+        size = f.tell()
+        if size == 0:
+            return []
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            bounds = [0]
+            for i in xrange(1, parts):
+                newline = mm.find('\n', max(size * i // parts, bounds[-1]))
+                if newline < 0:
+                    break
+                if newline + 1 > bounds[-1]:
+                    bounds.append(newline + 1)
+            if bounds[-1] < size:
+                bounds.append(size)
+        finally:
+            mm.close()
+    return zip(bounds[:-1], bounds[1:])
+
+
+def parse_range(args):
+    """
+    Parses one byte range of a simulation.log into a partial Stats. Runs in
+    a worker process.
+
+    :param args: Tuple of (path, start, end, stats class)
+    :returns: Stats
+    """
+    path, start, end, stats_class = args
+    stats = stats_class()
+    with open(path, 'rb') as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            mm.seek(start)
+
+            def lines():
+                while mm.tell() < end:
+                    yield mm.readline()
+            stats.update(lines())
+        finally:
+            mm.close()
+    return stats
+
+
+def parse(path, workers=None, stats_class=Stats, parts=None):
+    """
+    Parses a simulation.log with a pool of worker processes. The log is
+    memory mapped and split into line aligned ranges, each range is parsed
+    into a partial Stats and the partials are merged in file order, so the
+    result is the same as parsing the log serially.
+
+    Partial Stats are pickled back from the workers. ColumnarStats pickles
+    far faster than Stats and is the better choice for large logs.
+
+    Forking while other threads run can leave the workers stuck on locks
+    those threads held, so the log is parsed in this process whenever
+    another thread is alive, e.g. under the concurrent or pipelined
+    schedulers. The cloud-workloads-stats --workers option is the
+    intended way in.
+
+    :param path: String path of the simulation.log
+    :param workers: Integer number of processes. Defaults to the number of
+        CPUs. 1 parses in this process, as does any number while other
+        threads are alive.
+    :param stats_class: Stats class to parse into
+    :param parts: Integer number of ranges. Defaults to workers.
+    :returns: Stats
+    """
+    workers = workers or multiprocessing.cpu_count()
+    ranges = split(path, parts or workers)
+    tasks = [(path, start, end, stats_class) for start, end in ranges]
+    if workers == 1 or len(tasks) < 2 or threading.active_count() > 1:
+        partials = [parse_range(task) for task in tasks]
+        pool = None
+    else:
+        pool = multiprocessing.Pool(min(workers, len(tasks)))
+        partials = pool.imap(parse_range, tasks)
+
+    try:
+        stats = None
+        for partial in partials:
+            if stats is None:
+                stats = partial
+            else:
+                stats.merge(partial)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    return stats if stats is not None else stats_class()
@@ -80,6 +80,8 @@ class GatlingResult(dict):
 
         :returns: Boolean
         """
+        if self.get('aborted'):
+            return False
         return self[SUCCESS_PERCENTAGE_OK_KEY] and \
             self[MEAN_RESPONSE_TIME_OK_KEY]
 
@@ -155,6 +157,7 @@ class GatlingResult(dict):
             (self.users, self.duration),
             "Webheads: %s" % self.webheads,
             "Successful: %s" % self.success,
+            "Aborted: %s" % (self.get('aborted') or 'No'),
             "Successful request percentage pass: %s" %
             self[SUCCESS_PERCENTAGE_OK_KEY],
             "Mean response time pass: %s" % self[MEAN_RESPONSE_TIME_OK_KEY],
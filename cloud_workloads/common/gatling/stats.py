@@ -1,4 +1,61 @@
-from operator import attrgetter
+from cloud_workloads.common.histogram import Histogram
+from cloud_workloads.common.steady import steady_window
+
+# Bump whenever parsing or the Stats layout changes so that cached stats
+# from an older parser are not reused.
+PARSER_VERSION = 2
+
+
+def finished_per_interval(ends, start, intervals, step=1000):
+    """
+    Counts timestamps per interval in a single pass. Interval i covers
+    [start + step * (i - 1), start + step * i). The first interval counts
+    everything before start.
+
+    :param ends: Iterable of integer timestamps
+    :param start: Integer timestamp of the first interval boundary
+    :param intervals: Integer number of intervals
+    :param step: Integer width of an interval
+    :returns: List of counts
+    """
+    counts = [0] * intervals
+    for end in ends:
+        if end < start:
+            i = 0
+        else:
+            i = (end - start) // step + 1
+        if i < intervals:
+            counts[i] += 1
+    return counts
+
+
+def active_per_interval(spans, start, intervals, step=1000):
+    """
+    Counts the spans active at each interval boundary start + step * i in a
+    single sweep. Spans are inclusive of both ends. Each span adds +1 where
+    it starts and -1 after it ends, and a running sum gives the counts.
+
+    :param spans: Iterable of (start, end) integer timestamp tuples
+    :param start: Integer timestamp of the first boundary
+    :param intervals: Integer number of boundaries
+    :param step: Integer distance between boundaries
+    :returns: List of counts
+    """
+    deltas = [0] * (intervals + 1)
+    for span_start, span_end in spans:
+        # First boundary at or after the span start
+        first = max(-((start - span_start) // step), 0)
+        # Last boundary at or before the span end
+        last = min((span_end - start) // step, intervals - 1)
+        if first <= last:
+            deltas[first] += 1
+            deltas[last + 1] -= 1
+    counts = []
+    active = 0
+    for delta in deltas[:intervals]:
+        active += delta
+        counts.append(active)
+    return counts
 
 
 class Action(list):
@@ -202,6 +259,120 @@ class ScenarioAction(Action):
         return int(self[4])
 
 
+class LatencyStats(object):
+    """
+    Response time histograms of successful requests overall, per request
+    name and per one second window of response end times.
+    """
+
+    def __init__(self):
+        self.overall = Histogram()
+        self.by_request = {}
+        self.by_second = {}
+        # Failed requests per one second window
+        self.errors_by_second = {}
+
+    def record(self, request_name, response_end, response_time):
+        """
+        Records the response time of a successful request.
+
+        :param request_name: String name of the request
+        :param response_end: Integer response end timestamp in ms
+        :param response_time: Integer response time in ms
+        """
+        self.overall.record(response_time)
+        histogram = self.by_request.get(request_name)
+        if histogram is None:
+            histogram = self.by_request[request_name] = Histogram()
+        histogram.record(response_time)
+        second = response_end // 1000 * 1000
+        histogram = self.by_second.get(second)
+        if histogram is None:
+            histogram = self.by_second[second] = Histogram()
+        histogram.record(response_time)
+
+    def record_error(self, response_end):
+        """
+        Counts a failed request.
+
+        :param response_end: Integer response end timestamp in ms
+        """
+        second = response_end // 1000 * 1000
+        self.errors_by_second[second] = \
+            self.errors_by_second.get(second, 0) + 1
+
+    def merge(self, other):
+        """
+        Adds the histograms of another LatencyStats to this one. Useful for
+        combining iterations or load generators.
+
+        :param other: LatencyStats
+        :returns: self
+        """
+        for second, count in other.errors_by_second.iteritems():
+            self.errors_by_second[second] = \
+                self.errors_by_second.get(second, 0) + count
+        self.overall.merge(other.overall)
+        for mine, theirs in [(self.by_request, other.by_request),
+                             (self.by_second, other.by_second)]:
+            for key, histogram in theirs.iteritems():
+                if key not in mine:
+                    mine[key] = Histogram(histogram.precision)
+                mine[key].merge(histogram)
+        return self
+
+    def window(self, start, end):
+        """
+        Combines the seconds from start up to end.
+
+        :param start: Integer timestamp in ms
+        :param end: Integer timestamp in ms, exclusive
+        :returns: Tuple of (Histogram of successful response times, integer
+            failed requests)
+        """
+        histogram = Histogram()
+        for second, second_histogram in self.by_second.iteritems():
+            if start <= second < end:
+                histogram.merge(second_histogram)
+        errors = sum(count for second, count in
+                     self.errors_by_second.iteritems()
+                     if start <= second < end)
+        return histogram, errors
+
+    @property
+    def percentiles(self):
+        """
+        Returns percentiles of all successful requests.
+
+        :returns: OrderedDict keyed by 'p50', ..., 'max'
+        """
+        return self.overall.percentiles()
+
+    @property
+    def request_percentiles(self):
+        """
+        Returns percentiles per request name, sorted by name.
+
+        :returns: List of (name, OrderedDict) tuples
+        """
+        return [(name, self.by_request[name].percentiles())
+                for name in sorted(self.by_request)]
+
+    def percentiles_plot(self, keys=('p50', 'p95', 'p99')):
+        """
+        Returns percentiles per second for graphing.
+
+        :param keys: Percentile keys to plot
+        :returns: Dictionary of lists of datapoints keyed by percentile key
+        """
+        plot = dict((key, []) for key in keys)
+        for second in sorted(self.by_second):
+            percentiles = self.by_second[second].percentiles()
+            for key in keys:
+                plot[key].append({'x': second, 'y': percentiles[key]})
+        return plot
+
+
 class Stats(dict):
     """
     Models and groups all of the actions inside of a simulation.log file
@@ -267,17 +438,12 @@ class Stats(dict):
 
         :return: List of datapoints
         """
-        points = []
-        total = 0
-        for time in self.times:
-            def finished(total, request):
-                if time > request.response_end:
-                    total += 1
-                return total
-            new_total = reduce(finished, self.requests, 0)
-            points.append({'x': time, 'y': new_total - total})
-            total = new_total
-        return points
+        times = self.times
+        counts = finished_per_interval(
+            (r.response_end for r in self.requests),
+            self.start_time,
+            len(times))
+        return [{'x': time, 'y': count} for time, count in zip(times, counts)]
 
     @property
     def sessions_per_second_plot(self):
@@ -287,14 +453,12 @@ class Stats(dict):
 
         :return: List of datapoints
         """
-        points = []
-        for time in self.times:
-            def active(total, session):
-                if time >= session.start_time and time <= session.end_time:
-                    total += 1
-                return total
-            points.append({'x': time, 'y': reduce(active, self.scenarios, 0)})
-        return points
+        times = self.times
+        counts = active_per_interval(
+            ((s.start_time, s.end_time) for s in self.scenarios),
+            self.start_time,
+            len(times))
+        return [{'x': time, 'y': count} for time, count in zip(times, counts)]
 
     @property
     def response_times_plot(self):
@@ -323,19 +487,146 @@ class Stats(dict):
                 response_times['t > 1200ms'] += 1
         return response_times
 
+    @property
+    def percentiles(self):
+        """
+        Returns response time percentiles of successful requests.
+
+        :return: OrderedDict keyed by 'p50', ..., 'max'
+        """
+        return self.latency.percentiles
+
+    @property
+    def request_percentiles(self):
+        """
+        Returns response time percentiles per request name.
+
+        :return: List of (name, OrderedDict) tuples
+        """
+        return self.latency.request_percentiles
+
+    @property
+    def percentiles_per_second_plot(self):
+        """
+        Returns p50, p95 and p99 response times per second for graphing.
+
+        :return: Dictionary of lists of datapoints
+        """
+        return self.latency.percentiles_plot()
+
+    def steady(self, config=None):
+        """
+        Finds the steady state window of the requests per second plot and
+        returns the headline metrics over that window only, leaving out
+        warm up and ramp up and down.
+
+        :param config: Dictionary of steady state settings. See
+            cloud_workloads.common.steady.DEFAULT_STEADY.
+        :return: Dictionary or None when no steady window was found
+        """
+        plot = self.requests_per_second_plot
+        window = steady_window(plot, config)
+        if window is None:
+            return None
+        start, end = window
+        # Each plot point counts the requests that finished in the second
+        # before it. Latency is kept per whole second, so the window snaps
+        # to those.
+        histogram, errors = self.latency.window(start - 1000, end - 1000)
+        seconds = (end - start) / 1000.0
+        mean = histogram.mean
+        return {
+            'start': start,
+            'end': end,
+            'seconds': seconds,
+            'throughput': round((histogram.count + errors) / seconds, 1),
+            'errors': errors,
+            'mean_response_time':
+            int(round(mean)) if mean is not None else None,
+            'percentiles': histogram.percentiles()
+        }
+
     def update(self, simulation_log_io):
+        """
+        Parses simulation.log lines. May be called repeatedly with
+        consecutive parts of a log that is still being written.
 
+        :param simulation_log_io: Iterable of lines
+        """
         for line in simulation_log_io:
             line = line.strip("\n").split("\t")
             if line[0] in self._actions:
-                self._actions[line[0]].append(
-                    self._action_classes[line[0]](line))
-
-        self.end_time = max(self.scenarios,
-                            key=attrgetter("end_time")).end_time
-
-        self.start_time = min(self.scenarios,
-                              key=attrgetter("start_time")).end_time
+                action = self._action_classes[line[0]](line)
+                self._actions[line[0]].append(action)
+                if line[0] == 'REQUEST':
+                    if action.success:
+                        self.latency.record(action.request_name,
+                                            action.response_end,
+                                            action.response_time)
+                    else:
+                        self.latency.record_error(action.response_end)
+                elif line[0] == 'SCENARIO':
+                    self.add_scenario_times(action.start_time,
+                                            action.end_time)
+
+    def merge(self, other):
+        """
+        Adds the actions of another Stats to this one, e.g. the
+        simulation.log of another injector that ran at the same time.
+
+        :param other: Stats
+        :returns: self
+        """
+        for key, actions in other._actions.iteritems():
+            self._actions[key].extend(actions)
+        self.latency.merge(other.latency)
+        self.merge_times(other)
+        return self
+
+    def merge_times(self, other):
+        """
+        Takes start_time and end_time from another Stats where they widen
+        this one's.
+
+        :param other: Stats
+        """
+        if other.end_time is not None and (self.end_time is None or
+                                           other.end_time > self.end_time):
+            self.end_time = other.end_time
+        if other.start_time is not None and (
+                self.start_time is None or
+                other.start_time < self.start_time):
+            self.start_time = other.start_time
+
+    def add_scenario_times(self, start_time, end_time):
+        """
+        Keeps start_time and end_time current as scenarios are parsed.
+        They are the start of the earliest and the end of the latest
+        scenario.
+
+        :param start_time: Integer scenario start timestamp
+        :param end_time: Integer scenario end timestamp
+        """
+        if self.end_time is None or end_time > self.end_time:
+            self.end_time = end_time
+        if self.start_time is None or start_time < self.start_time:
+            self.start_time = start_time
+
+    def __getstate__(self):
+        # Actions pickle one string per kind, far smaller and faster to load
+        # than pickling every action
+        state = dict(self.__dict__)
+        state['_actions'] = dict(
+            (key, '\n'.join('\t'.join(action) for action in actions))
+            for key, actions in self._actions.iteritems())
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._actions = dict(
+            (key, [self._action_classes[key](line.split('\t'))
+                   for line in lines.split('\n')] if lines else [])
+            for key, lines in state['_actions'].iteritems())
 
     def __init__(self):
         """
@@ -349,3 +640,6 @@ class Stats(dict):
             'REQUEST': [],
             'SCENARIO': []
         }
+        self.latency = LatencyStats()
+        self.start_time = None
+        self.end_time = None
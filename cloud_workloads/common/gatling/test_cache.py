@@ -0,0 +1,70 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import cache
+import parallel
+from columnar import ColumnarStats
+from stats import Stats
+from test_stats import simulation_log
+
+
+class TestCache(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'simulation.log')
+        self.write(simulation_log(1000, 20))
+        self.parses = 0
+        self.parse = parallel.parse
+
+        def counting_parse(*args, **kwargs):
+            self.parses += 1
+            return self.parse(*args, **kwargs)
+        parallel.parse = counting_parse
+
+    def tearDown(self):
+        parallel.parse = self.parse
+        shutil.rmtree(self.dir)
+
+    def write(self, lines):
+        with open(self.path, 'w') as f:
+            f.writelines(lines)
+
+    def test_reuse(self):
+        for stats_class in [Stats, ColumnarStats]:
+            first = cache.load(self.path, stats_class, workers=1)
+            second = cache.load(self.path, stats_class, workers=1)
+            self.assertTrue(isinstance(second, stats_class))
+            self.assertEquals(second.percentiles, first.percentiles)
+            self.assertEquals(second.requests_per_second_plot,
+                              first.requests_per_second_plot)
+        # Once per stats class
+        self.assertEquals(self.parses, 2)
+
+    def test_log_changed(self):
+        cache.load(self.path, workers=1)
+        self.write(simulation_log(500, 20))
+        stats = cache.load(self.path, workers=1)
+        self.assertEquals(self.parses, 2)
+        self.assertEquals(len(stats.requests), 500)
+
+    def test_version_changed(self):
+        cache.load(self.path, workers=1)
+        version = cache.PARSER_VERSION
+        cache.PARSER_VERSION = version + 1
+        try:
+            cache.load(self.path, workers=1)
+        finally:
+            cache.PARSER_VERSION = version
+        self.assertEquals(self.parses, 2)
+
+    def test_corrupt_sidecar(self):
+        cache.load(self.path, workers=1)
+        with open(cache.sidecar_path(self.path), 'r+b') as f:
+            f.seek(200)
+            f.truncate()
+        self.assertEquals(len(cache.load(self.path, workers=1).requests),
+                          1000)
+        self.assertEquals(self.parses, 2)
@@ -0,0 +1,80 @@
+import unittest
+
+from live import AbortRules, parse_ntpdate_offset, split_users
+from stats import Stats
+
+
+def traffic(seconds, ok, failed, response_time, start=1400000000000):
+    """Builds REQUEST lines with a steady rate per second."""
+    lines = []
+    for second in xrange(seconds):
+        for i in xrange(ok(second) + failed(second)):
+            end = start + second * 1000 + i % 1000
+            status = 'OK' if i < ok(second) else 'KO'
+            lines.append("REQUEST\tscenario\t1\t\trequest\t%s\t%s\t%s\t%s\t%s"
+                         "\t" % (end - response_time, end - response_time,
+                                 end, end, status))
+    return lines
+
+
+class TestAbortRules(unittest.TestCase):
+
+    def check(self, config, lines, duration=60):
+        stats = Stats()
+        stats.update(lines)
+        return AbortRules(config, duration).check(stats)
+
+    def test_disabled(self):
+        lines = traffic(40, lambda s: 10, lambda s: 10, 100)
+        self.assertEquals(self.check({}, lines), None)
+
+    def test_error_rate(self):
+        lines = traffic(40, lambda s: 10, lambda s: 10, 100)
+        self.assertTrue(self.check({'error_rate': 0.4}, lines))
+        self.assertEquals(self.check({'error_rate': 0.6}, lines), None)
+        # Still in the grace period
+        lines = traffic(15, lambda s: 10, lambda s: 10, 100)
+        self.assertEquals(self.check({'error_rate': 0.4}, lines), None)
+
+    def test_p95_ceiling(self):
+        lines = traffic(40, lambda s: 10, lambda s: 0, 3000)
+        self.assertTrue(self.check({'p95_ceiling': 2000}, lines))
+        self.assertEquals(self.check({'p95_ceiling': 4000}, lines), None)
+
+    def test_throughput_collapse(self):
+        stats = Stats()
+        rules = AbortRules({'throughput_collapse': 0.5}, 120)
+        stats.update(traffic(40, lambda s: 20, lambda s: 0, 100))
+        self.assertEquals(rules.check(stats), None)
+        stats.update(traffic(30, lambda s: 5, lambda s: 0, 100,
+                             start=1400000040000))
+        self.assertTrue(rules.check(stats))
+        # Ramp down after the duration is over is expected
+        rules = AbortRules({'throughput_collapse': 0.5}, 50)
+        rules.check(stats)
+        self.assertEquals(rules.check(stats), None)
+
+    def test_injectors(self):
+        # Half of the traffic from each of two injectors
+        stats = [Stats(), Stats()]
+        stats[0].update(traffic(40, lambda s: 10, lambda s: 0, 100))
+        stats[1].update(traffic(40, lambda s: 0, lambda s: 10, 100))
+        rules = AbortRules({'error_rate': 0.4}, 60)
+        self.assertTrue(rules.check(stats))
+        self.assertEquals(rules.check(stats[:1]), None)
+
+
+class TestInjectors(unittest.TestCase):
+
+    def test_split_users(self):
+        self.assertEquals(split_users(10, 3), [4, 3, 3])
+        self.assertEquals(split_users(2, 3), [1, 1, 0])
+        self.assertEquals(sum(split_users(500, 7)), 500)
+
+    def test_parse_ntpdate_offset(self):
+        output = ("server 10.0.0.5, stratum 3, offset -0.012345, "
+                  "delay 0.02573\n"
+                  "18 Oct 12:00:00 ntpdate[1234]: adjust time server "
+                  "10.0.0.5 offset -0.012345 sec\n")
+        self.assertAlmostEquals(parse_ntpdate_offset(output), -12.345)
+        self.assertEquals(parse_ntpdate_offset("no server suitable"), None)
@@ -0,0 +1,80 @@
+import multiprocessing
+import os
+import tempfile
+import threading
+import unittest
+
+import parallel
+from columnar import ColumnarStats
+from stats import Stats
+from test_stats import simulation_log
+
+
+class TestParallel(unittest.TestCase):
+
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp()
+        os.write(fd, ''.join(simulation_log(3000, 60)))
+        os.close(fd)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def serial(self, stats_class):
+        stats = stats_class()
+        with open(self.path) as f:
+            stats.update(f)
+        return stats
+
+    def assertSame(self, stats, expected):
+        for name in ['start_time', 'end_time', 'requests_per_second_plot',
+                     'sessions_per_second_plot', 'response_times_plot',
+                     'percentiles', 'request_percentiles',
+                     'percentiles_per_second_plot']:
+            self.assertEquals(getattr(stats, name), getattr(expected, name))
+        self.assertEquals([r.request_name for r in stats.requests],
+                          [r.request_name for r in expected.requests])
+        self.assertEquals(len(stats.scenarios), len(expected.scenarios))
+        self.assertEquals(len(stats.runs), len(expected.runs))
+
+    def test_split(self):
+        size = os.path.getsize(self.path)
+        ranges = parallel.split(self.path, 7)
+        self.assertEquals(len(ranges), 7)
+        self.assertEquals(ranges[0][0], 0)
+        self.assertEquals(ranges[-1][1], size)
+        with open(self.path) as f:
+            data = f.read()
+        for start, end in ranges:
+            self.assertTrue(start == 0 or data[start - 1] == '\n')
+            self.assertEquals(data[end - 1], '\n')
+
+    def test_stats(self):
+        expected = self.serial(Stats)
+        for workers in [1, 3]:
+            self.assertSame(parallel.parse(self.path, workers), expected)
+
+    def test_columnar(self):
+        expected = self.serial(ColumnarStats)
+        self.assertSame(parallel.parse(self.path, 2, ColumnarStats,
+                                       parts=5), expected)
+
+    def test_empty(self):
+        open(self.path, 'w').close()
+        self.assertEquals(parallel.split(self.path, 4), [])
+        self.assertEquals(len(parallel.parse(self.path, 4).requests), 0)
+
+    def test_threads(self):
+        # Never forks while another thread is alive
+        expected = self.serial(Stats)
+        pool = multiprocessing.Pool
+        multiprocessing.Pool = None
+        results = []
+        try:
+            thread = threading.Thread(
+                target=lambda: results.append(parallel.parse(self.path, 3)))
+            thread.start()
+            thread.join()
+        finally:
+            multiprocessing.Pool = pool
+        self.assertSame(results[0], expected)
@@ -0,0 +1,171 @@
+import random
+import unittest
+
+import columnar
+from columnar import ColumnarStats
+from stats import Stats, active_per_interval, finished_per_interval
+
+
+def simulation_log(requests, users, start=1400000000000, length=30000):
+    """Generates simulation.log lines with random timings."""
+    rand = random.Random(42)
+    lines = ["RUN\t%s\tsimulation\tdescription\n" % start]
+    for user in xrange(users):
+        begin = start + rand.randint(0, length // 2)
+        end = begin + rand.randint(0, length // 2)
+        lines.append("SCENARIO\tscenario\t%s\t%s\t%s\n" % (user, begin, end))
+    for i in xrange(requests):
+        request_start = start + rand.randint(-2000, length)
+        response_start = request_start + rand.randint(0, 2000)
+        response_end = response_start + rand.randint(0, 500)
+        status = 'OK' if rand.random() < 0.95 else 'KO'
+        lines.append("REQUEST\tscenario\t%s\t\trequest_%s\t%s\t%s\t%s\t%s"
+                     "\t%s\t\n" % (i % users, i % 5, request_start,
+                                   request_start, response_start,
+                                   response_end, status))
+    return lines
+
+
+class TestStats(unittest.TestCase):
+
+    def setUp(self):
+        self.stats = Stats()
+        self.stats.update(simulation_log(2000, 50))
+
+    def test_requests_per_second_plot(self):
+        # Brute force over every second, as the plot used to be computed
+        expected = []
+        total = 0
+        for time in self.stats.times:
+            new_total = len([r for r in self.stats.requests
+                             if time > r.response_end])
+            expected.append({'x': time, 'y': new_total - total})
+            total = new_total
+        self.assertEquals(self.stats.requests_per_second_plot, expected)
+
+    def test_sessions_per_second_plot(self):
+        expected = []
+        for time in self.stats.times:
+            active = len([s for s in self.stats.scenarios
+                          if s.start_time <= time <= s.end_time])
+            expected.append({'x': time, 'y': active})
+        self.assertEquals(self.stats.sessions_per_second_plot, expected)
+
+    def test_percentiles(self):
+        times = [r.response_time for r in self.stats.requests if r.success]
+        self.assertEquals(self.stats.latency.overall.count, len(times))
+        self.assertEquals(self.stats.percentiles['max'], max(times))
+        names = [name for name, p in self.stats.request_percentiles]
+        self.assertEquals(names, ['request_%s' % i for i in xrange(5)])
+        plot = self.stats.percentiles_per_second_plot
+        self.assertEquals(sorted(plot), ['p50', 'p95', 'p99'])
+        self.assertEquals(len(plot['p99']), len(self.stats.latency.by_second))
+
+    def test_steady(self):
+        steady = self.stats.steady({'window': 5, 'max_cv': 1})
+        # Requests finishing within the window, brute force over the whole
+        # seconds latency is kept in
+        inside = [r for r in self.stats.requests
+                  if steady['start'] - 1000 <= r.response_end // 1000 * 1000
+                  < steady['end'] - 1000]
+        times = [r.response_time for r in inside if r.success]
+        self.assertEquals(steady['errors'], len(inside) - len(times))
+        self.assertEquals(steady['percentiles']['max'], max(times))
+        self.assertEquals(steady['throughput'],
+                          round(len(inside) / steady['seconds'], 1))
+        self.assertTrue(steady['seconds'] >= 5)
+        self.assertEquals(self.stats.steady({'max_cv': 0}), None)
+
+    def test_start_time(self):
+        # The run starts when the first scenario starts, not when the first
+        # one ends
+        lines = ["SCENARIO\tscenario\t0\t1400000002000\t1400000009000\n",
+                 "SCENARIO\tscenario\t1\t1400000001000\t1400000005000\n"]
+        for stats in Stats(), ColumnarStats():
+            stats.update(lines)
+            self.assertEquals(stats.start_time, 1400000001000)
+            self.assertEquals(stats.end_time, 1400000009000)
+            self.assertEquals(stats.duration, 8000)
+            self.assertEquals(stats.times[0], 1400000001000)
+        self.assertEquals(self.stats.start_time,
+                          min(s.start_time for s in self.stats.scenarios))
+
+    def test_interval_edges(self):
+        self.assertEquals(finished_per_interval([5, 10, 1009, 1010, 3010],
+                                                10, 3), [1, 2, 1])
+        self.assertEquals(active_per_interval([(0, 10), (11, 1010),
+                                               (1011, 1500)], 10, 3),
+                          [1, 1, 0])
+
+
+class TestColumnarStats(unittest.TestCase):
+
+    def setUp(self):
+        lines = simulation_log(2000, 50)
+        self.stats = Stats()
+        self.stats.update(lines)
+        self.columnar = ColumnarStats()
+        self.columnar.update(lines)
+
+    def assertSameStats(self):
+        for name in ['start_time', 'end_time', 'duration',
+                     'requests_per_second_plot', 'sessions_per_second_plot',
+                     'response_times_plot', 'percentiles',
+                     'request_percentiles', 'percentiles_per_second_plot']:
+            self.assertEquals(getattr(self.columnar, name),
+                              getattr(self.stats, name))
+
+    def test_same_as_stats(self):
+        self.assertSameStats()
+
+    def test_same_as_stats_without_numpy(self):
+        numpy = columnar.numpy
+        columnar.numpy = None
+        try:
+            self.assertSameStats()
+        finally:
+            columnar.numpy = numpy
+
+    def test_rows(self):
+        self.assertEquals(len(self.columnar.requests),
+                          len(self.stats.requests))
+        for row, action in zip(self.columnar.requests, self.stats.requests):
+            for name in ['scenario_name', 'user_id', 'request_name',
+                         'response_time', 'response_end', 'status',
+                         'success', 'info']:
+                self.assertEquals(getattr(row, name), getattr(action, name))
+        scenario = self.columnar.scenarios[-1]
+        self.assertEquals(scenario.end_time, self.stats.scenarios[-1].end_time)
+        self.assertEquals(scenario.name, self.stats.scenarios[-1].name)
+
+
+class TestMerge(unittest.TestCase):
+
+    def split(self, cls):
+        # Odd and even lines stand in for the logs of two injectors
+        lines = simulation_log(2000, 50)
+        whole = cls()
+        whole.update(lines)
+        first = cls()
+        first.update(lines[0::2])
+        second = cls()
+        second.update(lines[1::2])
+        return whole, first.merge(second)
+
+    def assertMerged(self, cls):
+        whole, merged = self.split(cls)
+        for name in ['start_time', 'end_time', 'requests_per_second_plot',
+                     'sessions_per_second_plot', 'response_times_plot',
+                     'percentiles', 'request_percentiles',
+                     'percentiles_per_second_plot']:
+            self.assertEquals(getattr(merged, name), getattr(whole, name))
+        self.assertEquals(len(merged.requests), len(whole.requests))
+
+    def test_stats(self):
+        self.assertMerged(Stats)
+
+    def test_columnar(self):
+        self.assertMerged(ColumnarStats)
+        whole, merged = self.split(ColumnarStats)
+        self.assertEquals(sorted(r.request_name for r in merged.requests),
+                          sorted(r.request_name for r in whole.requests))
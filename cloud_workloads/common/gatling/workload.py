@@ -1,10 +1,40 @@
 import cStringIO
 import os
+import time
+from cloud_workloads.common.search import BracketSearch, LinearSearch
+from cloud_workloads.common.steady import window_markers
 from cloud_workloads.common.workload import Workload as BaseWorkload
-from cloud_workloads.remote.job import MASTER_OPTIONS
-from result import GatlingStdoutParser, GatlingResult
+from cloud_workloads.remote.futures import FutureTimeoutException, gather
+from cache import write as write_sidecar
+from columnar import ColumnarStats
+from live import AbortRules, KILLED_RETCODES, LogTail, \
+    parse_ntpdate_offset, split_users
+from result import GatlingStdoutParser, GatlingResult, \
+    MEAN_RESPONSE_TIME_KEY, MEAN_RESPONSE_TIME_OK_KEY, \
+    SUCCESS_PERCENTAGE_OK_KEY
 from stats import Stats
 
+# Stats classes by the stats_backend config value
+STATS_BACKENDS = {
+    'objects': Stats,
+    'columnar': ColumnarStats
+}
+
+# Search settings used unless overridden by the 'search' config value
+DEFAULT_SEARCH = {
+    # linear steps up by users_step until an iteration fails. bracket
+    # doubles the users until one fails, then bisects.
+    'strategy': 'linear',
+    'factor': 2,
+    # Bisection stops once the boundary is known to within this many users
+    # per webhead. Defaults to users_step.
+    'resolution': None,
+    # Times each bisection point is run. The majority outcome counts.
+    'repeats': 1,
+    # Most users per webhead to try
+    'max_users': None
+}
+
 
 class Workload(BaseWorkload):
     """
@@ -24,6 +54,7 @@ class Workload(BaseWorkload):
         super(Workload, self).__init__(client, pool, config)
         self._results = []
         self.webheads = None
+        self.search = None
 
     @property
     def name(self):
@@ -70,6 +101,40 @@ class Workload(BaseWorkload):
         """
         return int(self.config['duration'])
 
+    def new_search(self):
+        """
+        Returns a search over users per webhead configured by the 'search'
+        config value. See DEFAULT_SEARCH.
+
+        :returns: cloud_workloads.common.search.Search
+
+        """
+        config = dict(DEFAULT_SEARCH)
+        config.update(self.config.get('search') or {})
+        if config['strategy'] == 'linear':
+            return LinearSearch(self.users_start, self.users_step)
+        if config['strategy'] != 'bracket':
+            raise ValueError("Unknown search strategy %s" % config['strategy'])
+        resolution = config['resolution'] or self.users_step
+        limit = config['max_users']
+        return BracketSearch(self.users_start,
+                             factor=float(config['factor']),
+                             resolution=int(resolution),
+                             repeats=int(config['repeats']),
+                             limit=int(limit) if limit is not None else None)
+
+    def new_stats(self):
+        """
+        Returns an empty Stats object of the class named by the
+        'stats_backend' config value. 'columnar' keeps simulation.log
+        records in typed columns and is far lighter on long runs.
+
+        :returns: Stats
+
+        """
+        backend = self.config.get('stats_backend', 'objects')
+        return STATS_BACKENDS[backend]()
+
     def get_webheads(self):
         """
         Returns the list of webheads.
@@ -86,25 +151,134 @@ class Workload(BaseWorkload):
 
         return self.webheads
 
+    @staticmethod
+    def succeeded(result):
+        """
+        Returns whether an iteration passed.
+
+        :param result: GatlingResult
+        :returns: Boolean
+
+        """
+        return result['retcode'] in [0, 2] and result.success
+
     @property
     def best_run(self):
         """
-        Returns the second to last iteration if there are more than one.
-        The testing stops when an iteration fails.
+        Returns the successful iteration with the most users. When points
+        were repeated, iterations above the point the search settled on are
+        left out.
 
-        Returns the only iteration if only one.  The only iteration fails.
+        Returns the last iteration if none succeeded.
 
         Returns None otherwise (test probably hasn't been run yet.
 
         :returns: [GatlingIteration | None]
 
         """
-        if len(self._results) > 1:
-            return self._results[-2]
+        successes = [r for r in self._results if self.succeeded(r)]
+        if self.search is not None and self.search.best is not None:
+            successes = [r for r in successes
+                         if r['users'] <= self.search.best]
+        if successes:
+            return max(reversed(successes), key=lambda r: r['users'])
         elif len(self._results) > 0:
             return self._results[-1]
         return None
 
+    @property
+    def search_path(self):
+        """
+        Returns every iteration in the order it was run for the view.
+
+        :returns: List of dictionaries
+
+        """
+        path = []
+        for result in self._results:
+            path.append({
+                'users': result.users,
+                'success': self.succeeded(result),
+                'aborted': result.get('aborted'),
+                'mean_response_time': result.mean_response_time,
+                'p95': result['stats'].percentiles['p95']
+            })
+        return path
+
+    def latency_data(self, stats):
+        """
+        Returns response time percentiles of a run for the view.
+
+        :param stats: Stats of the run
+        :returns: Dictionary
+
+        """
+        return {
+            'percentiles': stats.percentiles,
+            'request_percentiles': stats.request_percentiles,
+            'percentiles_per_second_plot': stats.percentiles_per_second_plot
+        }
+
+    def steady_data(self, run):
+        """
+        Returns the headline metrics of a run over its steady state window
+        for the view, along with lines marking the window on the plots.
+        Headline metrics cover the whole run when no steady window is
+        found. Steady state detection is configured by the 'steady' config
+        value.
+
+        :param run: GatlingResult
+        :returns: Dictionary
+
+        """
+        stats = run['stats']
+        steady = stats.steady(self.config.get('steady'))
+        if steady is None:
+            return {'steady': None}
+        window = (steady['start'], steady['end'])
+        percentiles_plot = stats.percentiles_per_second_plot
+        return {
+            'steady': steady,
+            'mean_response_time': steady['mean_response_time'],
+            'percentiles': steady['percentiles'],
+            'steady_markers':
+            window_markers(window, stats.requests_per_second_plot),
+            'steady_percentile_markers':
+            window_markers(window, percentiles_plot.get('p99', []))
+        }
+
+    def injector_data(self, run):
+        """
+        Returns a breakdown of a run by injector for the view. Start times
+        are relative to the injector that started first.
+
+        :param run: GatlingResult
+        :returns: List of dictionaries
+
+        """
+        injectors = run.get('injectors') or []
+        starts = [injector['stats'].runs[0].start for injector in injectors
+                  if injector['stats'].runs]
+        data = []
+        for injector in injectors:
+            stats = injector['stats']
+            mean = stats.latency.overall.mean
+            started = None
+            if stats.runs:
+                started = stats.runs[0].start - min(starts)
+            data.append({
+                'minion': injector['minion'],
+                'users': injector['users'] * len(run.webheads),
+                'requests': len(stats.requests),
+                'errors': sum(stats.latency.errors_by_second.itervalues()),
+                'mean_response_time':
+                int(round(mean)) if mean is not None else None,
+                'p95': stats.percentiles['p95'],
+                'offset': injector['offset'],
+                'started': started
+            })
+        return data
+
     def command(self, simulation):
         """
         Assembles the command that would be run via command line.
@@ -135,105 +309,229 @@ class Workload(BaseWorkload):
                          (users, duration, webheads)
         }
 
-    def log_file_path(self, minion_id, log_file_name):
+    def results_dir(self):
+        """
+        Returns the gatling results directory on the runner.
+
+        :returns: String
+
+        """
+        return '/opt/%s/results' % self.config['gatling_dir']
+
+    def log_copy_path(self, runner, users):
+        """
+        Returns where to keep a local copy of a runner's simulation.log,
+        under the 'log_dir' config value. Each copy gets a sidecar of its
+        parsed stats so cloud-workloads-stats can report on it later
+        without parsing it again.
+
+        :param runner: Minion running gatling
+        :param users: Integer users per webhead of the iteration
+        :returns: String path or None when logs are not kept
+        """
+        log_dir = self.config.get('log_dir')
+        if not log_dir:
+            return None
+        name = '%s-%s-%s-%s' % (self.name.lower(),
+                                time.strftime('%Y-%m-%d--%H-%M-%S'),
+                                users,
+                                runner.id_)
+        return os.path.join(log_dir, name, 'simulation.log')
+
+    def kill(self, runner):
+        """
+        Stops gatling on a runner by killing the gatling user's java
+        processes.
+
+        :param runner: Minion running gatling
+
+        """
+        command = 'pkill -u %s -f java' % self.config['gatling_user']
+        self.client.cmd(runner.id_,
+                        'cmd.run_all',
+                        arg=(command,),
+                        retcodes=set([0, 1]),
+                        timeout=60)
+
+    def clock_offsets(self, runners):
+        """
+        Measures how far each runner's clock is from the first runner's by
+        querying the first runner's ntpd with ntpdate -q.
+
+        :param runners: List of minions running gatling
+        :returns: Dictionary of float milliseconds, or None where the offset
+            could not be measured, keyed by minion id
+
         """
-        Simulation log files are moved to master using salt.cp.push.
-        Returns the full path to that file which is:
-        <cachedir>/minions/<minion_id>/files/<log_file_name>
+        offsets = {runners[0].id_: 0.0}
+        if len(runners) < 2:
+            return offsets
+        ip = self.client.get_ips([runners[0]]).values()[0][0]
+        resp = self.client.cmd(runners[1:],
+                               'cmd.run_all',
+                               arg=('ntpdate -q %s' % ip,),
+                               retcodes=set([0, 1]),
+                               timeout=60)
+        for runner in runners[1:]:
+            stdout = resp.get(runner.id_, {}).get('stdout')
+            offsets[runner.id_] = parse_ntpdate_offset(stdout)
+        return offsets
+
+    def check_clock_skew(self, offsets):
+        """
+        Prints a warning when injector clocks disagree by more than the
+        'max_clock_skew' config value in milliseconds. Timestamps from
+        different injectors are only comparable when their clocks agree.
+
+        :param offsets: Dictionary of clock offsets keyed by minion id
+        :returns: String warning or None
 
-        @param minion_id - String name of the minion
-        @param log_file_name - String name of file that was moved over
-        @return - String name of file on master
+        """
+        limit = float(self.config.get('max_clock_skew', 100))
+        unknown = sorted(id_ for id_, offset in offsets.iteritems()
+                         if offset is None)
+        known = [abs(offset) for offset in offsets.itervalues()
+                 if offset is not None]
+        warning = None
+        if unknown:
+            warning = "Could not measure the clock offset of %s" % \
+                ', '.join(unknown)
+        elif known and max(known) > limit:
+            warning = "Injector clocks differ by up to %.1fms" % max(known)
+        if warning is not None:
+            print "%s: %s. Merged results may be misaligned." % (self.name,
+                                                                 warning)
+        return warning
+
+    def run_iteration(self, runners, cmd, users, timeout, offsets=None):
+        """
+        Runs one gatling iteration with users split across the runners.
+        The runners wait for a common start time and each one's
+        simulation.log is tailed into its own Stats object while gatling
+        runs. Gatling is killed early everywhere if one of the configured
+        abort rules trips for the combined traffic. The logs are merged
+        into one Stats at the end.
+
+        :param runners: List of minions to run gatling on
+        :param cmd: String gatling command
+        :param users: Integer users per webhead, split across runners
+        :param timeout: Integer seconds to wait for gatling
+        :param offsets: Dictionary of clock offsets keyed by minion id
+        :returns: GatlingResult
 
         """
-        return os.path.join(
-            MASTER_OPTIONS.get('cachedir', '/var/cache/salt/master'),
-            'minions',
-            minion_id,
-            'files',
-            log_file_name.lstrip(os.path.sep)
-        )
+        offsets = offsets or {}
+        injectors = [(runner, count) for runner, count in
+                     zip(runners, split_users(users, len(runners))) if count]
+        if len(injectors) > 1:
+            cmd = ("while [ $(date +%%s) -lt %s ]; do sleep 0.1; done; %s"
+                   % (self.start_at(injectors[0][0]), cmd))
+
+        rules = AbortRules(self.config.get('abort'), self.duration)
+        all_stats = []
+        tails = []
+        futures = []
+        # Gatling exits with 2 when assertions fail
+        retcodes = set([0, 2]).union(KILLED_RETCODES)
+        for runner, count in injectors:
+            all_stats.append(self.new_stats())
+            tail = LogTail(self.client, runner, self.results_dir(),
+                           copy_to=self.log_copy_path(runner, users))
+            tail.start()
+            tails.append(tail)
+            futures.append(self.client.cmd_async(
+                runner.id_,
+                'cmd.run_all',
+                retcodes=retcodes,
+                timeout=timeout,
+                arg=(cmd,),
+                kwarg={
+                    'env': self.env(users=count),
+                    'runas': self.config['gatling_user']
+                }))
+
+        future = gather(*futures)
+        aborted = None
+        interval = self.config.get('tail_interval', 5)
+        while not future.done():
+            try:
+                future.result(timeout=interval)
+            except FutureTimeoutException:
+                pass
+            for tail, stats in zip(tails, all_stats):
+                tail.poll(stats)
+            if aborted is None and not future.done():
+                aborted = rules.check(all_stats)
+                if aborted is not None:
+                    print "%s: Aborting iteration of %s users, %s" % (
+                        self.name, users, aborted)
+                    for runner, count in injectors:
+                        self.kill(runner)
+
+        # Execution responses
+        exe_resps = [resp.values()[0] for resp in future.result()]
+        for tail, stats in zip(tails, all_stats):
+            tail.finish(stats)
+            if tail.copy is not None:
+                write_sidecar(tail.copy_to, stats)
+
+        stats = all_stats[0]
+        if len(all_stats) > 1:
+            stats = self.new_stats()
+            for injector_stats in all_stats:
+                stats.merge(injector_stats)
+
+        parsed = [GatlingStdoutParser().parse(
+            cStringIO.StringIO(exe_resp.get('stdout')))
+            for exe_resp in exe_resps]
+        result = GatlingResult(users, self.duration, self.webheads)
+        result.update(parsed[0])
+        if len(parsed) > 1:
+            for key in [SUCCESS_PERCENTAGE_OK_KEY, MEAN_RESPONSE_TIME_OK_KEY]:
+                result[key] = all(p[key] for p in parsed)
+            mean = stats.latency.overall.mean
+            result[MEAN_RESPONSE_TIME_KEY] = \
+                int(round(mean)) if mean is not None else None
+
+        codes = [exe_resp.get('retcode') for exe_resp in exe_resps]
+        failed = [code for code in codes if code not in [0, 2]]
+        result.update({
+            'retcode': failed[0] if failed else max(codes),
+            'aborted': aborted,
+            'stats': stats,
+            'injectors': [{
+                'minion': runner.id_,
+                'users': count,
+                'retcode': code,
+                'offset': offsets.get(runner.id_),
+                'stats': injector_stats,
+                'log': tail.copy_to if tail.copy is not None else None
+            } for (runner, count), code, injector_stats, tail in
+                zip(injectors, codes, all_stats, tails)]
+        })
+        print result
+        return result
 
     def run(self):
         """
         Runs the Gatling workload
-        Iterates until a stopping condition has been raised.
+        Iterates over the user counts handed out by the configured search
+        until it has found the most users the webheads can take. Users are
+        split across every minion with the gatling role.
 
         """
         cmd = self.command()
-        users = self.users_start
-        step = self.users_step
-
-        stdout_parser = GatlingStdoutParser()
+        self.search = self.new_search()
 
         runners = self.minions_with_role(self.config['gatling_role'])
         timeout = max(2 * self.duration, 360)
+        offsets = self.clock_offsets(runners)
+        self.data_dict['clock_skew_warning'] = self.check_clock_skew(offsets)
 
-        while(True):
-            env = self.env(users=users)
-            kwargs = {
-                'timeout': timeout,
-                'arg': (cmd,),
-                'kwarg': {
-                    'env': env,
-                    'runas': self.config['gatling_user']
-                }
-            }
-
-            # Execution response (still have to make another request to
-            # get the simulation.log file contents)
-            retcodes = set([0, 2])
-            exe_resp = self.client.cmd(runners[0].id_,
-                                       'cmd.run_all',
-                                       retcodes=retcodes,
-                                       **kwargs)
-            exe_resp = exe_resp.values()[0]
-            retcode = exe_resp.get('retcode')
-            stdout = exe_resp.get('stdout')
-            stderr = exe_resp.get('stderr')
-            stdout = cStringIO.StringIO(stdout)
-            if stderr:
-                # Do something with stderr if not empty or non none
-                pass
-
-            result = GatlingResult(users, self.duration, self.webheads)
-            result.update({'retcode': retcode})
-            result.update(stdout_parser.parse(stdout))
-            print result
-
-            # Push the simulation log file to the master
-            kwargs = {
-                'timeout': timeout,
-                'arg': (result.simulation_log,)
-            }
-            log_resp = self.client.cmd(runners[0].id_, 'cp.push', **kwargs)
-            log_resp = log_resp.values()[0]
-
-            # Read the simulation log file
-            filename = self.log_file_path(
-                runners[0].id_,
-                result.simulation_log
-            )
-            stats = Stats()
-            with open(filename, 'r') as f:
-                stats.update(f)
-
-            # Attempt to get contents of simulation log
-            #kwargs = {
-            #    'timeout': timeout,
-            #    'arg': ('cat %s' % result.simulation_log,)
-            #}
-            #log_resp = self.client.cmd(
-            #    runners[0].id_,
-            #    'cmd.run_all',
-            #    **kwargs
-            #)
-            #log_resp = log_resp.values()[0]
-            #stdout = cStringIO.StringIO(log_resp.get('stdout'))
-            #stats = Stats()
-            #stats.update(stdout)
-            result.update({'stats': stats})
+        users = self.search.next()
+        while users is not None:
+            result = self.run_iteration(runners, cmd, users, timeout,
+                                        offsets)
             self._results.append(result)
-            if retcode not in [0, 2] or not result.success:
-                break
-            users += step
+            self.search.record(users, self.succeeded(result))
+            users = self.search.next()
@@ -0,0 +1,179 @@
+from collections import OrderedDict
+
+# Percentiles reported by default
+DEFAULT_PERCENTILES = (50, 90, 95, 99, 99.9)
+
+
+class Histogram(object):
+    """
+    Compact log-linear histogram of non-negative integers in the style of
+    HdrHistogram. Values below 2 ** (precision + 1) are counted exactly.
+    Above that, every power of two range is split into 2 ** precision equal
+    buckets, so any recorded value is reported within a relative error of
+    2 ** -precision. The default precision of 7 keeps that under 1%.
+
+    Only buckets that have been hit are stored. Histograms with the same
+    precision can be merged, e.g. across iterations or load generators.
+    """
+
+    def __init__(self, precision=7):
+        """
+        :param precision: Integer number of bits of precision per power of
+            two
+        """
+        self.precision = precision
+        self.sub_buckets = 1 << precision
+        self.counts = {}
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+
+    def index(self, value):
+        """
+        Returns the bucket index of a value.
+
+        :param value: Non-negative integer
+        :returns: Integer
+        """
+        if value < 2 * self.sub_buckets:
+            return value
+        shift = value.bit_length() - self.precision - 1
+        return shift * self.sub_buckets + (value >> shift)
+
+    def highest_equivalent(self, index):
+        """
+        Returns the largest value that falls into a bucket.
+
+        :param index: Integer bucket index
+        :returns: Integer
+        """
+        if index < 2 * self.sub_buckets:
+            return index
+        shift = index // self.sub_buckets - 1
+        top = index - shift * self.sub_buckets
+        return ((top + 1) << shift) - 1
+
+    def record(self, value, count=1):
+        """
+        Records a value. Negative values are recorded as 0.
+
+        :param value: Integer
+        :param count: Integer number of times the value was seen
+        """
+        value = max(int(value), 0)
+        index = self.index(value)
+        self.counts[index] = self.counts.get(index, 0) + count
+        self.count += count
+        self.total += value * count
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def merge(self, other):
+        """
+        Adds the counts of another histogram to this one.
+
+        :param other: Histogram with the same precision
+        :returns: self
+        """
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge histograms of precision %s and %s"
+                             % (self.precision, other.precision))
+        for index, count in other.counts.iteritems():
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.count += other.count
+        self.total += other.total
+        if other.min is not None and (self.min is None or
+                                      other.min < self.min):
+            self.min = other.min
+        if other.max is not None and (self.max is None or
+                                      other.max > self.max):
+            self.max = other.max
+        return self
+
+    @property
+    def mean(self):
+        """
+        Returns the exact mean of recorded values.
+
+        :returns: Float or None if empty
+        """
+        if not self.count:
+            return None
+        return float(self.total) / self.count
+
+    def value_at_percentile(self, percentile):
+        """
+        Returns the value at or below which the given percentage of recorded
+        values fall.
+
+        :param percentile: Number between 0 and 100
+        :returns: Integer or None if empty
+        """
+        if not self.count:
+            return None
+        # Rank of the value, counting from 1
+        rank = max(int(percentile / 100.0 * self.count + 0.5), 1)
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                return min(self.highest_equivalent(index), self.max)
+        return self.max
+
+    def percentiles(self, percentiles=DEFAULT_PERCENTILES):
+        """
+        Returns several percentiles and the maximum in one pass over the
+        buckets.
+
+        :param percentiles: Iterable of numbers between 0 and 100
+        :returns: OrderedDict keyed by 'p50', 'p99.9', ... and 'max'
+        """
+        ret = OrderedDict()
+        ranks = [(p, max(int(p / 100.0 * self.count + 0.5), 1))
+                 for p in sorted(percentiles)]
+        seen = 0
+        indexes = iter(sorted(self.counts))
+        index = None
+        for percentile, rank in ranks:
+            while seen < rank and self.count:
+                index = next(indexes)
+                seen += self.counts[index]
+            key = 'p%s' % ('%g' % percentile)
+            if index is None:
+                ret[key] = None
+            else:
+                ret[key] = min(self.highest_equivalent(index), self.max)
+        ret['max'] = self.max
+        return ret
+
+    def to_dict(self):
+        """
+        Returns a JSON serializable representation.
+
+        :returns: Dictionary
+        """
+        return {'precision': self.precision,
+                'counts': sorted(self.counts.items()),
+                'count': self.count,
+                'total': self.total,
+                'min': self.min,
+                'max': self.max}
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Rebuilds a histogram from to_dict output.
+
+        :param data: Dictionary
+        :returns: Histogram
+        """
+        histogram = cls(data['precision'])
+        histogram.counts = dict((int(i), c) for i, c in data['counts'])
+        histogram.count = data['count']
+        histogram.total = data['total']
+        histogram.min = data['min']
+        histogram.max = data['max']
+        return histogram
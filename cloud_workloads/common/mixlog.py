@@ -0,0 +1,181 @@
+from collections import OrderedDict
+from histogram import Histogram
+from steady import steady_window
+
+# Transaction names by their code in mix.log. Rollbacks use the upper case
+# code.
+TRANSACTIONS = OrderedDict([
+    ('d', 'Delivery'),
+    ('n', 'New Order'),
+    ('o', 'Order Status'),
+    ('p', 'Payment'),
+    ('s', 'Stock Level')
+])
+
+# Steady state settings for dbt2. Only new order transactions count towards
+# NOTPM and there are few per second, so the series is summed over 10
+# second intervals to keep the noise down.
+DEFAULT_STEADY = {
+    'interval': 10,
+    'window': 6,
+    'max_cv': 0.2
+}
+
+
+class MixLog(object):
+    """
+    Aggregates the mix.log written by the dbt2 driver. Lines are one of
+
+        <time>,<code>,<response time in s>,<thread id>
+        <time>,START
+        <time>,TERMINATED,<thread id>
+
+    where time is in whole seconds. The driver writes START once every
+    terminal has been started.
+    """
+
+    def __init__(self):
+        self.start = None
+        self.end = None
+        # Time of the START marker
+        self.rampup_end = None
+        # Successful transactions per second, keyed by second then code
+        self.by_second = {}
+        # Response times in ms of successful transactions by code
+        self.latency = dict((code, Histogram()) for code in TRANSACTIONS)
+        self.rollbacks = dict((code, 0) for code in TRANSACTIONS)
+        self.errors = 0
+
+    def update(self, lines):
+        """
+        Parses mix.log lines.
+
+        :param lines: Iterable of lines
+        """
+        for line in lines:
+            fields = line.strip().split(',')
+            if len(fields) < 2 or not fields[0].isdigit():
+                continue
+            second = int(fields[0])
+            if self.start is None or second < self.start:
+                self.start = second
+            if self.end is None or second > self.end:
+                self.end = second
+
+            code = fields[1]
+            if code == 'START':
+                self.rampup_end = second
+            elif code in TRANSACTIONS:
+                counts = self.by_second.get(second)
+                if counts is None:
+                    counts = self.by_second[second] = {}
+                counts[code] = counts.get(code, 0) + 1
+                if len(fields) > 2:
+                    try:
+                        self.latency[code].record(
+                            int(round(float(fields[2]) * 1000)))
+                    except ValueError:
+                        pass
+            elif code.lower() in TRANSACTIONS:
+                self.rollbacks[code.lower()] += 1
+            elif code == 'E':
+                self.errors += 1
+
+    def merge(self, other):
+        """
+        Adds the transactions of another mix.log, such as one from another
+        driver run at the same time.
+
+        :param other: MixLog
+        :returns: self
+        """
+        for second, counts in other.by_second.iteritems():
+            mine = self.by_second.get(second)
+            if mine is None:
+                mine = self.by_second[second] = {}
+            for code, count in counts.iteritems():
+                mine[code] = mine.get(code, 0) + count
+        for code, count in other.rollbacks.iteritems():
+            self.rollbacks[code] += count
+        for code, histogram in other.latency.iteritems():
+            self.latency[code].merge(histogram)
+        self.errors += other.errors
+        if other.start is not None:
+            self.start = other.start if self.start is None else \
+                min(self.start, other.start)
+            self.end = max(self.end, other.end)
+        # Ramp up is over once every driver has started its terminals
+        if other.rampup_end is not None:
+            self.rampup_end = max(self.rampup_end, other.rampup_end)
+        return self
+
+    def per_second_plot(self, code='n'):
+        """
+        Returns successful transactions of one type per second, with a point
+        for every second of the run.
+
+        :param code: String transaction code
+        :returns: List of {'x': ms timestamp, 'y': count} datapoints
+        """
+        if self.start is None:
+            return []
+        return [{'x': second * 1000,
+                 'y': self.by_second.get(second, {}).get(code, 0)}
+                for second in xrange(self.start, self.end + 1)]
+
+    def transactions(self, percentiles=(90, 99)):
+        """
+        Summarizes each transaction type over the whole run.
+
+        :param percentiles: Iterable of response time percentiles to report
+        :returns: List of dictionaries in TRANSACTIONS order
+        """
+        seconds = self.end - self.start + 1 if self.start is not None else 0
+        rows = []
+        for code, name in TRANSACTIONS.iteritems():
+            histogram = self.latency[code]
+            count = sum(counts.get(code, 0)
+                        for counts in self.by_second.itervalues())
+            mean = histogram.mean
+            row = OrderedDict([
+                ('code', code),
+                ('name', name),
+                ('count', count),
+                ('rollbacks', self.rollbacks[code]),
+                ('per_minute',
+                 round(count * 60.0 / seconds, 2) if seconds else None),
+                ('mean_response_time',
+                 int(round(mean)) if mean is not None else None)
+            ])
+            row.update(histogram.percentiles(percentiles))
+            rows.append(row)
+        return rows
+
+    def steady(self, config=None):
+        """
+        Finds the steady state window of the new order throughput and
+        returns the new order transactions per minute over it. Seconds
+        before the START marker, while terminals are still being started,
+        are left out.
+
+        :param config: Dictionary of steady state settings overriding
+            DEFAULT_STEADY
+        :returns: Dictionary or None when no steady window was found
+        """
+        settings = dict(DEFAULT_STEADY)
+        settings.update(config or {})
+        plot = self.per_second_plot('n')
+        if self.rampup_end is not None:
+            plot = [p for p in plot if p['x'] >= self.rampup_end * 1000]
+        window = steady_window(plot, settings)
+        if window is None:
+            return None
+        start, end = window
+        new_orders = sum(p['y'] for p in plot if start <= p['x'] < end)
+        seconds = (end - start) / 1000.0
+        return {
+            'start': start,
+            'end': end,
+            'seconds': seconds,
+            'tpm': round(new_orders / seconds * 60, 2)
+        }
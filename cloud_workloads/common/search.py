@@ -0,0 +1,356 @@
+"""
+Strategies for searching for the largest load a system can handle, or the
+load at which it performs best.
+
+A search hands out the next load to try and is told whether that load
+succeeded, until it has narrowed down the boundary:
+
+    search = BracketSearch(30, resolution=10)
+    value = search.next()
+    while value is not None:
+        search.record(value, run(value))
+        value = search.next()
+    search.best
+
+GoldenSectionSearch is told a score, such as throughput, instead of success
+and narrows down the load with the highest score.
+
+"""
+
+
+class Search(object):
+    """
+    Base class for searches. Keeps the path of every trial.
+    """
+
+    def __init__(self):
+        # List of (value, success) tuples in the order they were tried
+        self.path = []
+
+    def next(self):
+        """
+        Returns the next value to try.
+
+        :returns: Integer or None when the search is over
+        """
+        raise NotImplementedError()
+
+    def record(self, value, success):
+        """
+        Records the outcome of trying a value.
+
+        :param value: Integer value that was tried
+        :param success: Boolean
+        """
+        self.path.append((value, success))
+
+    @property
+    def best(self):
+        """
+        Returns the largest value that succeeded.
+
+        :returns: Integer or None
+        """
+        values = [value for value, success in self.path if success]
+        return max(values) if values else None
+
+
+class LinearSearch(Search):
+    """
+    Steps up by a fixed amount until a value fails.
+    """
+
+    def __init__(self, start, step, limit=None):
+        """
+        :param start: Integer first value
+        :param step: Integer amount to step up by
+        :param limit: Optional largest value to try
+        """
+        super(LinearSearch, self).__init__()
+        self.start = start
+        self.step = step
+        self.limit = limit
+
+    def next(self):
+        if not self.path:
+            value = self.start
+        else:
+            value, success = self.path[-1]
+            if not success:
+                return None
+            value += self.step
+        if self.limit is not None and value > self.limit:
+            return None
+        return value
+
+
+class BracketSearch(Search):
+    """
+    Multiplies the value by a factor until it fails to bracket the boundary,
+    then bisects between the largest success and the smallest failure until
+    they are within the resolution of each other.
+
+    Points tried while bisecting can be repeated. A point succeeds when
+    more than half of its repeats succeed.
+    """
+
+    def __init__(self, start, factor=2, resolution=1, repeats=1,
+                 limit=None):
+        """
+        :param start: Integer first value
+        :param factor: Number to multiply by while ramping up
+        :param resolution: Integer width at which bisection stops
+        :param repeats: Integer trials per point while bisecting
+        :param limit: Optional largest value to try
+        """
+        super(BracketSearch, self).__init__()
+        self.start = start
+        self.factor = factor
+        self.resolution = max(resolution, 1)
+        self.repeats = max(repeats, 1)
+        self.limit = limit
+        # Largest success and smallest failure so far
+        self.low = None
+        self.high = None
+        # Point being repeated and its outcomes
+        self._point = None
+        self._votes = []
+
+    @property
+    def bracketed(self):
+        """
+        Whether a failure has been seen, ending the ramp up.
+
+        :returns: Boolean
+        """
+        return self.high is not None
+
+    def record(self, value, success):
+        super(BracketSearch, self).record(value, success)
+        if self.bracketed:
+            self._votes.append(success)
+            if len(self._votes) < self.repeats:
+                return
+            success = self._votes.count(True) * 2 > len(self._votes)
+            self._point = None
+            self._votes = []
+
+        if success:
+            self.low = value if self.low is None else max(self.low, value)
+        else:
+            self.high = value if self.high is None else min(self.high, value)
+
+    def next(self):
+        if self._point is not None:
+            return self._point
+
+        if not self.bracketed:
+            if self.low is None:
+                value = self.start
+            else:
+                value = max(int(self.low * self.factor), self.low + 1)
+            if self.limit is not None:
+                if self.low is not None and self.low >= self.limit:
+                    return None
+                value = min(value, self.limit)
+            return value
+
+        # The start itself failed, nothing below it is tried
+        if self.low is None:
+            return None
+        if self.high - self.low <= self.resolution:
+            return None
+        self._point = (self.low + self.high) // 2
+        return self._point
+
+    @property
+    def best(self):
+        return self.low
+
+
+class GoldenSectionSearch(Search):
+    """
+    Finds the value with the highest score, assuming the score rises to a
+    single peak and falls off after it. The value is multiplied by a factor
+    until the score drops, which brackets the peak, then the bracket is
+    narrowed by golden section search until the values either side of the
+    peak are within the resolution of it.
+
+    Scores are noisy. When a value scores within noise of the peak so far
+    the two cannot be told apart from one trial each, so both are repeated
+    until they have been tried repeats times and their mean scores are
+    compared.
+    """
+
+    # Fraction of the wider side of the bracket to step into
+    RATIO = 0.381966
+
+    def __init__(self, start, factor=2, resolution=1, noise=0, repeats=1,
+                 minimum=1, limit=None):
+        """
+        :param start: Integer first value
+        :param factor: Number to multiply by while bracketing
+        :param resolution: Integer distance from the peak at which the
+            search stops
+        :param noise: Float relative difference in score within which two
+            values are repeated before they are compared
+        :param repeats: Integer trials of values within noise of each other
+        :param minimum: Integer smallest value to try
+        :param limit: Optional largest value to try
+        """
+        super(GoldenSectionSearch, self).__init__()
+        self.start = start
+        self.factor = factor
+        self.resolution = max(resolution, 1)
+        self.noise = noise
+        self.repeats = max(repeats, 1)
+        self.limit = limit
+        # Scores by value
+        self.samples = {}
+        # The peak so far and the values bracketing it. The bounds start
+        # just outside the values that may be tried.
+        self.low = minimum - 1
+        self.peak = None
+        self.high = None
+        # Values queued to be repeated and the value waiting on them
+        self._pending = []
+        self._candidate = None
+
+    def mean(self, value):
+        """
+        Returns the mean score of a value.
+
+        :param value: Integer value that was tried
+        :returns: Float
+        """
+        scores = self.samples[value]
+        return float(sum(scores)) / len(scores)
+
+    def within_noise(self, value, other):
+        """
+        Whether two values score too close to tell apart.
+
+        :param value: Integer value that was tried
+        :param other: Integer value that was tried
+        :returns: Boolean
+        """
+        first, second = self.mean(value), self.mean(other)
+        return abs(first - second) <= self.noise * max(abs(first),
+                                                       abs(second))
+
+    @property
+    def bracketed(self):
+        """
+        Whether a score has dropped, ending the search for a bracket.
+
+        :returns: Boolean
+        """
+        return self.high is not None
+
+    def record(self, value, score):
+        """
+        Records the score of trying a value.
+
+        :param value: Integer value that was tried
+        :param score: Number, higher is better
+        """
+        super(GoldenSectionSearch, self).record(value, score)
+        self.samples.setdefault(value, []).append(score)
+        if self._pending:
+            self._pending.pop(0)
+            if self._pending:
+                return
+            value = self._candidate
+        elif self.peak is not None and value != self.peak and \
+                self.within_noise(value, self.peak):
+            self._pending = [v for v in (value, self.peak)
+                             for i in xrange(self.repeats -
+                                             len(self.samples[v]))]
+            if self._pending:
+                self._candidate = value
+                return
+        self._candidate = None
+        self._compare(value)
+
+    def _compare(self, value):
+        """
+        Moves the peak or the bracket around a value that was tried.
+
+        """
+        if self.peak is None:
+            self.peak = value
+            return
+        better = self.mean(value) > self.mean(self.peak)
+        if value > self.peak:
+            if better:
+                self.low, self.peak = self.peak, value
+            else:
+                self.high = value
+        elif better:
+            self.high, self.peak = self.peak, value
+        else:
+            self.low = value
+
+    def next(self):
+        if self._pending:
+            return self._pending[0]
+
+        if self.peak is None:
+            value = self.start
+            if self.limit is not None:
+                value = min(value, self.limit)
+            return value
+
+        if not self.bracketed:
+            if self.limit is not None and self.peak >= self.limit:
+                return None
+            value = max(int(self.peak * self.factor), self.peak + 1)
+            if self.limit is not None:
+                value = min(value, self.limit)
+            return value
+
+        below = self.peak - self.low
+        above = self.high - self.peak
+        if max(below, above) <= self.resolution:
+            return None
+        if above >= below:
+            return self.peak + min(max(int(round(above * self.RATIO)), 1),
+                                   above - 1)
+        return self.peak - min(max(int(round(below * self.RATIO)), 1),
+                               below - 1)
+
+    @property
+    def best(self):
+        return self.peak
+
+
+def knee(points):
+    """
+    Returns the knee of a rising curve, the point past which increases in
+    x buy little more y. It is the point furthest above the straight line
+    from the first point to the highest, with both axes scaled to the
+    range they cover. Points past the highest are left out.
+
+    :param points: List of (x, y) tuples sorted by x
+    :returns: Tuple from points or None when there are none
+    """
+    if not points:
+        return None
+    peak = max(xrange(len(points)), key=lambda i: points[i][1])
+    (x0, y0), (x1, y1) = points[0], points[peak]
+    if peak < 2 or x1 == x0 or y1 == y0:
+        return points[peak]
+
+    def lift(point):
+        return (float(point[1] - y0) / (y1 - y0) -
+                float(point[0] - x0) / (x1 - x0))
+    best = max(points[:peak + 1], key=lift)
+    return best if lift(best) > 0 else points[peak]
+
+
+# Search classes by strategy name
+STRATEGIES = {
+    'linear': LinearSearch,
+    'bracket': BracketSearch,
+    'golden': GoldenSectionSearch
+}
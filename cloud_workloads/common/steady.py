@@ -0,0 +1,118 @@
+"""
+Finds the steady state portion of a throughput series, leaving out warm up,
+ramp up and ramp down.
+
+A sliding window is moved along the series and every window whose
+coefficient of variation (standard deviation over mean) is at most max_cv
+counts as steady. Overlapping steady windows are joined and the longest run
+of them is the steady window. A window can straddle the last few points of a
+ramp, so points at the edges that stray from the mean of the run by more
+than max_cv are trimmed off.
+"""
+import math
+
+# Settings used unless overridden by a workload's 'steady' config value
+DEFAULT_STEADY = {
+    # Seconds per point of the throughput series
+    'interval': 1,
+    # Points per sliding window
+    'window': 10,
+    # Largest coefficient of variation of a steady window
+    'max_cv': 0.15
+}
+
+
+def steady_range(values, window=10, max_cv=0.15):
+    """
+    Returns the longest range of values covered by overlapping steady
+    windows.
+
+    :param values: List of numbers, e.g. requests per second
+    :param window: Integer points per sliding window
+    :param max_cv: Largest coefficient of variation of a steady window
+    :returns: Tuple of (first, last) indexes, last exclusive, or None when
+        no window is steady
+    """
+    if window < 2 or len(values) < window:
+        return None
+
+    best = None
+    run_start = None
+    total = float(sum(values[:window]))
+    squares = float(sum(v * v for v in values[:window]))
+    for i in xrange(len(values) - window + 1):
+        if i:
+            total += values[i + window - 1] - values[i - 1]
+            squares += values[i + window - 1] ** 2 - values[i - 1] ** 2
+        mean = total / window
+        variance = max(squares / window - mean * mean, 0.0)
+        steady = mean > 0 and math.sqrt(variance) / mean <= max_cv
+        if steady and run_start is None:
+            run_start = i
+        if run_start is not None and (not steady or
+                                      i == len(values) - window):
+            end = i + window - 1 if not steady else i + window
+            if best is None or end - run_start > best[1] - best[0]:
+                best = (run_start, end)
+            run_start = None
+    if best is None:
+        return None
+
+    first, last = best
+    mean = float(sum(values[first:last])) / (last - first)
+    while first < last and abs(values[first] - mean) > max_cv * mean:
+        first += 1
+    while last > first and abs(values[last - 1] - mean) > max_cv * mean:
+        last -= 1
+    return first, last
+
+
+def rebucket(plot, interval):
+    """
+    Sums consecutive points of a per second plot into intervals.
+
+    :param plot: List of {'x': timestamp, 'y': count} datapoints
+    :param interval: Integer points per bucket
+    :returns: List of datapoints, x being the start of each bucket
+    """
+    if interval <= 1:
+        return plot
+    return [{'x': plot[i]['x'],
+             'y': sum(p['y'] for p in plot[i:i + interval])}
+            for i in xrange(0, len(plot) - interval + 1, interval)]
+
+
+def steady_window(plot, config=None):
+    """
+    Finds the steady window of a throughput plot.
+
+    :param plot: List of {'x': timestamp, 'y': count} datapoints spaced one
+        second apart
+    :param config: Dictionary of settings. See DEFAULT_STEADY.
+    :returns: Tuple of (start, end) x values, end exclusive, or None
+    """
+    settings = dict(DEFAULT_STEADY)
+    settings.update(config or {})
+    interval = int(settings['interval'])
+    points = rebucket(plot, interval)
+    found = steady_range([p['y'] for p in points],
+                         int(settings['window']),
+                         float(settings['max_cv']))
+    if found is None:
+        return None
+    first, last = found
+    step = points[1]['x'] - points[0]['x'] if len(points) > 1 else 0
+    return points[first]['x'], points[last - 1]['x'] + step
+
+
+def window_markers(window, plot):
+    """
+    Returns two vertical lines marking the edges of a window, for drawing
+    over a plot.
+
+    :param window: Tuple of (start, end) x values
+    :param plot: List of datapoints the lines are drawn over
+    :returns: List of two lists of datapoints
+    """
+    top = max([p['y'] for p in plot if p['y'] is not None] or [0])
+    return [[{'x': x, 'y': 0}, {'x': x, 'y': top}] for x in window]
@@ -0,0 +1,59 @@
+import random
+import unittest
+
+from histogram import Histogram
+
+
+class TestHistogram(unittest.TestCase):
+
+    def exact(self, values, percentile):
+        values = sorted(values)
+        rank = max(int(percentile / 100.0 * len(values) + 0.5), 1)
+        return values[rank - 1]
+
+    def test_empty(self):
+        histogram = Histogram()
+        self.assertEquals(histogram.value_at_percentile(99), None)
+        self.assertEquals(histogram.percentiles()['p99'], None)
+        self.assertEquals(histogram.mean, None)
+
+    def test_small_values_are_exact(self):
+        histogram = Histogram(precision=3)
+        for value in xrange(16):
+            histogram.record(value)
+        self.assertEquals(histogram.value_at_percentile(50), 7)
+        self.assertEquals(histogram.percentiles()['max'], 15)
+
+    def test_relative_error(self):
+        rand = random.Random(1)
+        values = [int(rand.lognormvariate(6, 1.5)) for i in xrange(20000)]
+        histogram = Histogram()
+        for value in values:
+            histogram.record(value)
+        percentiles = histogram.percentiles()
+        for percentile in (50, 90, 95, 99, 99.9):
+            exact = self.exact(values, percentile)
+            value = percentiles['p%g' % percentile]
+            self.assertEquals(value, histogram.value_at_percentile(percentile))
+            self.assertTrue(exact <= value <= exact * (1 + 1.0 / 128),
+                            (percentile, exact, value))
+        self.assertEquals(percentiles['max'], max(values))
+        self.assertAlmostEquals(histogram.mean,
+                                float(sum(values)) / len(values))
+
+    def test_merge(self):
+        rand = random.Random(2)
+        values = [rand.randint(0, 100000) for i in xrange(5000)]
+        whole = Histogram()
+        first = Histogram()
+        second = Histogram()
+        for i, value in enumerate(values):
+            whole.record(value)
+            (first if i % 2 else second).record(value)
+        first.merge(second)
+        self.assertEquals(first.counts, whole.counts)
+        self.assertEquals(first.percentiles(), whole.percentiles())
+        self.assertEquals(Histogram.from_dict(whole.to_dict()).counts,
+                          whole.counts)
+        with self.assertRaises(ValueError):
+            first.merge(Histogram(precision=3))
@@ -0,0 +1,93 @@
+import random
+import unittest
+
+from mixlog import MixLog
+
+
+def mix_log(ramp=60, steady=300, rate=20, start=1400000000):
+    """mix.log lines ramping up to a steady rate of new orders."""
+    rand = random.Random(5)
+    lines = []
+    for second in xrange(ramp + steady):
+        if second == ramp // 2:
+            lines.append("%s,START\n" % (start + second))
+        count = rate * min(second, ramp) // ramp
+        for i in xrange(count + rand.randint(-2, 2) if count else 0):
+            lines.append("%s,n,%f,%s\n" % (start + second,
+                                           rand.random(), i % 10))
+        lines.append("%s,p,0.010000,1\n" % (start + second))
+    lines.append("%s,N,0.5,3\n" % start)
+    lines.append("%s,E,0.5,3\n" % start)
+    lines.append("%s,TERMINATED,3\n" % (start + ramp + steady))
+    return lines
+
+
+class TestMixLog(unittest.TestCase):
+
+    def setUp(self):
+        self.mix = MixLog()
+        self.mix.update(mix_log())
+
+    def test_counts(self):
+        self.assertEquals(self.mix.start, 1400000000)
+        self.assertEquals(self.mix.end, 1400000360)
+        self.assertEquals(self.mix.rampup_end, 1400000030)
+        self.assertEquals(self.mix.rollbacks['n'], 1)
+        self.assertEquals(self.mix.errors, 1)
+        plot = self.mix.per_second_plot('p')
+        self.assertEquals(len(plot), 361)
+        self.assertEquals(sum(p['y'] for p in plot), 360)
+
+    def test_transactions(self):
+        rows = dict((row['code'], row) for row in self.mix.transactions())
+        self.assertEquals(rows['p']['count'], 360)
+        self.assertEquals(rows['p']['per_minute'], round(360 * 60 / 361., 2))
+        self.assertEquals(rows['p']['mean_response_time'], 10)
+        self.assertEquals((rows['p']['p90'], rows['p']['p99']), (10, 10))
+        self.assertEquals(rows['n']['rollbacks'], 1)
+        # New order response times are uniform over one second
+        self.assertTrue(880 <= rows['n']['p90'] <= 920)
+        self.assertTrue(980 <= rows['n']['p99'] <= 1000)
+        self.assertEquals(rows['d']['count'], 0)
+        self.assertEquals(rows['d']['p90'], None)
+
+    def test_steady(self):
+        steady = self.mix.steady()
+        # Ramp up is left out
+        self.assertTrue(steady['start'] >= 1400000060 * 1000 - 10000)
+        self.assertTrue(steady['seconds'] >= 240)
+        self.assertTrue(abs(steady['tpm'] - 20 * 60) < 20)
+        # Dividing by the whole run, as dbt2 does, is well below that
+        total = sum(p['y'] for p in self.mix.per_second_plot('n'))
+        self.assertTrue(total / 6.0 < steady['tpm'] - 100)
+
+    def test_steady_after_rampup(self):
+        # Throughput is flat from the first second but terminals are still
+        # being started until START
+        mix = MixLog()
+        start = 1400000000
+        lines = ["%s,START\n" % (start + 120)]
+        for second in xrange(300):
+            lines.extend("%s,n,0.1,%s\n" % (start + second, i)
+                         for i in xrange(20))
+        mix.update(lines)
+        steady = mix.steady()
+        self.assertEquals(steady['start'], (start + 120) * 1000)
+        self.assertEquals(steady['tpm'], 20 * 60)
+
+    def test_merge(self):
+        other = MixLog()
+        other.update(mix_log(start=1400000010))
+        plot = self.mix.per_second_plot('p')
+        self.mix.merge(other)
+        self.assertEquals(self.mix.start, 1400000000)
+        self.assertEquals(self.mix.end, 1400000370)
+        self.assertEquals(self.mix.rampup_end, 1400000040)
+        self.assertEquals(self.mix.rollbacks['n'], 2)
+        self.assertEquals(self.mix.errors, 2)
+        merged = self.mix.per_second_plot('p')
+        self.assertEquals([p['y'] for p in merged[:12]],
+                          [1] * 10 + [2, 2])
+        self.assertEquals(sum(p['y'] for p in merged),
+                          2 * sum(p['y'] for p in plot))
+        self.assertEquals(self.mix.latency['p'].count, 720)
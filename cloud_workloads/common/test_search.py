@@ -0,0 +1,117 @@
+import unittest
+
+from search import BracketSearch, GoldenSectionSearch, LinearSearch, knee
+
+
+def run(search, works):
+    value = search.next()
+    while value is not None:
+        search.record(value, works(value))
+        value = search.next()
+    return search
+
+
+class TestSearch(unittest.TestCase):
+
+    def test_linear(self):
+        search = run(LinearSearch(30, 30), lambda users: users <= 100)
+        self.assertEquals(search.path, [(30, True), (60, True), (90, True),
+                                        (120, False)])
+        self.assertEquals(search.best, 90)
+
+    def test_bracket(self):
+        search = run(BracketSearch(30, resolution=10),
+                     lambda users: users <= 3000)
+        self.assertEquals([v for v, s in search.path][:8],
+                          [30, 60, 120, 240, 480, 960, 1920, 3840])
+        self.assertTrue(3000 - 10 <= search.best <= 3000)
+        self.assertTrue(len(search.path) < 20)
+
+    def test_bracket_first_fails(self):
+        search = run(BracketSearch(30), lambda users: False)
+        self.assertEquals(search.path, [(30, False)])
+        self.assertEquals(search.best, None)
+
+    def test_bracket_limit(self):
+        search = run(BracketSearch(30, limit=100), lambda users: True)
+        self.assertEquals([v for v, s in search.path], [30, 60, 100])
+        self.assertEquals(search.best, 100)
+
+    def test_bracket_repeats(self):
+        # 500 fails once out of three tries and still counts as a success
+        outcomes = {500: [True, False, True]}
+
+        def works(users):
+            if users in outcomes:
+                return outcomes[users].pop(0)
+            return users <= 700
+        search = run(BracketSearch(250, resolution=50, repeats=3), works)
+        self.assertEquals([v for v, s in search.path][:6],
+                          [250, 500, 1000, 750, 750, 750])
+        self.assertEquals(search.best, 687)
+
+    def test_linear_limit(self):
+        search = run(LinearSearch(1, 2, limit=6), lambda value: True)
+        self.assertEquals([v for v, s in search.path], [1, 3, 5])
+
+
+class TestGoldenSectionSearch(unittest.TestCase):
+
+    def test_peak(self):
+        # NOTPM rising to a peak at 37 warehouses and falling off
+        search = run(GoldenSectionSearch(1, limit=100),
+                     lambda w: 10000 - (w - 37) ** 2)
+        self.assertEquals([v for v, s in search.path][:7],
+                          [1, 2, 4, 8, 16, 32, 64])
+        self.assertEquals(search.best, 37)
+        # Far fewer runs than stepping one warehouse at a time
+        self.assertTrue(len(search.path) < 20)
+
+    def test_peak_at_start(self):
+        search = run(GoldenSectionSearch(1), lambda w: 100 - w)
+        self.assertEquals(search.path, [(1, 99), (2, 98)])
+        self.assertEquals(search.best, 1)
+
+    def test_peak_at_limit(self):
+        search = run(GoldenSectionSearch(3, limit=20), lambda w: w)
+        self.assertEquals([v for v, s in search.path], [3, 6, 12, 20])
+        self.assertEquals(search.best, 20)
+
+    def test_resolution(self):
+        search = run(GoldenSectionSearch(10, resolution=5),
+                     lambda w: -abs(w - 50))
+        self.assertTrue(abs(search.best - 50) <= 5)
+
+    def test_noise(self):
+        # 9 scores one lucky run above the true peak at 8
+        scores = {8: [1000, 1000, 1000], 9: [1010, 940, 950]}
+
+        def score(w):
+            if w in scores:
+                return scores[w].pop(0)
+            return 1000 - 50 * abs(w - 8)
+        search = run(GoldenSectionSearch(8, noise=0.05, repeats=3,
+                                         limit=9), score)
+        self.assertEquals(search.path[:6], [(8, 1000), (9, 1010), (9, 940),
+                                            (9, 950), (8, 1000), (8, 1000)])
+        self.assertEquals(search.best, 8)
+
+        # Without repeats the lucky run wins
+        scores = {8: [1000], 9: [1010]}
+        search = run(GoldenSectionSearch(8, limit=9), score)
+        self.assertEquals(search.best, 9)
+
+
+class TestKnee(unittest.TestCase):
+
+    def test_knee(self):
+        # Throughput flattening out past 40 connections, then dropping
+        points = [(10, 1000), (20, 1900), (40, 3000), (80, 3200),
+                  (160, 3300), (320, 2000)]
+        self.assertEquals(knee(points), (40, 3000))
+
+    def test_no_knee(self):
+        self.assertEquals(knee([]), None)
+        self.assertEquals(knee([(10, 5), (20, 3)]), (10, 5))
+        # Accelerating all the way, the highest point is the knee
+        self.assertEquals(knee([(1, 1), (2, 2), (3, 4), (4, 8)]), (4, 8))
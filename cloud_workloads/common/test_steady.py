@@ -0,0 +1,46 @@
+import random
+import unittest
+
+from steady import rebucket, steady_range, steady_window, window_markers
+
+
+def ramp_plot(ramp=20, steady=60, down=10, rate=100, start=1400000000000):
+    """Per second plot ramping up to a noisy steady rate and back down."""
+    rand = random.Random(3)
+    values = [rate * i // ramp for i in xrange(ramp)]
+    values += [rate + rand.randint(-5, 5) for i in xrange(steady)]
+    values += [rate * (down - i) // down for i in xrange(down)]
+    return [{'x': start + i * 1000, 'y': y} for i, y in enumerate(values)]
+
+
+class TestSteady(unittest.TestCase):
+
+    def test_steady_range(self):
+        self.assertEquals(steady_range([10] * 30, window=10), (0, 30))
+        self.assertEquals(steady_range([2 ** i for i in xrange(30)], window=10), None)
+        self.assertEquals(steady_range([10] * 5, window=10), None)
+        self.assertEquals(steady_range([0] * 30, window=10), None)
+        # Two steady stretches, the longer one wins
+        values = [10] * 12 + range(100, 300, 20) + [50] * 20
+        self.assertEquals(steady_range(values, window=5), (22, 42))
+
+    def test_steady_window(self):
+        plot = ramp_plot()
+        start, end = steady_window(plot)
+        # Most of the steady part, none of the ramps
+        self.assertTrue(plot[15]['x'] <= start <= plot[25]['x'])
+        self.assertTrue(plot[75]['x'] <= end <= plot[82]['x'])
+
+    def test_rebucket(self):
+        plot = [{'x': i, 'y': 1} for i in xrange(25)]
+        self.assertEquals(rebucket(plot, 10), [{'x': 0, 'y': 10},
+                                               {'x': 10, 'y': 10}])
+        start, end = steady_window(ramp_plot(), {'interval': 5,
+                                                 'window': 4})
+        self.assertEquals((end - start) % 5000, 0)
+
+    def test_window_markers(self):
+        markers = window_markers((10, 20), [{'x': 0, 'y': 3},
+                                            {'x': 1, 'y': None}])
+        self.assertEquals(markers, [[{'x': 10, 'y': 0}, {'x': 10, 'y': 3}],
+                                    [{'x': 20, 'y': 0}, {'x': 20, 'y': 3}]])
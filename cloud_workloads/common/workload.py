@@ -19,6 +19,11 @@ class Workload(object):
     # Default configuration
     DEFAULT_CONFIG = {}
 
+    # Top level pillar keys to collect along with interface information
+    # once the workload is deployed. Without any, facts are looked up on
+    # first use instead.
+    FACTS_PILLAR = []
+
     def __init__(self, client, pool, config):
         """
         Initializes the workload. Updates the configuration with defaults
@@ -41,6 +46,9 @@ class Workload(object):
         # Used to store information to be pushed to the html view
         self.data_dict = {}
 
+        # Seconds spent in each phase keyed by phase name
+        self.timings = {}
+
     def deploy(self):
         """
         Requests minions from minion pool, applies roles to the minions, and
@@ -50,8 +58,23 @@ class Workload(object):
         self.get_minions()
         self.apply_roles()
         self.apply_states()
+        if self.FACTS_PILLAR:
+            self.collect_facts()
         return True
 
+    def collect_facts(self):
+        """
+        Collects the FACTS_PILLAR keys and the interfaces pillar for all
+        minions in one publish. Later pillar lookups and the interface names
+        get_ips needs are answered from the client's memo. get_ips still
+        asks for addresses once per interface name.
+
+        @return - Dict of facts keyed by minion id
+
+        """
+        minions = [i['minion'] for i in self.instances]
+        return self.client.facts(minions, pillar=self.FACTS_PILLAR)
+
     def undeploy(self):
         """
         Undeploys the workload. Applies anti-states to minions. Removes added
@@ -94,15 +117,24 @@ class Workload(object):
     def get_minions(self):
         """
         Gets minions from the minion pool and attaches instance information
-        that should be tracked throughout the workload.
+        that should be tracked throughout the workload. Minions are picked to
+        fit each instance's 'requires' and 'prefer' settings and the
+        workload's 'same' setting.
 
         """
         self.instances = []
         instances = self.config.get('instances', [])
         self.data_dict['minions'] = []
-        for i in instances:
+
+        allocation = self.pool.allocate(instances, self.config.get('same'))
+        self.data_dict['allocation'] = allocation.report(instances)
+        print "%s: Allocated %s with score %s" % (
+            self.name,
+            ', '.join(minion.id_ for minion in allocation.minions),
+            allocation.score)
+
+        for i, minion in zip(instances, allocation.minions):
             roles = set(i['roles'])
-            minion = self.pool.get_minion()
             instance = {'minion': minion}
             instance.update(i)
 
@@ -148,7 +180,7 @@ class Workload(object):
             roles = list(roles)
             minion_sets.append([minion])
             role_sets.append(roles)
-        self.client.set_roles(minion_sets, role_sets, timeout=30)
+        self.set_roles(minion_sets, role_sets, 'apply')
 
         # Update the view dict with the graph.
         self.data_dict['minion_graph'] = MinionGraph(
@@ -227,7 +259,28 @@ class Workload(object):
             roles = list(roles)
             role_sets.append(roles)
             minion_sets.append([minion])
-        self.client.set_roles(minion_sets, role_sets, timeout=30)
+        self.set_roles(minion_sets, role_sets, 'remove')
+
+    def set_roles(self, minion_sets, role_sets, phase):
+        """
+        Sets roles through the client and records how many publishes it
+        took. Set 'per_minion_roles' in the workload config to send every
+        minion's roles in a single publish.
+
+        @param minion_sets - List of lists of minions
+        @param role_sets - List of lists of roles
+        @param phase - String 'apply' or 'remove'
+
+        """
+        publishes = self.client.set_roles(
+            minion_sets,
+            role_sets,
+            per_minion=self.config.get('per_minion_roles', False),
+            timeout=30
+        )
+        self.data_dict.setdefault('role_publishes', {})[phase] = publishes
+        print "%s: %s roles for %s minions in %s publishes" % (
+            self.name, phase.capitalize(), len(minion_sets), publishes)
 
     def return_minions(self):
         """
@@ -239,6 +292,23 @@ class Workload(object):
             if minion is not None:
                 self.pool.put_minion(minion)
 
+    def start_at(self, runner):
+        """
+        Returns a start time far enough ahead for every runner to get its
+        command before then, for load spread across several runners to
+        start together. Taken from the runner's clock, which ntp keeps in
+        line with the other runners.
+
+        @param runner - Minion running load
+        @return - Integer epoch seconds
+        """
+        resp = self.client.cmd(runner.id_,
+                               'cmd.run_all',
+                               arg=('date +%s',),
+                               timeout=60)
+        now = int(resp.values()[0]['stdout'].strip())
+        return now + int(self.config.get('start_delay', 10))
+
     def run(self):
         """Runs the workload"""
         pass
@@ -252,6 +322,15 @@ class Workload(object):
         """
         return {}
 
+    def export(self):
+        """
+        Returns the results of the workload for the results export.
+        Defaults to the data passed to the view.
+
+        :returns: Dict
+        """
+        return self.data()
+
     @property
     def name(self):
         """
@@ -0,0 +1,264 @@
+import json
+from collections import OrderedDict
+
+
+class Allocation(object):
+    """
+    Minions picked for a workload's instances along with how well they fit.
+
+    """
+
+    def __init__(self, minions, group, score):
+        """
+        Allocation constructor
+
+        @param minions - List of minions in instance order
+        @param group - Dictionary of grain values shared by the minions
+        @param score - Dictionary with the keys 'preferred' and 'waste'
+
+        """
+        self.minions = minions
+        self.group = group
+        self.score = score
+
+    def report(self, instances):
+        """
+        Returns a dictionary describing the allocation. Enough to reproduce
+        the assignment on a later run.
+
+        @param instances - List of instance configs the minions fill
+        @return - Dictionary
+
+        """
+        assignments = []
+        for instance, minion in zip(instances, self.minions):
+            assignments.append({
+                'minion': minion.id_,
+                'roles': list(instance.get('roles', [])),
+                'num_cpus': minion['num_cpus'],
+                'mem_total': minion['mem_total'],
+                'cpu_model': minion['cpu_model']
+            })
+        return {'group': self.group,
+                'score': self.score,
+                'assignments': assignments}
+
+
+class Allocator(object):
+    """
+    Picks the best fitting minions for a set of instances.
+
+    Instances may declare requirements and preferences on any grain the
+    minions expose:
+
+        requires:
+          num_cpus: 4        # numbers are minimums
+          mem_total: 7000
+          os: Ubuntu         # anything else must match, lists list options
+        prefer:
+          - num_cpus         # maximized, earlier grains first
+
+    and the workload may require every instance to share grain values:
+
+        same:
+          - cpu_model
+
+    Without requirements or preferences minions are picked in pool order.
+
+    """
+
+    def __init__(self, minions):
+        """
+        Inits the allocator.
+
+        @param minions - List of free minions in pool order
+
+        """
+        self.minions = minions
+        self._groups = {}
+
+    def group_key(self, minion, same):
+        """
+        Returns a hashable key of the grain values a minion must share.
+
+        @param minion - Minion
+        @param same - Tuple of grain names
+        @return - String
+
+        """
+        return json.dumps([minion[grain] for grain in same], sort_keys=True)
+
+    def groups(self, same):
+        """
+        Indexes the minions by the grain values they must share. The index
+        is built once per set of grains.
+
+        @param same - Tuple of grain names
+        @return - OrderedDict of lists of minions keyed by group key
+        """
+        index = self._groups.get(same)
+        if index is None:
+            index = OrderedDict()
+            for minion in self.minions:
+                key = self.group_key(minion, same)
+                index.setdefault(key, []).append(minion)
+            self._groups[same] = index
+        return index
+
+    def meets(self, minion, requires):
+        """
+        Checks a minion against instance requirements.
+
+        @param minion - Minion
+        @param requires - Dictionary of grain requirements
+        @return - Boolean
+
+        """
+        for grain, wanted in requires.iteritems():
+            value = minion[grain]
+            if value is None:
+                return False
+            if isinstance(wanted, (int, long, float)):
+                if value < wanted:
+                    return False
+            elif isinstance(wanted, list):
+                if value not in wanted:
+                    return False
+            elif value != wanted:
+                return False
+        return True
+
+    def waste(self, minion, requires):
+        """
+        Measures how far a minion exceeds the numeric requirements, relative
+        to the requirements. Lower is a tighter fit.
+
+        @param minion - Minion
+        @param requires - Dictionary of grain requirements
+        @return - Float
+
+        """
+        waste = 0.0
+        for grain, wanted in requires.iteritems():
+            if isinstance(wanted, (int, long, float)) and wanted > 0:
+                waste += float(minion[grain] - wanted) / wanted
+        return waste
+
+    def rank(self, minion, instance):
+        """
+        Sort key for a candidate minion. Preferred grains come first, largest
+        first, then the tightest fit.
+
+        @param minion - Minion
+        @param instance - Instance config
+        @return - Tuple
+
+        """
+        preferred = tuple(-(minion[grain] or 0)
+                          for grain in instance.get('prefer', []))
+        return preferred + (self.waste(minion, instance.get('requires', {})),)
+
+    def assign_group(self, minions, instances):
+        """
+        Assigns minions of one group to instances. The instance with the
+        fewest candidates is filled first, each with its best ranked free
+        minion. When none of an instance's candidates is free, earlier
+        instances are moved to other candidates to make room, so the group
+        only fails when no assignment exists.
+
+        @param minions - List of minions in pool order
+        @param instances - List of instance configs
+        @return - List of minions in instance order or None if they do not
+            fit
+
+        """
+        ranked = []
+        for instance in instances:
+            requires = instance.get('requires', {})
+            # sorted is stable so ties stay in pool order
+            ranked.append(sorted([m for m in minions
+                                  if self.meets(m, requires)],
+                                 key=lambda m: self.rank(m, instance)))
+
+        assigned = [None] * len(instances)
+        # Instance index keyed by id of the minion it was assigned
+        owners = {}
+
+        def augment(i, seen):
+            # Looks for a chain of reassignments that frees a minion for i
+            for minion in ranked[i]:
+                if id(minion) in seen:
+                    continue
+                seen.add(id(minion))
+                owner = owners.get(id(minion))
+                if owner is None or augment(owner, seen):
+                    owners[id(minion)] = i
+                    assigned[i] = minion
+                    return True
+            return False
+
+        order = sorted(range(len(instances)),
+                       key=lambda i: (len(ranked[i]), i))
+        for i in order:
+            for minion in ranked[i]:
+                if id(minion) not in owners:
+                    owners[id(minion)] = i
+                    assigned[i] = minion
+                    break
+            else:
+                if not augment(i, set()):
+                    return None
+        return assigned
+
+    def score(self, minions, instances):
+        """
+        Scores an assignment. Totals of preferred grains are better when
+        higher, waste is better when lower.
+
+        @param minions - List of minions in instance order
+        @param instances - List of instance configs
+        @return - Dictionary with the keys 'preferred' and 'waste'
+
+        """
+        preferred = {}
+        waste = 0.0
+        for minion, instance in zip(minions, instances):
+            for grain in instance.get('prefer', []):
+                preferred[grain] = preferred.get(grain, 0) + \
+                    (minion[grain] or 0)
+            waste += self.waste(minion, instance.get('requires', {}))
+        return {'preferred': preferred, 'waste': round(waste, 4)}
+
+    def assign(self, instances, same=None):
+        """
+        Picks minions for every instance. When minions must share grain
+        values, every group that fits is tried and the best scoring group
+        wins. Ties go to the group seen first in pool order.
+
+        @param instances - List of instance configs
+        @param same - Optional list of grain names every minion must share
+        @return - Allocation or None if the instances do not fit
+        """
+        same = tuple(same or ())
+        # Preferred grains in the order the instances declare them
+        preferred = []
+        for instance in instances:
+            for grain in instance.get('prefer', []):
+                if grain not in preferred:
+                    preferred.append(grain)
+        best = None
+        best_rank = None
+        for key, minions in self.groups(same).iteritems():
+            if len(minions) < len(instances):
+                continue
+            assigned = self.assign_group(minions, instances)
+            if assigned is None:
+                continue
+            score = self.score(assigned, instances)
+            rank = (tuple(-score['preferred'][grain] for grain in preferred),
+                    score['waste'])
+            if best_rank is None or rank < best_rank:
+                group = dict(zip(same, json.loads(key)))
+                best = Allocation(assigned, group, score)
+                best_rank = rank
+        return best
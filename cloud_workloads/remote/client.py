@@ -1,17 +1,46 @@
+import threading
+from collections import OrderedDict
 from minion import Minion
 from itertools import izip
+from connection import ConnectionPool
+from futures import Deferred
+from inventory import payload_size
 from job import MultiJob, SaltJob
 
 
 class Client(object):
     """Provides an interface for dealing with the salt local client."""
 
-    def __init__(self):
+    def __init__(self, connections=None):
         """
         Initializes the client.
 
+        @param connections - Optional ConnectionPool shared by every salt
+            call made through this client
+
+        """
+        self.connections = connections or ConnectionPool()
+
+        # Per run memo of pillar and grain facts keyed by minion id
+        self._facts = {}
+        # Per run memo of network.ipaddrs keyed by minion id then interface
+        self._ipaddrs = {}
+        self._facts_lock = threading.Lock()
+
+        # Minions that have had custom execution modules synced this run
+        self._synced_modules = set()
+
+    def minion_ids(self, minions):
+        """
+        Converts a Minion, a list of Minions or a list target string into a
+        list of minion ids.
+
+        @param minions - Single Minion, List of Minions or string
+        @return - List of string minion ids
+
         """
-        pass
+        target = self.minions_target(minions)
+        return [id_ for id_ in target.split(',') if id_]
 
     def minions_target(self, minions):
         """
@@ -61,6 +90,51 @@ class Client(object):
                        'arg': ()})
         return SaltJob(kwargs)
 
+    def prepare_job_sync_modules(self, minions, **kwargs):
+        """
+        Prepares a salt command to synchronize execution modules. Necessary
+        for any custom execution modules.
+
+        @param minions - List of minions, Single minion, or string
+        @return - SaltJob
+
+        """
+        target = self.minions_target(minions)
+        kwargs.update({'tgt': target,
+                       'fun': 'saltutil.sync_modules',
+                       'expr_form': 'list',
+                       'arg': ()})
+        return SaltJob(kwargs)
+
+    def prepare_job_set_grain_by_minion(self, minions, key, values,
+                                        **kwargs):
+        """
+        Prepares a single salt command that sets a grain to a different value
+        on each minion. Uses the custom workloads.setval_by_minion module,
+        syncing modules first on minions that have not been synced this run.
+
+        @param minions - List of minions
+        @param key - String key indicating which grain to set
+        @param values - Dict of values keyed by minion id
+        @return - SaltJob
+
+        """
+        target = self.minions_target(minions)
+        kwargs.update({'tgt': target,
+                       'fun': 'workloads.setval_by_minion',
+                       'arg': (key, values),
+                       'expr_form': 'list'})
+        setval_job = SaltJob(kwargs)
+
+        unsynced = [minion for minion in minions
+                    if minion.id_ not in self._synced_modules]
+        if unsynced:
+            ret = self.prepare_job_sync_modules(unsynced)
+            ret.link(setval_job)
+        else:
+            ret = setval_job
+        return ret
+
     def prepare_job_set_grain(self, minions, key, value, **kwargs):
         """
         Prepares a salt command to set the value of grain.
@@ -115,6 +189,30 @@ class Client(object):
                        'expr_form': 'list'})
         return SaltJob(kwargs)
 
+    def prepare_job_compound(self, minions, calls, expr_form='list',
+                             **kwargs):
+        """
+        Prepares a single salt job that runs several salt functions on the
+        targeted minions. Each minion returns a dict keyed by function name.
+
+        @param minions - Single minion, list of minions, or string
+        @param calls - List of (function, args) tuples. A function may only
+            appear once since returns are keyed by function name.
+        @param expr_form - String expression form when minions is a target
+        @return SaltJob
+
+        """
+        funcs = [func for func, args in calls]
+        if len(set(funcs)) != len(funcs):
+            raise ValueError("Compound jobs cannot repeat a salt function: "
+                             "%s" % funcs)
+        target = self.minions_target(minions)
+        kwargs.update({'tgt': target,
+                       'fun': funcs,
+                       'arg': [list(args) for func, args in calls],
+                       'expr_form': expr_form})
+        return SaltJob(kwargs)
+
     def prepare_job_state(self, minions, state, sync=False, **kwargs):
         """
         Prepares a salt command to apply a sls state file to minions.
@@ -178,51 +276,258 @@ class Client(object):
         # Create minion model for all returned grains
         return [Minion(grains) for id_, grains in resp.iteritems()]
 
-    def run_jobs(self, jobs, timeout=3600):
-        """
-        Runs multiple jobs or a single job.
+    def inventory(self, target, expr_form, cache=None, timeout=5):
+        """
+        Creates a list of minions based on target and expr_form, using an
+        inventory cache to avoid transferring grains that have not changed.
+
+        With a cache, every targeted minion is asked for test.ping and a hash
+        of its grains in one publish. Full grains are only fetched for minions
+        that are not cached or whose hash changed. Without a cache, grains
+        are fetched for every targeted minion.
+
+        Minions that do not answer in time are left out with a warning.
+
+        @param target - Minion target
+        @param expr_form - How to target minions
+        @param cache - Optional InventoryCache
+        @param timeout - Integer number of seconds to wait for each publish
+        @return - Tuple of list of minions and a dictionary of stats with
+            the keys 'cached', 'fetched', 'bytes' and 'unresponsive'
+
+        """
+        stats = {'cached': 0, 'fetched': 0, 'bytes': 0, 'unresponsive': []}
+
+        if cache is None:
+            job = self.prepare_job_minions(target, expr_form)
+            self.run_jobs([job], timeout, validate=False)
+            stats['bytes'] += payload_size(job.ret)
+            stats['fetched'] = len(job.ret)
+            stats['unresponsive'] = sorted(job.outstanding)
+            self.warn_unresponsive(stats['unresponsive'])
+            return [Minion(grains) for grains in job.ret.itervalues()], stats
+
+        check = self.prepare_job_compound(
+            target,
+            [('test.ping', []), ('workloads.grains_hash', [])],
+            expr_form=expr_form
+        )
+        self.run_jobs([check], timeout, validate=False)
+        stats['bytes'] += payload_size(check.ret)
+        unresponsive = set(check.outstanding)
+
+        # Minions without the custom module report an error string which
+        # never matches a cached hash
+        changed = {}
+        for minion_id, ret in check.ret.iteritems():
+            hash_ = ret.get('workloads.grains_hash') \
+                if isinstance(ret, dict) else None
+            if not cache.is_current(minion_id, hash_):
+                changed[minion_id] = hash_
+
+        if changed:
+            # Syncing modules alongside lets the next run use the hash
+            fetch = self.prepare_job_compound(
+                ','.join(changed),
+                [('grains.items', []), ('saltutil.sync_modules', [])]
+            )
+            self.run_jobs([fetch], timeout, validate=False)
+            stats['bytes'] += payload_size(fetch.ret)
+            unresponsive.update(fetch.outstanding)
+            for minion_id, ret in fetch.ret.iteritems():
+                if isinstance(ret, dict) and \
+                        isinstance(ret.get('grains.items'), dict):
+                    # Prefer the hash the minion computed itself so that
+                    # serialization differences never force a refetch
+                    cache.update(minion_id, ret['grains.items'],
+                                 changed[minion_id])
+                else:
+                    unresponsive.add(minion_id)
+        cache.save()
+
+        ids = sorted(set(check.ret).difference(unresponsive))
+        stats['fetched'] = len([i for i in ids if i in changed])
+        stats['cached'] = len(ids) - stats['fetched']
+        stats['unresponsive'] = sorted(unresponsive)
+        self.warn_unresponsive(stats['unresponsive'])
+        return [Minion(cache.grains(minion_id)) for minion_id in ids], stats
+
+    def warn_unresponsive(self, minion_ids):
+        """
+        Prints a warning naming minions that were targeted but did not
+        answer in time.
+
+        @param minion_ids - List of minion ids
+
+        """
+        if minion_ids:
+            print "Warning: Leaving out unresponsive minions: %s" % (
+                ', '.join(minion_ids))
+
+    def run_jobs_deferred(self, jobs, timeout=3600, validate=True):
+        """
+        Publishes multiple jobs or a single job and returns without waiting
+        for them. The jobs have been published by the time this returns.
+        They are waited for by whichever thread resolves the deferred.
 
         @param jobs - Single SaltJob or a list of SaltJobs
         @param timeout - Integer number of seconds to wait for all jobs
             to complete
+        @param validate - Boolean. When False, whatever came back is returned
+            without raising for unfinished or failed jobs
+        @return - Deferred resolved with a dictionary of responses keyed by
+            jid
 
         """
         # Convert to list if given single job
         if isinstance(jobs, SaltJob):
             jobs = [jobs]
 
-        multi = MultiJob()
-        for job in jobs:
-            multi.add(job)
-        resp = multi.wait(timeout)
-        return resp
+        connection = self.connections.checkout()
+        try:
+            multi = MultiJob(connection)
+            for job in jobs:
+                multi.add(job)
+        except BaseException as e:
+            self.connections.release(connection, e)
+            raise
+
+        def wait():
+            with self.connections.connection(connection):
+                return multi.wait(timeout, validate)
+        return Deferred(wait)
+
+    def run_jobs_async(self, jobs, timeout=3600, validate=True):
+        """
+        Publishes multiple jobs or a single job and waits for them in a
+        thread of their own. See run_jobs_deferred.
+
+        @return - Future resolved with a dictionary of responses keyed by jid
+
+        """
+        return self.run_jobs_deferred(jobs, timeout, validate).start()
 
-    def set_roles(self, minion_sets, role_sets, **kwargs):
+    def run_jobs(self, jobs, timeout=3600, validate=True):
+        """
+        Runs multiple jobs or a single job.
+
+        @param jobs - Single SaltJob or a list of SaltJobs
+        @param timeout - Integer number of seconds to wait for all jobs
+            to complete
+        @param validate - Boolean. When False, whatever came back is returned
+            without raising for unfinished or failed jobs
+
+        """
+        return self.run_jobs_deferred(jobs, timeout, validate).result()
+
+    def set_roles_deferred(self, minion_sets, role_sets, per_minion=False,
+                           **kwargs):
         """
         Sets the roles value of the specified minions' grains and then updates
         the minion objects with the results
 
+        Minions that end up with an identical list of roles share a single
+        list targeted grains.setval job. With per_minion set, every minion's
+        roles are sent in one publish keyed by minion id instead.
+
         @param minions: List of List of minions
         @param roles: List of list of roles.
+        @param per_minion: Boolean, send all values in a single publish
+        @return - Deferred resolved with the number of publishes made once
+            the minion objects are updated
 
         """
         timeout = kwargs.get('timeout', 60)
-        jobs = []
-        for minions, roles in izip(minion_sets, role_sets):
-            jobs.append(self.prepare_job_set_grain(minions, 'roles', roles))
-        multi_resp = self.run_jobs(jobs, timeout)
 
-        # Get a unique set of minions
-        all_minions = set()
-        for minions in minion_sets:
+        # Roles each minion should end up with. Later sets win.
+        roles_by_id = OrderedDict()
+        all_minions = {}
+        for minions, roles in izip(minion_sets, role_sets):
             for minion in minions:
-                all_minions.add(minion)
+                roles_by_id[minion.id_] = sorted(set(roles))
+                all_minions[minion.id_] = minion
+
+        if per_minion:
+            jobs = [self.prepare_job_set_grain_by_minion(
+                all_minions.values(), 'roles', dict(roles_by_id))]
+        else:
+            groups = OrderedDict()
+            for minion_id, roles in roles_by_id.iteritems():
+                groups.setdefault(tuple(roles), []).append(
+                    all_minions[minion_id])
+            jobs = [self.prepare_job_set_grain(minions, 'roles', list(roles))
+                    for roles, minions in groups.iteritems()]
+
+        publishes = 0
+        for job in jobs:
+            current = job
+            while current is not None:
+                publishes += 1
+                current = current.chain
+
+        # Pillar follows roles so anything memoized is about to go stale
+        self.forget(all_minions.values())
+
+        def update(multi_resp):
+            # Update affected minions with role changes in grains. Module
+            # syncs chained in front return lists and are skipped.
+            for jid, job_resp in multi_resp.iteritems():
+                for minion_id, value in job_resp.iteritems():
+                    if isinstance(value, dict):
+                        all_minions[minion_id].update(value)
+            if per_minion:
+                self._synced_modules.update(all_minions.keys())
+            return publishes
+
+        return self.run_jobs_deferred(jobs, timeout).then(update)
+
+    def set_roles_async(self, minion_sets, role_sets, per_minion=False,
+                        **kwargs):
+        """
+        Sets roles in a thread of their own. See set_roles_deferred.
+
+        @return - Future resolved with the number of publishes made
+
+        """
+        return self.set_roles_deferred(minion_sets, role_sets, per_minion,
+                                       **kwargs).start()
+
+    def set_roles(self, minion_sets, role_sets, per_minion=False, **kwargs):
+        """
+        Sets the roles value of the specified minions' grains and then updates
+        the minion objects with the results
+
+        @param minions: List of List of minions
+        @param roles: List of list of roles.
+        @param per_minion: Boolean, send all values in a single publish
+        @return - Integer number of publishes made
+
+        """
+        return self.set_roles_deferred(minion_sets, role_sets, per_minion,
+                                       **kwargs).result()
+
+    def cmd_deferred(self, minions, func, **kwargs):
+        """
+        Publishes a single command without waiting for it.
+
+        @param target - String salt target
+        @param func - Salt function - 'pillar.get', 'network.ipaddrs', etc.
+        @return - Deferred resolved with a dict keyed by minion id
+
+        """
+        timeout = kwargs.get('timeout') or 3600
+        jobs = [self.prepare_job(minions, func, **kwargs)]
+        return self.run_jobs_deferred(jobs, timeout).then(
+            lambda resp: resp.values()[0])
 
-        # Update affected minions with role changes in grains
-        all_minions = {minion.id_: minion for minion in all_minions}
-        for jid, job_resp in multi_resp.iteritems():
-            for minion_id, value in job_resp.iteritems():
-                all_minions[minion_id].update(value)
+    def cmd_async(self, minions, func, **kwargs):
+        """
+        Runs a single command in a thread of its own. See cmd_deferred.
+
+        @return - Future resolved with a dict keyed by minion id
+
+        """
+        return self.cmd_deferred(minions, func, **kwargs).start()
 
     def cmd(self, minions, func, **kwargs):
         """
@@ -233,10 +538,7 @@ class Client(object):
         @return - dict
 
         """
-        timeout = kwargs.get('timeout') or 3600
-        jobs = [self.prepare_job(minions, func, **kwargs)]
-        resp = self.run_jobs(jobs, timeout)
-        return resp.values()[0]
+        return self.cmd_deferred(minions, func, **kwargs).result()
 
     def job(self, minions, func, **kwargs):
         """
@@ -245,9 +547,35 @@ class Client(object):
 
         @param func - Salt function - 'pillar.get', 'network.ipaddrs', etc.
         """
-        multi = MultiJob()
         job = self.prepare_job(minions, func, **kwargs)
-        return multi.add(job)
+        with self.connections.connection() as connection:
+            return MultiJob(connection).add(job)
+
+    def get_pillar_deferred(self, minions, what, default=None, **kwargs):
+        """
+        Looks up pillar information for selected minions without waiting.
+
+        @param minions - List of minions
+        @param what - String pillar information
+        @param default - Default value to return
+        @returns Deferred resolved with a dict keyed by minion id
+
+        """
+        jobs = [self.prepare_job_pillar_get(minions, what, default)]
+        timeout = kwargs.get('timeout') or 60
+        return self.run_jobs_deferred(jobs, timeout).then(
+            lambda resp: resp.values()[0])
+
+    def get_pillar_async(self, minions, what, default=None, **kwargs):
+        """
+        Looks up pillar information in a thread of its own. See
+        get_pillar_deferred.
+
+        @returns Future resolved with a dict keyed by minion id
+
+        """
+        return self.get_pillar_deferred(minions, what, default,
+                                        **kwargs).start()
 
     def get_pillar(self, minions, what, default=None, **kwargs):
         """
@@ -259,9 +587,200 @@ class Client(object):
         @returns Dict
 
         """
-        jobs = [self.prepare_job_pillar_get(minions, what, default)]
-        resp = self.run_jobs(jobs, kwargs.get('timeout') or 60)
-        return resp.values()[0]
+        return self.get_pillar_deferred(minions, what, default,
+                                        **kwargs).result()
+
+    def compound_deferred(self, minions, calls, **kwargs):
+        """
+        Runs several salt functions on the minions in one publish without
+        waiting.
+
+        @param minions - Single minion, list of minions, or string
+        @param calls - List of (function, args) tuples
+        @return Deferred resolved with a dict of {function: return} keyed by
+            minion id
+
+        """
+        jobs = [self.prepare_job_compound(minions, calls)]
+        timeout = kwargs.get('timeout') or 60
+        return self.run_jobs_deferred(jobs, timeout).then(
+            lambda resp: resp.values()[0])
+
+    def compound_async(self, minions, calls, **kwargs):
+        """
+        Runs several salt functions in a thread of their own. See
+        compound_deferred.
+
+        @return Future resolved with a dict of {function: return} keyed by
+            minion id
+
+        """
+        return self.compound_deferred(minions, calls, **kwargs).start()
+
+    def compound(self, minions, calls, **kwargs):
+        """
+        Runs several salt functions on the minions in one publish.
+
+        @param minions - Single minion, list of minions, or string
+        @param calls - List of (function, args) tuples
+        @return dict of {function: return} keyed by minion id
+
+        """
+        return self.compound_deferred(minions, calls, **kwargs).result()
+
+    def facts_deferred(self, minions, pillar=(), grains=(), **kwargs):
+        """
+        Looks up pillar values and grains for minions. Results are memoized
+        for the run so that only minions missing from the memo, or missing
+        some of the requested keys, are asked. Those are asked in a single
+        compound publish.
+
+        The 'interfaces' pillar is always included.
+
+        @param minions - Single minion, list of minions, or string
+        @param pillar - Iterable of top level pillar keys
+        @param grains - Iterable of grain names
+        @return Deferred resolved with a dict keyed by minion id of dicts with
+            the keys 'pillar' and 'grains'
+
+        """
+        ids = self.minion_ids(minions)
+        pillar = set(pillar) | set(['interfaces'])
+        grains = set(grains)
+
+        with self._facts_lock:
+            missing = [id_ for id_ in ids
+                       if id_ not in self._facts
+                       or not pillar.issubset(self._facts[id_]['pillar'])
+                       or not grains.issubset(self._facts[id_]['grains'])]
+            # Ask for everything already known as well so that the memo
+            # entry can simply be replaced
+            for id_ in missing:
+                if id_ in self._facts:
+                    pillar.update(self._facts[id_]['pillar'])
+                    grains.update(self._facts[id_]['grains'])
+
+        def collect(resp=None):
+            with self._facts_lock:
+                for id_, ret in (resp or {}).iteritems():
+                    self._facts[id_] = {
+                        'pillar': ret.get('pillar.item') or {},
+                        'grains': ret.get('grains.item') or {}
+                    }
+                return dict((id_, self._facts[id_]) for id_ in ids
+                            if id_ in self._facts)
+
+        if not missing:
+            return Deferred(collect)
+
+        calls = [('pillar.item', sorted(pillar))]
+        if grains:
+            calls.append(('grains.item', sorted(grains)))
+        return self.compound_deferred(','.join(missing), calls,
+                                      **kwargs).then(collect)
+
+    def facts_async(self, minions, pillar=(), grains=(), **kwargs):
+        """
+        Looks up pillar values and grains in a thread of their own. See
+        facts_deferred.
+
+        @return Future resolved with a dict keyed by minion id
+
+        """
+        return self.facts_deferred(minions, pillar, grains, **kwargs).start()
+
+    def facts(self, minions, pillar=(), grains=(), **kwargs):
+        """
+        Returns pillar values and grains for minions. See facts_async.
+
+        @param minions - Single minion, list of minions, or string
+        @param pillar - Iterable of top level pillar keys
+        @param grains - Iterable of grain names
+        @return dict keyed by minion id
+
+        """
+        return self.facts_deferred(minions, pillar, grains, **kwargs).result()
+
+    def forget(self, minions):
+        """
+        Drops minions from the facts memo. Pillar is targeted by roles so
+        facts go stale whenever roles change.
+
+        @param minions - Single minion, list of minions, or string
+
+        """
+        with self._facts_lock:
+            for id_ in self.minion_ids(minions):
+                self._facts.pop(id_, None)
+                self._ipaddrs.pop(id_, None)
+
+    def get_ips_deferred(self,
+                         minions,
+                         interface='public',
+                         default_interface='eth0',
+                         **kwargs):
+        """
+        Looks up ip addresses for a specific interface named in a pillar
+        without waiting. See get_ips.
+
+        @param minions List of minions
+        @param interface Name of the interface defined pillar interfaces
+        @param default_interface Default interface to use if unable to
+                                 locate one within pillar
+        @return Deferred resolved with a dictionary of ips for an interface
+            keyed by minion id
+
+        """
+        timeout = kwargs.get('timeout') or 60
+
+        def lookup_ips(facts):
+            names = {}
+            for minion_id, minion_facts in facts.iteritems():
+                interfaces = minion_facts['pillar'].get('interfaces') or {}
+                names[minion_id] = interfaces.get(interface) or \
+                    default_interface
+
+            # One network.ipaddrs publish per interface name for minions
+            # that have not been asked about that interface yet
+            ret = {}
+            unknown = {}
+            with self._facts_lock:
+                for minion_id, name in names.iteritems():
+                    known = self._ipaddrs.get(minion_id, {})
+                    if name in known:
+                        ret[minion_id] = known[name]
+                    else:
+                        unknown.setdefault(name, []).append(minion_id)
+            jobs = dict(
+                (name, self.prepare_job_network_ipaddrs(','.join(ids), name))
+                for name, ids in unknown.iteritems()
+            )
+            if jobs:
+                self.run_jobs(jobs.values(), timeout)
+
+            with self._facts_lock:
+                for name, job in jobs.iteritems():
+                    for minion_id, ips in job.ret.iteritems():
+                        self._ipaddrs.setdefault(minion_id, {})[name] = ips
+                        ret[minion_id] = ips
+            return ret
+
+        return self.facts_deferred(minions, **kwargs).then(lookup_ips)
+
+    def get_ips_async(self,
+                      minions,
+                      interface='public',
+                      default_interface='eth0',
+                      **kwargs):
+        """
+        Looks up ip addresses in a thread of their own. See get_ips_deferred.
+
+        @return Future resolved with a dictionary of ips for an interface
+            keyed by minion id
+
+        """
+        return self.get_ips_deferred(minions, interface, default_interface,
+                                     **kwargs).start()
 
     def get_ips(self,
                 minions,
@@ -273,6 +792,10 @@ class Client(object):
         Get 'public' or 'private' for example where public is mapped to eth0
         or private is mapped to eth2
 
+        Interface names come from the facts memo and addresses from
+        network.ipaddrs are memoized per interface, so repeated lookups for
+        the same minions do not go back to the master.
+
         @param minions List of minions
         @param interface Name of the interface defined pillar interfaces
         @param default_interface Default interface to use if unable to
@@ -280,30 +803,5 @@ class Client(object):
         @return dictionary of ips for an interface keyed by minion id
 
         """
-        target = self.minions_target(minions)
-
-        interface_dict = self.get_pillar(target,
-                                         'interfaces:%s' % interface,
-                                         default_interface)
-
-        # If there is only one interface, then we can get away with one salt
-        # call for the ip address
-        unique_interfaces = \
-            set([i for minion_id, i in interface_dict.iteritems()])
-        if len(unique_interfaces) == 1:
-            jobs = [self.prepare_job_network_ipaddrs(target,
-                                                     unique_interfaces.pop())]
-            ret = self.run_jobs(jobs, kwargs.get('timeout') or 60)
-            ret = ret.values()[0]
-
-        # Otherwise we have to iterate
-        else:
-            ret = {}
-            jobs = []
-            for minion_id, interface in interface_dict:
-                jobs.append(
-                    self.prepare_job_network_ipaddrs(minion_id, interface))
-            resp = self.run_jobs(jobs, kwargs.get('timeout') or 60)
-            for jid, job_ret in resp:
-                ret.update(job_ret)
-        return ret
+        return self.get_ips_deferred(minions, interface, default_interface,
+                                     **kwargs).result()
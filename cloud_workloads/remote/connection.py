@@ -0,0 +1,274 @@
+import contextlib
+import threading
+import time
+import uuid
+import salt.client
+from handler import BaseJobException, PublishException
+from job import MASTER_OPTIONS, MultiJobException
+
+
+class Connection(object):
+    """
+    A long lived salt LocalClient together with its event bus subscription.
+    Looks enough like a LocalClient for a MultiJob to publish with it and
+    listen on it.
+
+    """
+
+    # Tag prefix of the events fired to check the subscription
+    ping_tag = 'cloud-workloads/ping'
+
+    # Most buffered events discarded before a connection is handed out
+    max_drain = 10000
+
+    def __init__(self, opts, stats):
+        """
+        Connection constructor
+
+        @param opts - Salt master options
+        @param stats - ConnectionStats to count publishes against
+
+        """
+        self.client = salt.client.LocalClient(mopts=opts)
+        self.stats = stats
+        self.broken = False
+        self.last_used = time.time()
+
+    @property
+    def event(self):
+        """
+        Returns the event bus subscription of the local client.
+
+        @return - salt.utils.event.SaltEvent
+
+        """
+        return self.client.event
+
+    def run_job(self, **kwargs):
+        """
+        Publishes a job. See salt.client.LocalClient.run_job.
+
+        @return - Dictionary containing the jid and targeted minions
+
+        """
+        self.last_used = time.time()
+        self.stats.increment('publishes')
+        return self.client.run_job(**kwargs)
+
+    def drain(self):
+        """
+        Discards events buffered on the subscription while the connection
+        sat idle, up to max_drain of them.
+
+        @return - Integer number of events discarded
+
+        """
+        count = 0
+        while count < self.max_drain and \
+                self.event.get_event(wait=0, full=True) is not None:
+            count += 1
+        return count
+
+    def ping(self, timeout):
+        """
+        Checks that the subscription still receives master events by firing
+        an event with a fresh tag and waiting for it to come back.
+
+        @param timeout - Float number of seconds to wait for the event
+        @return - Boolean
+
+        """
+        tag = '%s/%s' % (self.ping_tag, uuid.uuid4().hex)
+        if not self.event.fire_event({}, tag):
+            return False
+        return self.event.get_event(wait=timeout, tag=tag) is not None
+
+    def is_healthy(self, max_idle, ping_timeout):
+        """
+        Checks whether the connection can be handed out again. Connections
+        that raised while in use or sat idle for too long are not healthy.
+        Otherwise events buffered while idle are discarded and the event
+        bus is pinged, since a subscription does not survive a master
+        restart.
+
+        @param max_idle - Float number of seconds a connection may sit idle
+        @param ping_timeout - Float number of seconds to wait for a ping
+        @return - Boolean
+
+        """
+        if self.broken or time.time() - self.last_used > max_idle:
+            return False
+        try:
+            self.drain()
+            return self.ping(ping_timeout)
+        except Exception:
+            return False
+
+    def close(self):
+        """
+        Tears down the event bus subscription.
+
+        """
+        try:
+            self.client.event.destroy()
+        except Exception:
+            pass
+
+
+class ConnectionStats(dict):
+    """
+    Thread safe counters describing connection usage over a run.
+
+    """
+
+    def __init__(self):
+        super(ConnectionStats, self).__init__({
+            'connections': 0,
+            'reconnects': 0,
+            'publishes': 0
+        })
+        self._lock = threading.Lock()
+
+    def increment(self, key, amount=1):
+        """
+        Increments a counter.
+
+        @param key - String name of the counter
+        @param amount - Integer amount to add
+
+        """
+        with self._lock:
+            self[key] = self.get(key, 0) + amount
+
+
+class ConnectionPool(object):
+    """
+    Pool of salt connections shared by every MultiJob a Client runs.
+    Connections are checked out for the lifetime of a MultiJob so that
+    concurrent workloads never share a LocalClient.
+
+    """
+
+    # Seconds a connection may sit idle before it is replaced
+    max_idle = 300
+
+    # Seconds to wait for the event bus to echo a ping on checkout
+    ping_timeout = 1.0
+
+    def __init__(self, opts=None):
+        """
+        ConnectionPool constructor
+
+        @param opts - Salt master options. Defaults to MASTER_OPTIONS
+
+        """
+        self.opts = opts or MASTER_OPTIONS
+        self.stats = ConnectionStats()
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        """
+        Sets up a new connection.
+
+        @return - Connection
+
+        """
+        self.stats.increment('connections')
+        return Connection(self.opts, self.stats)
+
+    def checkout(self):
+        """
+        Hands out a healthy idle connection or sets up a new one.
+        Unhealthy idle connections are closed and replaced.
+
+        @return - Connection
+
+        """
+        while True:
+            with self._lock:
+                if not self._idle:
+                    break
+                connection = self._idle.pop()
+            if connection.is_healthy(self.max_idle, self.ping_timeout):
+                return connection
+            connection.close()
+            self.stats.increment('reconnects')
+        return self._connect()
+
+    def checkin(self, connection):
+        """
+        Returns a connection to the pool. Broken connections are closed and
+        will be replaced by a fresh one on a later checkout.
+
+        @param connection - Connection
+
+        """
+        if connection.broken:
+            connection.close()
+            self.stats.increment('reconnects')
+            return
+        connection.last_used = time.time()
+        with self._lock:
+            self._idle.append(connection)
+        self.prune()
+
+    def prune(self):
+        """
+        Closes idle connections that have sat idle for longer than
+        max_idle so that their subscriptions stop buffering master events.
+
+        """
+        expired_at = time.time() - self.max_idle
+        with self._lock:
+            expired = [c for c in self._idle if c.last_used < expired_at]
+            self._idle = [c for c in self._idle if c.last_used >= expired_at]
+        for connection in expired:
+            connection.close()
+
+    def release(self, connection, error=None):
+        """
+        Checks a connection back in after use. The connection is marked
+        broken if using it raised something other than a salt job failure.
+        An empty publish counts as a broken connection since that is how an
+        unreachable master shows up.
+
+        @param connection - Connection
+        @param error - Exception raised while using the connection, if any
+
+        """
+        if isinstance(error, PublishException):
+            connection.broken = True
+        elif error is not None and \
+                not isinstance(error, (MultiJobException, BaseJobException)):
+            connection.broken = True
+        self.checkin(connection)
+
+    @contextlib.contextmanager
+    def connection(self, connection=None):
+        """
+        Context manager that holds a connection for the duration of the
+        block and then releases it.
+
+        @param connection - Connection already checked out. A new one is
+            checked out if not provided.
+        @yield - Connection
+
+        """
+        connection = connection or self.checkout()
+        try:
+            yield connection
+        except BaseException as e:
+            self.release(connection, e)
+            raise
+        self.release(connection)
+
+    def close(self):
+        """
+        Closes all idle connections.
+
+        """
+        with self._lock:
+            for connection in self._idle:
+                connection.close()
+            self._idle = []
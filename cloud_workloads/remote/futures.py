@@ -0,0 +1,218 @@
+"""
+Minimal futures for remote operations. Lets independent salt calls be
+started together and waited on later.
+
+"""
+
+import sys
+import threading
+
+
+class Future(object):
+    """
+    Result of a remote operation that may not have finished yet.
+
+    """
+
+    # Seconds to block at a time while waiting. Keeps the waiting thread
+    # responsive to KeyboardInterrupt.
+    poll_interval = 1.0
+
+    def __init__(self):
+        """
+        Future constructor
+
+        """
+        self._finished = threading.Event()
+        self._result = None
+        self._exc_info = None
+
+    def set_result(self, result):
+        """
+        Resolves the future with a result.
+
+        @param result - Anything
+
+        """
+        self._result = result
+        self._finished.set()
+
+    def set_exc_info(self, exc_info):
+        """
+        Resolves the future with an exception.
+
+        @param exc_info - Tuple as returned by sys.exc_info()
+
+        """
+        self._exc_info = exc_info
+        self._finished.set()
+
+    def done(self):
+        """
+        Checks whether the future has been resolved.
+
+        @return - Boolean
+
+        """
+        return self._finished.is_set()
+
+    def result(self, timeout=None):
+        """
+        Waits for the future to be resolved and returns its result. Raises
+        the exception the operation raised, with its original traceback.
+
+        @param timeout - Optional number of seconds to wait
+        @raises FutureTimeoutException
+        @return - Result of the operation
+
+        """
+        if timeout is None:
+            while not self._finished.wait(self.poll_interval):
+                pass
+        elif not self._finished.wait(timeout):
+            raise FutureTimeoutException(timeout)
+
+        if self._exc_info is not None:
+            raise self._exc_info[0], self._exc_info[1], self._exc_info[2]
+        return self._result
+
+    def then(self, func):
+        """
+        Returns a new future resolved with func applied to this future's
+        result. func runs in its own thread so it may block on other remote
+        operations.
+
+        @param func - Callable taking this future's result
+        @return - Future
+
+        """
+        return spawn(lambda: func(self.result()))
+
+
+class FutureTimeoutException(Exception):
+    """
+    Exception for when a future is not resolved in time.
+
+    """
+
+    def __init__(self, timeout):
+        msg = "Remote operation did not finish within %s seconds." % timeout
+        super(FutureTimeoutException, self).__init__(msg)
+
+
+class Deferred(Future):
+    """
+    Future for work that has not been given a thread yet. The work runs in
+    the first thread that waits on it without a timeout, or in its own
+    thread once started, so callers that block anyway do not pay for one.
+
+    """
+
+    def __init__(self, func, *args, **kwargs):
+        """
+        Deferred constructor
+
+        @param func - Callable doing the work
+        @param args - Positional arguments for func
+        @param kwargs - Keyword arguments for func
+
+        """
+        super(Deferred, self).__init__()
+        self._func = lambda: func(*args, **kwargs)
+        self._claim_lock = threading.Lock()
+        self._claimed = False
+
+    def run(self):
+        """
+        Runs the work in the calling thread unless another thread already
+        runs it.
+
+        """
+        with self._claim_lock:
+            if self._claimed:
+                return
+            self._claimed = True
+        resolve(self, self._func)
+
+    def start(self):
+        """
+        Runs the work in a daemon thread unless it already runs.
+
+        @return - This deferred
+
+        """
+        thread = threading.Thread(target=self.run)
+        thread.daemon = True
+        thread.start()
+        return self
+
+    def result(self, timeout=None):
+        """
+        Returns the result of the work, running it in the calling thread when
+        waiting without a timeout. See Future.result.
+
+        @param timeout - Optional number of seconds to wait
+        @raises FutureTimeoutException
+        @return - Result of the work
+
+        """
+        if timeout is None:
+            self.run()
+        elif not self._claimed:
+            self.start()
+        return super(Deferred, self).result(timeout)
+
+    def then(self, func):
+        """
+        Returns a new deferred resolved with func applied to this one's
+        result. Both run in whichever thread runs the new deferred.
+
+        @param func - Callable taking this deferred's result
+        @return - Deferred
+
+        """
+        return Deferred(lambda: func(self.result()))
+
+
+def resolve(future, func):
+    """
+    Resolves a future with whatever func returns or raises. Anything raised
+    resolves it, including SystemExit and KeyboardInterrupt, so nothing
+    waiting on the future is left blocked.
+
+    @param future - Future
+    @param func - Callable taking no arguments
+
+    """
+    try:
+        future.set_result(func())
+    except BaseException:
+        future.set_exc_info(sys.exc_info())
+
+
+def spawn(func, *args, **kwargs):
+    """
+    Runs func in a daemon thread.
+
+    @param func - Callable
+    @return - Future resolved with whatever func returns or raises
+
+    """
+    future = Future()
+    thread = threading.Thread(target=resolve,
+                              args=(future, lambda: func(*args, **kwargs)))
+    thread.daemon = True
+    thread.start()
+    return future
+
+
+def gather(*futures):
+    """
+    Combines futures into one resolved with a list of their results, in the
+    order given. Raises the first exception encountered.
+
+    @param futures - Futures
+    @return - Future
+
+    """
+    return spawn(lambda: [future.result() for future in futures])
@@ -120,7 +120,8 @@ class UnsuccessfulException(BaseJobException):
         @return - String
 
         """
-        events = [e for e in job.events.itervalues() if not e['success']]
+        events = [e for e in job.events.itervalues()
+                  if not job.event_success(e)]
         msgs = []
         for e in events:
             msgs.append("%s - %s" % (e['id'], e['return']))
@@ -145,8 +146,8 @@ class RetcodeException(BaseJobException):
         @return - String
 
         """
-        events = [e for e in job.events.itervalues() if e.get('retcode', 1)]
-        msgs = "\n\t".join([self.event_msg(e) for e in events])
+        events = [e for e in job.events.itervalues() if job.event_retcode(e)]
+        msgs = "\n\t".join([self.event_msg(job, e) for e in events])
         msg_tuple = (job.jid,
                      job.kwargs['arg'],
                      job.kwargs['fun'],
@@ -154,19 +155,20 @@ class RetcodeException(BaseJobException):
         return ("Job %s had unacceptable retcodes. Sent args %s to"
                 " function %s:\n%s") % msg_tuple
 
-    def event_msg(self, event):
+    def event_msg(self, job, event):
         """
         Creates a string identifying the minion, offending retcode, and
         possible cause.
 
+        @param job - SaltJob the event belongs to
         @param event - Event dictionary with keys for id, retcode, and return
         @return String
 
         """
         # Return default msg
         return "%s had retcode %s: %s" % (event['id'],
-                                          event['retcode'],
-                                          event['return'])
+                                          job.event_retcode(event),
+                                          event.get('return'))
 
 
 class FailedStateSlsException(BaseJobException):
@@ -224,8 +226,10 @@ class Handler(object):
     handle_map = {
         'state.sls': 'state',
         'saltutil.sync_states': 'sync_state',
+        'saltutil.sync_modules': 'sync_module',
         'cmd.run_all': 'cmd_run',
-        'grains.setval': 'grains_setval'
+        'grains.setval': 'grains_setval',
+        'workloads.setval_by_minion': 'grains_setval'
     }
 
     def get_func(self, prefix, salt_func):
@@ -240,6 +244,9 @@ class Handler(object):
         @return - Matched functions or None
 
         """
+        # Compound jobs have a list of functions and use the defaults
+        if not isinstance(salt_func, basestring):
+            salt_func = None
         suffix = self.handle_map.get(salt_func, 'default')
         handler_func_name = '_'.join([prefix, suffix])
         func = getattr(self, handler_func_name)
@@ -299,6 +306,17 @@ class Handler(object):
         msg_tuple = (pub_data['jid'], pub_data['minions'])
         print "Job %s: %s - Syncing states" % msg_tuple
 
+    def report_publish_sync_module(self, job, pub_data):
+        """
+        Report publisher for saltutil.sync_modules
+
+        @param job - SaltJob
+        @param pub_data - Dictionary containing job id and minions
+
+        """
+        msg_tuple = (pub_data['jid'], pub_data['minions'])
+        print "Job %s: %s - Syncing modules" % msg_tuple
+
     def report_publish_cmd_run(self, job, pub_data):
         """
         Report publisher for cmd.run, cmd.run_all
@@ -361,6 +379,15 @@ class Handler(object):
         """
         print "Job %s: %s - States synced" % (job.jid, list(job.minions))
 
+    def report_finish_sync_module(self, job):
+        """
+        Report finisher for saltutil.sync_modules
+
+        @param job - SaltJob
+
+        """
+        print "Job %s: %s - Modules synced" % (job.jid, list(job.minions))
+
     def report_finish_cmd_run(self, job):
         """
         Report finisher for cmd.run and cmd.run_all
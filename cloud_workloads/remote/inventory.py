@@ -0,0 +1,113 @@
+import hashlib
+import json
+import os
+
+
+def grains_hash(grains):
+    """
+    Hashes a grains dictionary. Must match workloads.grains_hash in the
+    custom execution module so that cached grains can be compared against
+    what the minion reports.
+
+    @param grains - Dictionary of grains
+    @return - String hex digest
+
+    """
+    return hashlib.sha1(json.dumps(grains, sort_keys=True)).hexdigest()
+
+
+def payload_size(ret):
+    """
+    Estimates the number of bytes a job return took to transfer.
+
+    @param ret - Job return
+    @return - Integer
+
+    """
+    return len(json.dumps(ret, default=str))
+
+
+class InventoryCache(object):
+    """
+    On disk cache of minion grains keyed by minion id. Each entry holds the
+    grains and their hash so that a minion only has to report its hash to
+    show that the cached grains are still current.
+
+    """
+
+    def __init__(self, path):
+        """
+        Inits the cache and loads whatever is on disk.
+
+        @param path - String path of the cache file
+
+        """
+        self.path = path
+        self.entries = self.load()
+
+    def load(self):
+        """
+        Loads cache entries from disk. A missing or unreadable cache file
+        gives an empty cache.
+
+        @return - Dictionary of entries keyed by minion id
+
+        """
+        try:
+            with open(self.path) as f:
+                entries = json.load(f)
+        except (IOError, ValueError):
+            return {}
+        if not isinstance(entries, dict):
+            return {}
+        return entries
+
+    def save(self):
+        """
+        Writes the cache to disk. The file is replaced atomically so an
+        interrupted run never leaves a truncated cache behind.
+
+        """
+        directory = os.path.dirname(os.path.abspath(self.path))
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        tmp_path = "%s.tmp" % self.path
+        with open(tmp_path, 'w') as f:
+            json.dump(self.entries, f)
+        os.rename(tmp_path, self.path)
+
+    def is_current(self, minion_id, hash_):
+        """
+        Checks whether the cached grains of a minion match a reported hash.
+
+        @param minion_id - String minion id
+        @param hash_ - String hash reported by the minion
+        @return - Boolean
+
+        """
+        entry = self.entries.get(minion_id)
+        return entry is not None and entry.get('hash') == hash_
+
+    def grains(self, minion_id):
+        """
+        Returns a copy of the cached grains of a minion.
+
+        @param minion_id - String minion id
+        @return - Dictionary of grains
+
+        """
+        return dict(self.entries[minion_id]['grains'])
+
+    def update(self, minion_id, grains, hash_=None):
+        """
+        Stores freshly fetched grains for a minion.
+
+        @param minion_id - String minion id
+        @param grains - Dictionary of grains
+        @param hash_ - String hash reported by the minion. Computed from the
+            grains if the minion could not report one.
+
+        """
+        if not isinstance(hash_, basestring) or len(hash_) != 40:
+            hash_ = grains_hash(grains)
+        self.entries[minion_id] = {'hash': hash_, 'grains': grains}
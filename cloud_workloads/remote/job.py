@@ -71,6 +71,8 @@ class SaltJob(object):
         self.minions = None
         # Minions that have finished so far
         self.finished_minions = set()
+        # Minions that have not returned yet
+        self.outstanding = set()
         # Response
         self.ret = {}
         # Events collected from salt
@@ -92,14 +94,13 @@ class SaltJob(object):
 
     def is_finished(self):
         """
-        Computes the difference between the set of expected minions and the
-        set of minions that have returned so far.  The job is finished when
-        there are no minions in the difference set.
+        The job is finished when every minion identified by the publish has
+        returned.
 
         @param return Boolean True for yes, Boolean false otherwise
 
         """
-        return self.minions.issubset(self.finished_minions)
+        return not self.outstanding
 
     def set_pub_data(self, pub_data):
         """
@@ -115,6 +116,7 @@ class SaltJob(object):
         # Set jid and minions
         self.jid = pub_data['jid']
         self.minions = set(pub_data['minions'])
+        self.outstanding = set(self.minions)
 
     def add_minion_return(self, raw):
         """
@@ -123,14 +125,64 @@ class SaltJob(object):
         considered part of the job's response
 
         @param raw - Dictionary representing event or minion return
+        @return - Boolean True if the return finished an outstanding minion
 
         """
-        if raw is not None:
-            # Save the event
-            self.events[raw['id']] = raw
-            if 'return' in raw:
-                self.finished_minions.add(raw['id'])
-                self.ret[raw['id']] = raw['return']
+        if raw is None:
+            return False
+
+        # Save the event
+        self.events[raw['id']] = raw
+        if 'return' not in raw:
+            return False
+
+        self.finished_minions.add(raw['id'])
+        self.ret[raw['id']] = raw['return']
+        if raw['id'] in self.outstanding:
+            self.outstanding.remove(raw['id'])
+            return True
+        return False
+
+    @property
+    def is_compound(self):
+        """
+        Whether the job runs several salt functions in one publish. Compound
+        jobs have a list of functions and a matching list of argument lists.
+
+        @return - Boolean
+
+        """
+        return isinstance(self.kwargs['fun'], (list, tuple))
+
+    def event_success(self, event):
+        """
+        Returns whether a minion's return was a success. Compound returns
+        carry a success flag per function.
+
+        @param event - Dictionary representing a minion return
+        @return - Boolean
+
+        """
+        success = event.get('success', False)
+        if isinstance(success, dict):
+            return all(success.values())
+        return success
+
+    def event_retcode(self, event):
+        """
+        Returns the retcode of a minion's return. Older salt leaves compound
+        returns without a retcode, which counts as 0 so they rely on their
+        success flags. Newer salt gives a retcode per function, reduced here
+        to the worst of them.
+
+        @param event - Dictionary representing a minion return
+        @return - Integer
+
+        """
+        retcode = event.get('retcode', 0 if self.is_compound else 1)
+        if isinstance(retcode, dict):
+            return max(retcode.values() or [0])
+        return retcode
 
     def validate_func(self):
         """
@@ -141,6 +193,8 @@ class SaltJob(object):
         @return - A validating function or None
 
         """
+        if self.is_compound:
+            return None
         salt_method = self.kwargs['fun']
         validate_name = self.validate_funcs.get(salt_method)
         if validate_name is not None:
@@ -161,13 +215,13 @@ class SaltJob(object):
             self.handler.handle_unfinished(self)
 
         # Checked that all events for the minion are success
-        if not all([e['success'] for e in self.events.itervalues()]):
+        if not all([self.event_success(e) for e in self.events.itervalues()]):
             self.handler.handle_unsuccessful(self)
 
         # Check all retcodes
         allcodes = set()
         for e in self.events.itervalues():
-            allcodes.add(e.get('retcode', 1))
+            allcodes.add(self.event_retcode(e))
         if len(allcodes.difference(self.goodcodes)) > 0:
             self.handler.handle_retcodes(self)
 
@@ -188,15 +242,43 @@ class SaltJob(object):
 
 
 class MultiJob(object):
+    """
+    Publishes salt jobs and dispatches their returns from the event
+    subscription of the client it publishes with.
 
-    def __init__(self):
+    Returns are routed to their SaltJob through a jid index. Outstanding
+    minions and jobs are counted as returns arrive so that checking for
+    completion never scans the tracked jobs.
+
+    Concurrent MultiJobs each hold their own subscription. Salt matches a
+    LocalClient's returns against its own subscription and a LocalClient
+    is not safe to share between threads, so subscriptions are reused
+    through the connection pool rather than shared between jobs in flight.
+
+    """
+
+    # Only job events are of interest. Filtering by tag prefix lets the
+    # event subscription skip everything else before it reaches dispatch.
+    tag_prefix = 'salt/job/'
+
+    # Longest single block on the event subscription in seconds. get_event
+    # returns as soon as an event arrives so this only bounds idle waits.
+    max_event_wait = 1.0
+
+    def __init__(self, client=None):
         """
         MultiJob constructor
 
+        @param client - Optional salt LocalClient to publish with and to
+            receive events from. A new one is created if not provided.
+
         """
         self._jobs = {}
-        self.client = salt.client.LocalClient(mopts=MASTER_OPTIONS)
+        self.client = client or salt.client.LocalClient(mopts=MASTER_OPTIONS)
         self.handler = Handler()
+        # Number of jobs and minions that have not finished yet
+        self.outstanding_jobs = 0
+        self.outstanding_minions = 0
 
     def add(self, job):
         """
@@ -212,6 +294,23 @@ class MultiJob(object):
         pub_data = self.client.run_job(**(job.kwargs))
         job.set_pub_data(pub_data)
         self._jobs[job.jid] = job
+        if job.is_finished():
+            # Nothing targeted, nothing to wait for
+            self.finish(job)
+        else:
+            self.outstanding_jobs += 1
+            self.outstanding_minions += len(job.outstanding)
+
+    def finish(self, job):
+        """
+        Reports a finished job and publishes the next job in its sequence.
+
+        @param job - Finished SaltJob
+
+        """
+        self.handler.handle_finish(job)
+        if job.chain:
+            self.add(job.chain)
 
     def is_finished(self):
         """
@@ -220,33 +319,31 @@ class MultiJob(object):
         @return - Boolean true for finished, Boolean false otherwise
 
         """
-        return all([job.is_finished() for job in self._jobs.itervalues()])
+        return self.outstanding_jobs == 0
 
-    def should_process_event(self, event):
+    def dispatch(self, event):
         """
-        Checks whether or not we need to process an event.
-        Events should have a jid and a return.
-        The jid should be a job belonging to this MultiJob
-        The job should not be finished yet.
+        Routes an event to the job it belongs to. Events without a jid or a
+        return, events for other jobs and repeated returns are ignored.
 
         @param event - Dictionary representing an event.
-        @return Boolean True for yes, False otherwise.
+        @return Boolean True if the event finished an outstanding minion
 
         """
-        jid = event.get('jid')
-        ret = event.get('return')
-        if jid is None or ret is None:
+        job = self._jobs.get(event.get('jid'))
+        if job is None or event.get('return') is None:
             return False
 
-        if jid not in self._jobs:
+        if not job.add_minion_return(event):
             return False
 
-        job = self._jobs[jid]
+        self.outstanding_minions -= 1
         if job.is_finished():
-            return False
+            self.outstanding_jobs -= 1
+            self.finish(job)
         return True
 
-    def wait(self, timeout):
+    def wait(self, timeout, validate=True):
         """
         Waits for all jobs so far to be finished. If a job finishes that is
         part of a sequence of jobs, the next job in the sequenced is
@@ -254,40 +351,29 @@ class MultiJob(object):
 
         @param timeout - Float or int describing number of seconds to wait
             in total before returning.
+        @param validate - Boolean. When False, returns whatever came back
+            without raising for unfinished or failed jobs.
         @return dict - Dictionary of responses
 
         """
-        start = time.time()
-        timeout_at = start + timeout
-        while True:
-
-            # Break on timeout
-            if time.time() > timeout_at:
+        timeout_at = time.time() + timeout
+        while not self.is_finished():
+            remaining = timeout_at - time.time()
+            if remaining <= 0:
                 break
 
-            # Listen for all events with tag set to ''.
-            # Need to be able to listen for multiple jobs.
-            event = self.client.event.get_event(tag='', wait=0.25)
-
-            # Check for no event received
-            if event is None:
-                continue
-
-            if self.should_process_event(event):
-                job = self._jobs[event.get('jid')]
-                job.add_minion_return(event)
-                if job.is_finished():
-                    self.handler.handle_finish(job)
-                    if job.chain:
-                        self.add(job.chain)
-
-            # Break on all jobs finished
-            if self.is_finished():
-                break
+            event = self.client.event.get_event(
+                wait=min(remaining, self.max_event_wait),
+                tag=self.tag_prefix
+            )
+            if event is not None:
+                self.dispatch(event)
 
         errors = []
         # Validate our jobs
         for jid, job in self._jobs.iteritems():
+            if not validate:
+                break
             try:
                 job.validate()
             except (UnfinishedException,
@@ -1,4 +1,7 @@
 import threading
+import time
+from collections import deque, OrderedDict
+from allocator import Allocation, Allocator
 
 
 class NoAvailableMinionException(Exception):
@@ -29,13 +32,37 @@ class LockedPoolException(Exception):
         super(LockedPoolException, self).__init__(msg)
 
 
+class Ticket(object):
+    """
+    A caller's place in line for MinionPool.acquire.
+
+    """
+
+    def __init__(self):
+        # (instances, same) asked for, known once the caller is acquiring
+        self.request = None
+        # Times a caller further back in line was served first
+        self.bypassed = 0
+
+
 class MinionPool(object):
     """
     Class that maintains a list of minions, reserved or otherwise and
     provides synchronized access to the list.
 
+    Free minions are kept in insertion ordered dicts keyed by minion id so
+    that handing out and taking back a minion is O(1).
+
     """
 
+    # Longest single wait on the condition in seconds. Keeps a waiting main
+    # thread responsive to KeyboardInterrupt.
+    max_wait = 1.0
+
+    # Times a waiting acquire may be passed by callers further back in line
+    # before they have to wait for it. 0 serves callers strictly in order.
+    max_bypass = 3
+
     def __init__(self, minions, reservations=None):
         """
         Initializes the minion pool.
@@ -45,13 +72,34 @@ class MinionPool(object):
 
         """
         self._lock = threading.Lock()
+        self._condition = threading.Condition(self._lock)
+        # Tickets of acquire calls waiting for minions, oldest first
+        self._waiters = deque()
         self.reservations = reservations or {}
 
-        self._regular = []
-        self._reserved = []
+        # Minion id to the first reserved role it belongs to
+        self._reserved_ids = {}
+        for role, ids in self.reservations.iteritems():
+            for id_ in ids:
+                self._reserved_ids.setdefault(id_, role)
+
+        self._regular = OrderedDict()
+        self._reserved = OrderedDict()
         for minion in minions:
             self.put_minion(minion)
 
+    def _put(self, minion):
+        """
+        Puts a minion into the pool. The lock must be held.
+
+        @param minion: Minion
+
+        """
+        if minion.id_ in self._reserved_ids:
+            self._reserved[minion.id_] = minion
+        else:
+            self._regular[minion.id_] = minion
+
     def put_minion(self, minion, blocking=True):
         """
         Puts the minion into the pool.
@@ -65,16 +113,24 @@ class MinionPool(object):
         if not locked:
             raise LockedPoolException()
         try:
-            for reservation, ids in self.reservations.iteritems():
-                if minion.id_ in ids:
-                    addto = self._reserved
-                    break
-            else:
-                addto = self._regular
-            addto.append(minion)
+            self._put(minion)
+            self._condition.notify_all()
         finally:
             self._lock.release()
 
+    def release(self, minions):
+        """
+        Puts minions back into the pool and wakes up anything waiting to
+        acquire minions.
+
+        @param minions: List of minions
+
+        """
+        with self._condition:
+            for minion in minions:
+                self._put(minion)
+            self._condition.notify_all()
+
     def _get_regular(self):
         """
         Returns a regular minion if available
@@ -83,8 +139,8 @@ class MinionPool(object):
         @return: Minion
 
         """
-        if len(self._regular) > 0:
-            return self._regular.pop(0)
+        if self._regular:
+            return self._regular.popitem(last=False)[1]
         raise NoAvailableMinionException()
 
     def _get_reserved(self, role):
@@ -100,9 +156,9 @@ class MinionPool(object):
         if ids is None:
             raise Exception("The role %s is not a reserved role." % role)
 
-        for i, minion in enumerate(self._reserved):
-            if minion.id_ in ids:
-                return self._reserved.pop(i)
+        for id_ in ids:
+            if id_ in self._reserved:
+                return self._reserved.pop(id_)
         raise NoAvailableMinionException(role=role)
 
     def get_minion(self, role=None, blocking=True):
@@ -127,6 +183,179 @@ class MinionPool(object):
             self._lock.release()
         return minion
 
+    def _allocate(self, instances, same=None):
+        """
+        Checks out minions for all instances or none. Instances without
+        requirements or preferences are filled in pool order without
+        looking at the rest of the pool. The lock must be held.
+
+        @param instances: List of instance configs or an integer count
+        @param same: Optional list of grain names all minions must share
+        @return: Allocation or None if the instances do not fit
+
+        """
+        if isinstance(instances, (int, long)):
+            instances = [{}] * instances
+        if len(instances) > len(self._regular):
+            return None
+
+        plain = not same and not any(
+            i.get('requires') or i.get('prefer') for i in instances)
+        if plain:
+            minions = [self._get_regular() for i in instances]
+            return Allocation(minions, {}, {'preferred': {}, 'waste': 0.0})
+
+        allocation = Allocator(self._regular.values()).assign(instances,
+                                                              same)
+        if allocation is not None:
+            for minion in allocation.minions:
+                del self._regular[minion.id_]
+        return allocation
+
+    def allocate(self, instances, same=None, blocking=True):
+        """
+        Checks out the best fitting regular minions for a set of instances.
+        Either minions for all instances are checked out or none are.
+
+        @param instances: List of instance configs, optionally with
+            'requires' and 'prefer' keys. See Allocator.
+        @param same: Optional list of grain names all minions must share
+        @param blocking: Boolean indicating whether or not to wait on a lock.
+        @raises LockedPoolException
+        @raises NoAvailableMinionException
+        @return: Allocation with minions in instance order
+
+        """
+        locked = self._lock.acquire(blocking)
+        if not locked:
+            raise LockedPoolException()
+        try:
+            allocation = self._allocate(instances, same)
+        finally:
+            self._lock.release()
+        if allocation is None:
+            raise NoAvailableMinionException()
+        return allocation
+
+    def _fits(self, instances, same=None):
+        """
+        Checks whether the free regular minions could satisfy a set of
+        instances right now without checking any out. The lock must be held.
+
+        @param instances: List of instance configs or an integer count
+        @param same: Optional list of grain names all minions must share
+        @return: Boolean
+
+        """
+        if isinstance(instances, (int, long)):
+            return instances <= len(self._regular)
+        if len(instances) > len(self._regular):
+            return False
+        allocation = Allocator(self._regular.values()).assign(instances,
+                                                              same)
+        return allocation is not None
+
+    def _may_serve(self, ticket):
+        """
+        Checks whether a caller may be served now. The first caller in line
+        always may. Others may only pass callers that cannot be served right
+        now and have been passed fewer than max_bypass times. The lock must
+        be held.
+
+        @param ticket: Ticket of the caller
+        @return: Boolean
+
+        """
+        for ahead in self._waiters:
+            if ahead is ticket:
+                return True
+            if ahead.request is None or ahead.bypassed >= self.max_bypass \
+                    or self._fits(*ahead.request):
+                return False
+        return False
+
+    def ticket(self):
+        """
+        Takes a place in line for a later acquire. Lets callers that start
+        acquiring from different threads keep the order they were
+        scheduled in.
+
+        @return: Ticket
+
+        """
+        ticket = Ticket()
+        with self._condition:
+            self._waiters.append(ticket)
+        return ticket
+
+    def acquire(self, instances, same=None, timeout=None, ticket=None):
+        """
+        Checks out minions for all instances at once, waiting until enough
+        suitable minions have been released. Callers are served in the order
+        they started waiting, except that a caller the free minions cannot
+        satisfy may be passed by callers behind it that they can, at most
+        max_bypass times. A caller never holds part of what it asked for, so
+        two callers can never deadlock each waiting on the other.
+
+        @param instances: Integer number of minions or a list of instance
+            configs, optionally with 'requires' and 'prefer' keys.
+        @param same: Optional list of grain names all minions must share
+        @param timeout: Seconds to wait. None waits forever, 0 does not wait.
+        @param ticket: Ticket from ticket() holding the caller's place in
+            line. A new place at the back is taken if not provided.
+        @raises NoAvailableMinionException on timeout
+        @return: Allocation with minions in instance order
+
+        """
+        wait_until = None if timeout is None else time.time() + timeout
+        with self._condition:
+            if ticket is None:
+                ticket = Ticket()
+                self._waiters.append(ticket)
+            ticket.request = (instances, same)
+            try:
+                while True:
+                    if self._may_serve(ticket):
+                        allocation = self._allocate(instances, same)
+                        if allocation is not None:
+                            for ahead in self._waiters:
+                                if ahead is ticket:
+                                    break
+                                ahead.bypassed += 1
+                            return allocation
+                    if wait_until is None:
+                        wait = self.max_wait
+                    else:
+                        remaining = wait_until - time.time()
+                        if remaining <= 0:
+                            raise NoAvailableMinionException()
+                        wait = min(remaining, self.max_wait)
+                    self._condition.wait(wait)
+            finally:
+                self._waiters.remove(ticket)
+                # The next caller in line may be able to go now
+                self._condition.notify_all()
+
+    def available(self):
+        """
+        Returns the number of regular minions currently in the pool.
+
+        @return: Integer
+
+        """
+        with self._lock:
+            return len(self._regular)
+
+    def free_minions(self):
+        """
+        Returns a snapshot of the regular minions currently in the pool.
+
+        @return: List of minions
+
+        """
+        with self._lock:
+            return self._regular.values()
+
     def get_info(self):
         """
         Returns a dictionary containing pool stats
@@ -135,8 +364,8 @@ class MinionPool(object):
 
         """
 
-        available_minions = ', '.join([m.id_ for m in self._regular])
-        reserved = ', '.join([m.id_ for m in self._reserved])
+        available_minions = ', '.join(self._regular.keys())
+        reserved = ', '.join(self._reserved.keys())
 
         return {
             'regular_available': len(self._regular),
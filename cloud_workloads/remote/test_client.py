@@ -0,0 +1,164 @@
+import unittest
+
+from client import Client
+from connection import Connection, ConnectionPool
+from handler import RetcodeException
+from job import SaltJob
+from minion import Minion
+
+
+class FakeEvent(object):
+    """Event bus subscription handing out queued minion returns."""
+
+    def __init__(self):
+        self.events = []
+
+    def get_event(self, wait=None, tag=None, **kwargs):
+        if self.events:
+            return self.events.pop(0)
+        return None
+
+    def fire_event(self, data, tag):
+        self.events.append({'tag': tag, 'data': data})
+        return True
+
+    def destroy(self):
+        pass
+
+
+class LocalClient(object):
+    """
+    Answers published jobs from canned pillar and network data the way the
+    targeted minions would.
+
+    """
+
+    def __init__(self, minions):
+        self.minions = minions
+        self.event = FakeEvent()
+        self.published = []
+
+    def call(self, id_, fun, args):
+        minion = self.minions[id_]
+        if fun == 'pillar.item':
+            return dict((key, minion['pillar'][key]) for key in args
+                        if key in minion['pillar'])
+        if fun == 'grains.item':
+            return dict((key, minion['grains'].get(key)) for key in args)
+        if fun == 'network.ipaddrs':
+            return minion['ipaddrs'].get(args[0], [])
+        raise ValueError(fun)
+
+    def run_job(self, tgt, fun, arg=(), expr_form='glob', **kwargs):
+        jid = str(len(self.published))
+        self.published.append((tgt, fun, arg))
+        ids = [id_ for id_ in tgt.split(',') if id_ in self.minions]
+        for id_ in ids:
+            if isinstance(fun, list):
+                ret = dict((f, self.call(id_, f, a))
+                           for f, a in zip(fun, arg))
+                success = dict((f, True) for f in fun)
+            else:
+                ret = self.call(id_, fun, arg)
+                success = True
+            self.event.events.append({'jid': jid, 'id': id_, 'return': ret,
+                                      'success': success, 'retcode': 0})
+        return {'jid': jid, 'minions': ids}
+
+
+class FakeConnectionPool(ConnectionPool):
+    def __init__(self, local_client):
+        super(FakeConnectionPool, self).__init__(opts={'fake': True})
+        self.local_client = local_client
+
+    def _connect(self):
+        connection = Connection.__new__(Connection)
+        connection.client = self.local_client
+        connection.stats = self.stats
+        connection.broken = False
+        connection.last_used = 0
+        return connection
+
+
+class TestClient(unittest.TestCase):
+
+    def setUp(self):
+        self.local_client = LocalClient({
+            'web': {'pillar': {'interfaces': {'public': 'eth0',
+                                              'private': 'eth1'}},
+                    'grains': {'num_cpus': 2},
+                    'ipaddrs': {'eth0': ['10.0.0.1', '10.0.0.2'],
+                                'eth1': ['192.168.0.1']}},
+            'db': {'pillar': {'interfaces': {'public': 'eth2'},
+                              'mysql': {'port': 3306}},
+                   'grains': {'num_cpus': 4},
+                   'ipaddrs': {'eth2': ['10.0.1.1'],
+                               'eth0': ['10.0.1.9']}}
+        })
+        self.client = Client(FakeConnectionPool(self.local_client))
+        self.minions = [Minion({'id': 'web'}), Minion({'id': 'db'})]
+
+    def test_facts(self):
+        facts = self.client.facts(self.minions, pillar=['mysql'],
+                                  grains=['num_cpus'])
+        self.assertEquals(facts['db']['pillar']['mysql'], {'port': 3306})
+        self.assertEquals(facts['web']['grains'], {'num_cpus': 2})
+        tgt, fun, arg = self.local_client.published[0]
+        self.assertEquals(sorted(tgt.split(',')), ['db', 'web'])
+        self.assertEquals(fun, ['pillar.item', 'grains.item'])
+
+        # Memoized facts are not asked for again
+        self.client.facts(self.minions[0], grains=['num_cpus'])
+        self.assertEquals(len(self.local_client.published), 1)
+
+        # Forgotten minions are asked again, on their own
+        self.client.forget(self.minions[0])
+        self.client.facts(self.minions)
+        self.assertEquals(self.local_client.published[1][0], 'web')
+
+    def test_get_ips(self):
+        ips = self.client.get_ips(self.minions)
+        self.assertEquals(ips, {'web': ['10.0.0.1', '10.0.0.2'],
+                                'db': ['10.0.1.1']})
+        # Facts plus one ipaddrs publish per interface name
+        self.assertEquals(len(self.local_client.published), 3)
+        self.assertEquals(
+            sorted(arg for tgt, fun, arg in self.local_client.published[1:]),
+            [('eth0',), ('eth2',)]
+        )
+
+        # Pillar without the interface falls back to the default
+        ips = self.client.get_ips(self.minions, interface='private')
+        self.assertEquals(ips, {'web': ['192.168.0.1'], 'db': ['10.0.1.9']})
+        self.assertEquals(len(self.local_client.published), 5)
+
+        # Repeated lookups are served from the memo
+        self.client.get_ips(self.minions)
+        self.assertEquals(len(self.local_client.published), 5)
+
+
+class TestSaltJob(unittest.TestCase):
+
+    funcs = ['test.ping', 'pillar.item']
+
+    def validate(self, retcode=None):
+        job = SaltJob({'fun': self.funcs, 'arg': [[], []], 'tgt': 'web'})
+        job.set_pub_data({'jid': '1', 'minions': ['web']})
+        event = {'id': 'web', 'return': {},
+                 'success': dict((func, True) for func in self.funcs)}
+        if retcode is not None:
+            event['retcode'] = retcode
+        job.add_minion_return(event)
+        job.validate()
+
+    def test_compound_retcodes(self):
+        # Without a retcode, with a scalar one and with one per function
+        self.validate()
+        self.validate(0)
+        self.validate({'test.ping': 0, 'pillar.item': 0})
+        self.assertRaises(RetcodeException, self.validate,
+                          {'test.ping': 0, 'pillar.item': 1})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import time
+import unittest
+
+from connection import Connection, ConnectionPool
+
+
+class FakeEvent(object):
+    """
+    Event bus subscription. A dead subscription accepts fired events but
+    never receives anything.
+
+    """
+
+    def __init__(self):
+        self.events = []
+        self.alive = True
+        self.destroyed = False
+
+    def get_event(self, wait=None, tag=None, full=False):
+        while self.events:
+            event = self.events.pop(0)
+            if tag is None or event['tag'].startswith(tag):
+                return event
+        return None
+
+    def fire_event(self, data, tag):
+        if self.alive:
+            self.events.append({'tag': tag, 'data': data})
+        return True
+
+    def destroy(self):
+        self.destroyed = True
+
+
+class LocalClient(object):
+    def __init__(self):
+        self.event = FakeEvent()
+
+
+class FakeConnectionPool(ConnectionPool):
+    def __init__(self):
+        super(FakeConnectionPool, self).__init__(opts={'fake': True})
+
+    def _connect(self):
+        self.stats.increment('connections')
+        connection = Connection.__new__(Connection)
+        connection.client = LocalClient()
+        connection.stats = self.stats
+        connection.broken = False
+        connection.last_used = time.time()
+        return connection
+
+
+class TestConnectionPool(unittest.TestCase):
+
+    def setUp(self):
+        self.pool = FakeConnectionPool()
+        self.pool.ping_timeout = 0
+
+    def test_reuse(self):
+        connection = self.pool.checkout()
+        self.pool.checkin(connection)
+        self.assertTrue(self.pool.checkout() is connection)
+        self.assertEquals(self.pool.stats['connections'], 1)
+
+    def test_drain(self):
+        connection = self.pool.checkout()
+        self.pool.checkin(connection)
+        # Events buffered while idle are discarded on checkout
+        connection.event.events = [{'tag': 'salt/job/%s' % i, 'data': {}}
+                                   for i in xrange(5)]
+        self.assertTrue(self.pool.checkout() is connection)
+        self.assertEquals(connection.event.events, [])
+
+    def test_dead_subscription(self):
+        connection = self.pool.checkout()
+        self.pool.checkin(connection)
+        connection.event.alive = False
+        replacement = self.pool.checkout()
+        self.assertFalse(replacement is connection)
+        self.assertTrue(connection.event.destroyed)
+        self.assertEquals(self.pool.stats['reconnects'], 1)
+
+    def test_prune(self):
+        connections = [self.pool.checkout() for i in xrange(2)]
+        self.pool.checkin(connections[0])
+        connections[0].last_used -= 2 * self.pool.max_idle
+        # Checking in anything closes connections idle for too long
+        self.pool.checkin(connections[1])
+        self.assertTrue(connections[0].event.destroyed)
+        self.assertFalse(connections[1].event.destroyed)
+        self.assertTrue(self.pool.checkout() is connections[1])
+
+
+if __name__ == '__main__':
+    unittest.main()
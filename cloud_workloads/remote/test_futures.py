@@ -0,0 +1,42 @@
+import threading
+import unittest
+
+from futures import Deferred, spawn
+
+
+class TestFutures(unittest.TestCase):
+
+    def test_spawn_base_exception(self):
+        def exit_():
+            raise SystemExit(1)
+        future = spawn(exit_)
+        self.assertRaises(SystemExit, future.result, 5)
+
+    def test_deferred_runs_in_waiting_thread(self):
+        threads = []
+
+        def work(value):
+            threads.append(threading.current_thread())
+            return value
+        deferred = Deferred(work, 1).then(lambda value: work(value + 1))
+        self.assertEquals(deferred.result(), 2)
+        self.assertEquals(threads, [threading.current_thread()] * 2)
+
+    def test_deferred_started(self):
+        threads = []
+        deferred = Deferred(
+            lambda: threads.append(threading.current_thread())).start()
+        deferred.result(5)
+        deferred.result()
+        self.assertEquals(len(threads), 1)
+        self.assertNotEqual(threads[0], threading.current_thread())
+
+    def test_deferred_exception(self):
+        def fail():
+            raise ValueError('failed')
+        deferred = Deferred(fail).then(lambda value: value)
+        self.assertRaises(ValueError, deferred.result)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,3 +1,5 @@
+import threading
+import time
 import unittest
 import uuid
 
@@ -5,8 +7,12 @@ from pool import MinionPool, NoAvailableMinionException, LockedPoolException
 
 
 class FakeMinion(object):
-    def __init__(self):
+    def __init__(self, **grains):
         self.id_ = str(uuid.uuid4())
+        self.grains = grains
+
+    def __getitem__(self, key):
+        return self.grains.get(key)
 
 
 class TestMinionPool(unittest.TestCase):
@@ -72,3 +78,174 @@ class TestMinionPool(unittest.TestCase):
         pool._lock.acquire()
         with self.assertRaises(LockedPoolException):
             pool.put_minion(minion1, blocking=False)
+
+    def test_allocate_in_order_without_requirements(self):
+        minions = [FakeMinion(), FakeMinion(), FakeMinion()]
+        pool = MinionPool(minions)
+        allocation = pool.allocate([{'roles': ['a']}, {'roles': ['b']}])
+        self.assertEquals([m.id_ for m in allocation.minions],
+                          [m.id_ for m in minions[:2]])
+        self.assertEquals(pool.available(), 1)
+
+    def test_allocate_requirements_and_preferences(self):
+        small = FakeMinion(num_cpus=1, mem_total=1024)
+        medium = FakeMinion(num_cpus=4, mem_total=8192)
+        large = FakeMinion(num_cpus=8, mem_total=16384)
+        pool = MinionPool([large, small, medium])
+        instances = [{'roles': ['master'], 'prefer': ['num_cpus']},
+                     {'roles': ['slave'], 'requires': {'num_cpus': 2}}]
+        allocation = pool.allocate(instances)
+        # The slave takes the tightest fit, leaving the largest minion for
+        # the master that prefers cpus
+        self.assertEquals([m.id_ for m in allocation.minions],
+                          [large.id_, medium.id_])
+        self.assertEquals(allocation.score['preferred'], {'num_cpus': 8})
+
+        with self.assertRaises(NoAvailableMinionException):
+            pool.allocate([{'requires': {'num_cpus': 2}}])
+        self.assertEquals(pool.available(), 1)
+
+    def test_allocate_preference_order(self):
+        # Alphabetically mem_total comes first, the instance puts num_cpus
+        # first
+        a1 = FakeMinion(cpu_model='a', num_cpus=8, mem_total=1024)
+        b1 = FakeMinion(cpu_model='b', num_cpus=2, mem_total=16384)
+        pool = MinionPool([b1, a1])
+        allocation = pool.allocate(
+            [{'prefer': ['num_cpus', 'mem_total']}], same=['cpu_model']
+        )
+        self.assertEquals(allocation.group, {'cpu_model': 'a'})
+
+    def test_allocate_reassigns(self):
+        # The first instance picks b for its cpus, which leaves the two zone
+        # instances a single minion unless it moves over to a
+        a = FakeMinion(disk='ssd', num_cpus=2)
+        b = FakeMinion(disk='ssd', zone='a', num_cpus=8)
+        c = FakeMinion(zone='a', num_cpus=2)
+        pool = MinionPool([a, b, c])
+        instances = [{'requires': {'disk': 'ssd'}, 'prefer': ['num_cpus']},
+                     {'requires': {'zone': 'a'}},
+                     {'requires': {'zone': 'a'}}]
+        allocation = pool.allocate(instances)
+        self.assertEquals([m.id_ for m in allocation.minions],
+                          [a.id_, c.id_, b.id_])
+        self.assertEquals(pool.available(), 0)
+
+    def test_allocate_same_group(self):
+        a1 = FakeMinion(cpu_model='a')
+        b1 = FakeMinion(cpu_model='b')
+        a2 = FakeMinion(cpu_model='a')
+        pool = MinionPool([a1, b1, a2])
+        allocation = pool.allocate([{}, {}], same=['cpu_model'])
+        self.assertEquals([m.id_ for m in allocation.minions],
+                          [a1.id_, a2.id_])
+        self.assertEquals(allocation.group, {'cpu_model': 'a'})
+        with self.assertRaises(NoAvailableMinionException):
+            pool.allocate([{}, {}], same=['cpu_model'])
+
+    def test_acquire_timeout(self):
+        pool = MinionPool([FakeMinion()])
+        with self.assertRaises(NoAvailableMinionException):
+            pool.acquire(2, timeout=0)
+        with self.assertRaises(NoAvailableMinionException):
+            pool.acquire(2, timeout=0.05)
+        self.assertEquals(pool.available(), 1)
+
+    def test_acquire_waits_for_release(self):
+        minions = [FakeMinion(), FakeMinion()]
+        pool = MinionPool(minions)
+        held = pool.acquire(2).minions
+        got = []
+        waiter = threading.Thread(
+            target=lambda: got.extend(pool.acquire(2, timeout=5).minions))
+        waiter.start()
+        time.sleep(0.05)
+        self.assertEquals(got, [])
+        pool.release(held)
+        waiter.join(5)
+        self.assertEquals(set(m.id_ for m in got),
+                          set(m.id_ for m in minions))
+
+    def test_acquire_fifo(self):
+        minions = [FakeMinion() for i in xrange(3)]
+        pool = MinionPool(minions)
+        pool.max_bypass = 0
+        held = pool.acquire(3).minions
+        order = []
+
+        def acquire(name, count):
+            allocation = pool.acquire(count, timeout=5)
+            order.append(name)
+            pool.release(allocation.minions)
+
+        first = threading.Thread(target=acquire, args=('first', 3))
+        first.start()
+        time.sleep(0.05)
+        second = threading.Thread(target=acquire, args=('second', 1))
+        second.start()
+        time.sleep(0.05)
+        # Releasing one minion would satisfy the second caller but the
+        # first caller is ahead of it in line
+        pool.release(held[:1])
+        time.sleep(0.05)
+        self.assertEquals(order, [])
+        pool.release(held[1:])
+        first.join(5)
+        second.join(5)
+        self.assertEquals(order, ['first', 'second'])
+
+    def test_acquire_bypass(self):
+        minions = [FakeMinion() for i in xrange(3)]
+        pool = MinionPool(minions)
+        held = pool.acquire(3).minions
+        order = []
+
+        def acquire(name, count):
+            allocation = pool.acquire(count, timeout=5)
+            order.append(name)
+            pool.release(allocation.minions)
+
+        first = threading.Thread(target=acquire, args=('first', 3))
+        first.start()
+        time.sleep(0.05)
+        second = threading.Thread(target=acquire, args=('second', 1))
+        second.start()
+        time.sleep(0.05)
+        # The first caller cannot be served with one minion so the second
+        # caller goes ahead of it
+        pool.release(held[:1])
+        second.join(5)
+        self.assertEquals(order, ['second'])
+        pool.release(held[1:])
+        first.join(5)
+        self.assertEquals(order, ['second', 'first'])
+
+    def test_acquire_bypass_bound(self):
+        minions = [FakeMinion() for i in xrange(2)]
+        pool = MinionPool(minions)
+        pool.max_bypass = 2
+        held = pool.acquire(1).minions
+        first = pool.ticket()
+        first.request = (2, None)
+        # Callers behind may pass the first caller twice
+        for i in xrange(2):
+            pool.release(pool.acquire(1, timeout=0).minions)
+        self.assertEquals(first.bypassed, 2)
+        with self.assertRaises(NoAvailableMinionException):
+            pool.acquire(1, timeout=0)
+        pool.release(held)
+        self.assertEquals(len(pool.acquire(2, timeout=0,
+                                           ticket=first).minions), 2)
+
+    def test_ticket_order(self):
+        pool = MinionPool([FakeMinion()])
+        held = pool.acquire(1).minions
+        first = pool.ticket()
+        # A caller that is not acquiring yet cannot be passed
+        with self.assertRaises(NoAvailableMinionException):
+            pool.acquire(1, timeout=0)
+        pool.release(held)
+        with self.assertRaises(NoAvailableMinionException):
+            pool.acquire(1, timeout=0)
+        self.assertEquals(len(pool.acquire(1, timeout=0,
+                                           ticket=first).minions), 1)
@@ -0,0 +1,125 @@
+import os
+import random
+import shutil
+import subprocess
+import tempfile
+import unittest
+
+import transfer
+from transfer import RemoteFile, TransferError, fetch, read_range
+
+
+class FakeMinion(object):
+    id_ = 'minion'
+
+
+class LocalClient(object):
+    """Runs commands in a local shell the way cmd.run_all would."""
+
+    def __init__(self):
+        self.commands = []
+
+    def cmd(self, minions, func, arg=(), **kwargs):
+        self.commands.append(arg[0])
+        process = subprocess.Popen(arg[0], shell=True,
+                                   stdout=subprocess.PIPE,
+                                   stderr=subprocess.PIPE)
+        stdout, stderr = process.communicate()
+        # Salt strips trailing whitespace from stdout
+        return {minions: {'stdout': stdout.rstrip(),
+                          'retcode': process.returncode}}
+
+
+class TestTransfer(unittest.TestCase):
+
+    def setUp(self):
+        rand = random.Random(7)
+        self.data = ''.join("REQUEST\t%s\t%s\n" % (i, rand.random())
+                            for i in xrange(20000))
+        fd, self.path = tempfile.mkstemp()
+        os.write(fd, self.data)
+        os.close(fd)
+        self.client = LocalClient()
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def remote_file(self, **kwargs):
+        return RemoteFile(self.client, FakeMinion(), self.path,
+                          chunk_size=4096, **kwargs)
+
+    def test_fetch(self):
+        self.assertEquals(fetch(self.client, FakeMinion(), self.path,
+                                chunk_size=4096), self.data)
+        # Compressed copy is removed once transferred
+        self.assertTrue(self.client.commands[-1].startswith('rm -f'))
+
+    def test_lines(self):
+        f = self.remote_file()
+        self.assertEquals(list(f), self.data.splitlines(True))
+        self.assertTrue(f.transferred < len(self.data))
+
+    def test_shell_quoting(self):
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, "simulation $(touch pwned) 'log")
+            with open(path, 'w') as f:
+                f.write(self.data)
+            cwd = os.getcwd()
+            os.chdir(directory)
+            try:
+                self.assertEquals(fetch(self.client, FakeMinion(), path),
+                                  self.data)
+                self.assertEquals(read_range(self.client, FakeMinion(), path,
+                                             10, 20), self.data[10:30])
+            finally:
+                os.chdir(cwd)
+            self.assertFalse(os.path.exists(os.path.join(directory,
+                                                         'pwned')))
+        finally:
+            shutil.rmtree(directory)
+
+    def test_read_and_readline(self):
+        f = self.remote_file()
+        self.assertEquals(f.readline(), self.data.splitlines(True)[0])
+        self.assertEquals(f.read(10), self.data.splitlines(True)[1][:10])
+        rest = f.read()
+        self.assertTrue(self.data.endswith(rest))
+        self.assertEquals(f.readline(), '')
+
+    def test_checksum_mismatch(self):
+        f = self.remote_file().open()
+        f.sha1 = '0' * 40
+        with self.assertRaises(TransferError):
+            f.read()
+
+    def test_zstd_without_zstandard(self):
+        zstandard = transfer.zstandard
+        transfer.zstandard = None
+        try:
+            f = self.remote_file(codec='zstd')
+            self.assertEquals(f.read(), self.data)
+            self.assertEquals(f.codec, 'gzip')
+        finally:
+            transfer.zstandard = zstandard
+
+    def test_read_range(self):
+        minion = FakeMinion()
+        self.assertEquals(read_range(self.client, minion, self.path, 100, 50),
+                          self.data[100:150])
+        self.assertEquals(read_range(self.client, minion, self.path,
+                                     len(self.data) - 5), self.data[-5:])
+        self.assertEquals(read_range(self.client, minion, self.path,
+                                     len(self.data)), '')
+
+    def test_read_range_checksum_mismatch(self):
+        cmd = self.client.cmd
+
+        def truncated(minions, func, arg=(), **kwargs):
+            # Cuts the response short, dropping the end of the range
+            resp = cmd(minions, func, arg, **kwargs)
+            resp[minions]['stdout'] = resp[minions]['stdout'][:-40]
+            return resp
+        self.client.cmd = truncated
+        with self.assertRaises(TransferError):
+            read_range(self.client, FakeMinion(), self.path, 100, 5000)
@@ -0,0 +1,307 @@
+import base64
+import binascii
+import hashlib
+import pipes
+import zlib
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Bytes of compressed data fetched per command
+DEFAULT_CHUNK_SIZE = 1 << 20
+
+# Compresses a file into a temporary file on the minion and prints the codec
+# used, the temporary file, its size and its sha1. Falls back to gzip when
+# zstd is not installed on the minion. Paths are substituted shell quoted.
+PREPARE_COMMAND = (
+    "tmp=$(mktemp /tmp/cloud-workloads-transfer.XXXXXX) || exit 1; "
+    "codec=gzip; "
+    "if [ %(codec)s = zstd ] && command -v zstd >/dev/null 2>&1; then "
+    "codec=zstd; fi; "
+    "if [ $codec = zstd ]; then zstd -q -c %(path)s > $tmp; "
+    "else gzip -c %(path)s > $tmp; fi || { rm -f $tmp; exit 1; }; "
+    "echo $codec $tmp $(wc -c < $tmp) $(sha1sum < $tmp | cut -d' ' -f1)")
+
+
+# Copies a byte range of a file that may still be growing into a temporary
+# file on the minion, then prints the sha1 of the range on one line and the
+# range gzipped and base64 encoded on the next.
+RANGE_COMMAND = (
+    "tmp=$(mktemp /tmp/cloud-workloads-range.XXXXXX) || exit 1; "
+    "tail -c +%(start)s %(path)s %(limit)s> $tmp || { rm -f $tmp; exit 1; }; "
+    "sha1sum < $tmp | cut -d' ' -f1; "
+    "gzip -c $tmp | base64 -w0; "
+    "rm -f $tmp")
+
+
+class TransferError(Exception):
+    """
+    Raised when a file arrives corrupted or cannot be transferred.
+
+    """
+    pass
+
+
+def decompressor(codec):
+    """
+    Returns an object that decompresses a stream chunk by chunk.
+
+    @param codec - 'gzip' or 'zstd'
+    @return - Object with a decompress method
+
+    """
+    if codec == 'zstd':
+        if zstandard is None:
+            raise TransferError("zstd transfers need the zstandard package")
+        return zstandard.ZstdDecompressor().decompressobj()
+    # Offsetting the window bits makes zlib expect and check gzip framing
+    return zlib.decompressobj(16 + zlib.MAX_WBITS)
+
+
+def decode(data, codec):
+    """
+    Decodes one base64 encoded, compressed blob.
+
+    @param data - String base64 data
+    @param codec - 'gzip' or 'zstd'
+    @return - String
+
+    """
+    try:
+        return decompressor(codec).decompress(base64.b64decode(data))
+    except (TypeError, binascii.Error, zlib.error) as e:
+        raise TransferError("Corrupt transfer: %s" % e)
+
+
+def read_range(client, minion, path, offset=0, limit=None, timeout=60):
+    """
+    Reads part of a file on a minion, gzipped in transit. Meant for files
+    that are still being written; reading past the end returns what is
+    there. The range is checked against its sha1 taken on the minion.
+
+    @param client - cloud_workloads.remote.client.Client
+    @param minion - Minion the file is on
+    @param path - String path of the file on the minion
+    @param offset - Integer byte offset to start at
+    @param limit - Integer most bytes to read. None reads to the end.
+    @param timeout - Integer seconds to wait for the minion
+    @raises TransferError
+    @return - String
+
+    """
+    command = RANGE_COMMAND % {
+        'start': offset + 1,
+        'path': pipes.quote(path),
+        'limit': '| head -c %s ' % limit if limit is not None else ''
+    }
+    resp = client.cmd(minion.id_,
+                      'cmd.run_all',
+                      arg=(command,),
+                      timeout=timeout)
+    out = resp.values()[0].get('stdout') or ''
+    sha1, _, encoded = out.partition('\n')
+    data = decode(encoded, 'gzip')
+    if hashlib.sha1(data).hexdigest() != sha1.strip():
+        raise TransferError("Checksum mismatch reading %s from %s" %
+                            (path, minion.id_))
+    return data
+
+
+class RemoteFile(object):
+    """
+    Read only file object over a file on a minion. The file is compressed
+    on the minion once, then fetched in base64 encoded chunks as it is
+    read and decompressed on the fly, so neither side holds the whole file
+    in memory. The sha1 of the compressed data is checked once the last
+    chunk arrives.
+
+    Usage:
+        with RemoteFile(client, minion, '/path/simulation.log') as f:
+            stats.update(f)
+
+    """
+
+    def __init__(self,
+                 client,
+                 minion,
+                 path,
+                 codec='gzip',
+                 chunk_size=DEFAULT_CHUNK_SIZE,
+                 timeout=60):
+        """
+        @param client - cloud_workloads.remote.client.Client
+        @param minion - Minion the file is on
+        @param path - String path of the file on the minion
+        @param codec - 'gzip' or 'zstd'. zstd is only used when the
+            zstandard package is installed here and zstd on the minion.
+        @param chunk_size - Integer bytes of compressed data per command
+        @param timeout - Integer seconds to wait for each command
+
+        """
+        self.client = client
+        self.minion = minion
+        self.path = path
+        self.codec = codec if zstandard is not None else 'gzip'
+        self.chunk_size = chunk_size
+        self.timeout = timeout
+        # Set once the file has been compressed on the minion
+        self.tmp = None
+        self.size = None
+        self.sha1 = None
+        self.transferred = 0
+        self._chunks = None
+        # Decompressed data not read yet starts at _pos in _buffer
+        self._buffer = ''
+        self._pos = 0
+
+    def run(self, command):
+        """
+        Runs a shell command on the minion.
+
+        @param command - String command
+        @return - String stdout
+
+        """
+        resp = self.client.cmd(self.minion.id_,
+                               'cmd.run_all',
+                               arg=(command,),
+                               timeout=self.timeout)
+        return resp.values()[0].get('stdout') or ''
+
+    def open(self):
+        """
+        Compresses the file on the minion. Called on the first read.
+
+        @return - self
+
+        """
+        if self._chunks is None:
+            out = self.run(PREPARE_COMMAND % {
+                'codec': self.codec,
+                'path': pipes.quote(self.path)
+            })
+            try:
+                codec, tmp, size, sha1 = out.split()
+            except ValueError:
+                raise TransferError("Unable to compress %s on %s: %s" %
+                                    (self.path, self.minion.id_, out))
+            self.codec = codec
+            self.tmp = tmp
+            self.size = int(size)
+            self.sha1 = sha1
+            self._chunks = self.chunks()
+        return self
+
+    def chunks(self):
+        """
+        Fetches and decompresses the file chunk by chunk.
+
+        @return - Generator of strings
+
+        """
+        digest = hashlib.sha1()
+        decompress = decompressor(self.codec)
+        for i in xrange((self.size + self.chunk_size - 1) //
+                        self.chunk_size):
+            data = self.run("dd if=%s bs=%s skip=%s count=1 2>/dev/null | "
+                            "base64 -w0" % (self.tmp, self.chunk_size, i))
+            try:
+                data = base64.b64decode(data)
+                digest.update(data)
+                self.transferred += len(data)
+                yield decompress.decompress(data)
+            except (TypeError, binascii.Error, zlib.error) as e:
+                raise TransferError("Corrupt chunk %s of %s: %s" %
+                                    (i, self.path, e))
+        if self.transferred != self.size or digest.hexdigest() != self.sha1:
+            raise TransferError("Checksum mismatch transferring %s from %s" %
+                                (self.path, self.minion.id_))
+        self.close()
+
+    def _fill(self, size=None, stop=None):
+        """
+        Reads chunks into the buffer until it holds size unread bytes or the
+        stop string, or the file ends.
+
+        """
+        self.open()
+        while (size is None or len(self._buffer) - self._pos < size) and \
+                (stop is None or self._buffer.find(stop, self._pos) < 0):
+            try:
+                data = next(self._chunks)
+            except StopIteration:
+                return
+            self._buffer = self._buffer[self._pos:] + data
+            self._pos = 0
+
+    def _take(self, end):
+        """
+        Returns the unread buffer up to end and marks it read.
+
+        """
+        data = self._buffer[self._pos:end]
+        self._pos = min(end, len(self._buffer))
+        return data
+
+    def read(self, size=-1):
+        """
+        @param size - Integer bytes to read. Negative reads everything.
+        @return - String
+
+        """
+        if size < 0:
+            self._fill()
+            return self._take(len(self._buffer))
+        self._fill(size=size)
+        return self._take(self._pos + size)
+
+    def readline(self):
+        """
+        @return - String line including its newline, '' at the end
+
+        """
+        self._fill(stop='\n')
+        end = self._buffer.find('\n', self._pos) + 1 or len(self._buffer)
+        return self._take(end)
+
+    def __iter__(self):
+        self.open()
+        remainder = self._take(len(self._buffer))
+        for data in self._chunks:
+            lines = (remainder + data).split('\n')
+            remainder = lines.pop()
+            for line in lines:
+                yield line + '\n'
+        if remainder:
+            yield remainder
+
+    def close(self):
+        """
+        Removes the compressed copy from the minion.
+
+        """
+        if self.tmp is not None:
+            self.run("rm -f %s" % self.tmp)
+            self.tmp = None
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def fetch(client, minion, path, **kwargs):
+    """
+    Reads a whole file from a minion. See RemoteFile.
+
+    @param client - cloud_workloads.remote.client.Client
+    @param minion - Minion the file is on
+    @param path - String path of the file on the minion
+    @return - String contents
+
+    """
+    with RemoteFile(client, minion, path, **kwargs) as f:
+        return f.read()
@@ -1,3 +1,4 @@
+import json
 from common.view import ExceptionView, View
 from meta import version
 
@@ -8,10 +9,12 @@ class HtmlRenderer(str):
 
     """
 
-    def __new__(self, workloads):
+    def __new__(self, workloads, summary=None):
         """
         Returns a string that is the rendered html document.
 
+        @param workloads - List of completed workloads
+        @param summary - Optional dict describing the run as a whole
         @return - String
         """
 
@@ -44,5 +47,30 @@ class HtmlRenderer(str):
             'main.html',
             version=version,
             primitives=primitives,
-            workloads=zip(other_names, other_views)
+            workloads=zip(other_names, other_views),
+            summary=summary or {}
         )
+
+
+class JsonRenderer(str):
+    """
+    Renders the results of a list of completed workloads as a JSON document
+    for other tools to consume.
+
+    """
+
+    def __new__(self, workloads, summary=None):
+        """
+        Returns a string that is the JSON document. Values that do not
+        serialize to JSON are written as strings.
+
+        @param workloads - List of completed workloads
+        @param summary - Optional dict describing the run as a whole
+        @return - String
+        """
+        return json.dumps({
+            'version': version,
+            'summary': summary or {},
+            'workloads': dict((workload.name, workload.export())
+                              for workload in workloads)
+        }, indent=2, sort_keys=True, default=str)
@@ -1,9 +1,12 @@
 import collections
+import time
 import traceback
 from remote.client import Client
+from remote.inventory import InventoryCache
 from remote.pool import MinionPool
 from remote.job import MultiJobException
 from remote.pool import NoAvailableMinionException
+from scheduler import ConcurrentScheduler, PipelineScheduler
 
 
 class MissingWorkloadModuleError(Exception):
@@ -56,6 +59,7 @@ class Runner(object):
         self.views = collections.OrderedDict()
         self.workloads = []
         self.primitives_view = None
+        self.summary = {}
 
     def run(self):
         """
@@ -72,16 +76,23 @@ class Runner(object):
 
         try:
             print "Setting up the pool"
-            minions = client.minions(pool_config['target'],
-                                     pool_config['expr_form'],
-                                     timeout=5)
+            minions = self.inventory(client, pool_config)
             pool = MinionPool(minions)
 
-            for name, workload_config in self.config.iter_workloads():
-                class_name = workload_config.get('workload')
-                workload_class = load_workload_class(class_name)
-                workload = workload_class(client, pool, workload_config)
-                self.run_workload(workload)
+            mode = self.config.get_scheduler()['mode']
+            self.summary['mode'] = mode
+            start = time.time()
+            if mode == 'concurrent':
+                self.run_scheduled(ConcurrentScheduler(pool, self),
+                                   client, pool)
+            elif mode == 'pipelined':
+                self.run_scheduled(PipelineScheduler(pool, self),
+                                   client, pool)
+            else:
+                for workload in self.iter_workloads(client, pool):
+                    self.run_workload(workload)
+            self.summarize(time.time() - start)
+            self.summary.update(client.connections.stats)
 
         except KeyboardInterrupt:
             print ("Exit requested. !!Warning, there may be left over"
@@ -92,11 +103,106 @@ class Runner(object):
             print "Stopping due to exception"
             traceback.print_exc()
 
-    def run_workload(self, workload):
+    def inventory(self, client, pool_config):
         """
-        Deploys, Runs, then Undeploys the workload
+        Builds the list of minions for the pool, through the inventory cache
+        when one is configured, and records how long it took and how much
+        grains data was transferred.
+
+        @param client - Client
+        @param pool_config - Dictionary minion pool config
+        @return - List of minions
+
+        """
+        cache_path = pool_config.get('inventory_cache')
+        cache = InventoryCache(cache_path) if cache_path else None
+        start = time.time()
+        minions, stats = client.inventory(pool_config['target'],
+                                          pool_config['expr_form'],
+                                          cache=cache,
+                                          timeout=5)
+        self.summary.update({
+            'startup': round(time.time() - start, 2),
+            'inventory_cached': stats['cached'],
+            'inventory_fetched': stats['fetched'],
+            'inventory_bytes': stats['bytes'],
+            'unresponsive': stats['unresponsive']
+        })
+        print ("Found %s minions in %ss (%s cached, %s fetched, %s bytes of "
+               "grains transferred)") % (len(minions),
+                                         self.summary['startup'],
+                                         stats['cached'],
+                                         stats['fetched'],
+                                         stats['bytes'])
+        return minions
+
+    def iter_workloads(self, client, pool):
+        """
+        Generator for workloads described in the config.
+
+        @param client - Client
+        @param pool - MinionPool
+        @yield Workload
+
+        """
+        for name, workload_config in self.config.iter_workloads():
+            class_name = workload_config.get('workload')
+            workload_class = load_workload_class(class_name)
+            yield workload_class(client, pool, workload_config)
+
+    def run_scheduled(self, scheduler, client, pool):
+        """
+        Hands all workloads to a scheduler. Results are kept in config order.
+
+        @param scheduler - ConcurrentScheduler or PipelineScheduler
+        @param client - Client
+        @param pool - MinionPool
+
+        """
+        workloads = list(self.iter_workloads(client, pool))
+        scheduler.run(workloads)
+        self.workloads.sort(key=workloads.index)
+
+    def summarize(self, wall_clock):
+        """
+        Records how long the run took against how long the same phases
+        would have taken back to back.
+
+        @param wall_clock - Float number of seconds the run took
+
+        """
+        serial = sum(sum(w.timings.values()) for w in self.workloads)
+        self.summary.update({
+            'wall_clock': round(wall_clock, 2),
+            'serial_estimate': round(serial, 2),
+            'saved': round(max(serial - wall_clock, 0), 2)
+        })
+        print "Run took %(wall_clock)ss, %(saved)ss saved by %(mode)s " \
+            "scheduling" % self.summary
+
+    def timed(self, workload, phase, func):
+        """
+        Calls func and records how long it took in the workload's timings.
+
+        @param workload - Workload
+        @param phase - String name of the phase ('deploy', 'run', etc)
+        @param func - Callable
+        @return - Whatever func returns
+
+        """
+        start = time.time()
+        try:
+            return func()
+        finally:
+            workload.timings[phase] = time.time() - start
+
+    def deploy_workload(self, workload):
+        """
+        Deploys the workload.
 
         @param workload - An object that subclasses workload
+        @return - Boolean True if deployed, False if a salt job problem was
+            recorded on the workload
 
         """
         # Simple display output to help break up wall of text
@@ -104,18 +210,60 @@ class Runner(object):
         title = ("---- Running workload %s " % workload.name)
         print title.ljust(80, '-')
         print "-".ljust(80, '-')
+        return self._phase(workload, 'deploy', workload.deploy)
+
+    def measure_workload(self, workload):
+        """
+        Runs the workload.
+
+        @param workload - An object that subclasses workload
+        @return - Boolean True if run, False if a salt job problem was
+            recorded on the workload
+
+        """
+        return self._phase(workload, 'run', workload.run)
+
+    def undeploy_workload(self, workload):
+        """
+        Undeploys the workload.
+
+        @param workload - An object that subclasses workload
+
+        """
+        self.timed(workload, 'undeploy', workload.undeploy)
 
+    def _phase(self, workload, phase, func):
+        """
+        Runs a timed phase, saving the trace of salt job related exceptions.
+
+        @param workload - An object that subclasses workload
+        @param phase - String name of the phase
+        @param func - Callable
+        @return - Boolean True for success, False otherwise
+
+        """
         try:
-            workload.deploy()
-            workload.run()
+            self.timed(workload, phase, func)
+            return True
 
         # Catch salt job related exceptions
         except (MultiJobException, NoAvailableMinionException) as e:
             print "Multi job problem found. need to save the trace"
             workload.data_dict['exception_trace'] = traceback.format_exc()
             print e
+            return False
 
+    def run_workload(self, workload):
+        """
+        Deploys, Runs, then Undeploys the workload
+
+        @param workload - An object that subclasses workload
+
+        """
+        try:
+            if self.deploy_workload(workload):
+                self.measure_workload(workload)
         finally:
-            workload.undeploy()
+            self.undeploy_workload(workload)
 
         self.workloads.append(workload)
@@ -0,0 +1,233 @@
+import Queue
+import threading
+import traceback
+from remote.allocator import Allocator
+from remote.pool import MinionPool
+
+
+class Scheduler(object):
+    """
+    Base class for schedulers that check out disjoint sets of minions from a
+    shared minion pool and hand them to workloads through a private pool.
+
+    """
+
+    # Seconds to wait on a thread before checking again.
+    # Keeps the main thread responsive to KeyboardInterrupt.
+    poll_interval = 1.0
+
+    def __init__(self, pool, runner):
+        """
+        Inits the scheduler.
+
+        @param pool - Shared MinionPool
+        @param runner - Runner that deploys, runs and undeploys workloads
+
+        """
+        self.pool = pool
+        self.runner = runner
+        # Every minion the pool will ever hold, free or not
+        self.inventory = Allocator(pool.free_minions())
+
+    def fits(self, workload):
+        """
+        Checks whether the pool could ever satisfy a workload's instances,
+        requirements included.
+
+        @param workload - Workload
+        @return - Boolean
+
+        """
+        allocation = self.inventory.assign(
+            workload.config.get('instances', []),
+            workload.config.get('same'))
+        return allocation is not None
+
+    def checkout(self, workload, ticket=None):
+        """
+        Checks out the best fitting minions for a workload and gives the
+        workload a private pool holding only those minions. Blocks until the
+        shared pool can provide them. Workloads are served in the order they
+        ask, or in the order of their tickets, except that smaller workloads
+        may go ahead of one still waiting for minions. See
+        MinionPool.acquire.
+
+        A workload the pool could never satisfy is given no minions at all
+        so that it fails the same way it would when run sequentially.
+
+        @param workload - Workload
+        @param ticket - Optional Ticket from the shared pool holding the
+            workload's place in line
+        @return - List of minions
+
+        """
+        if not self.fits(workload):
+            minions = []
+        else:
+            allocation = self.pool.acquire(
+                workload.config.get('instances', []),
+                workload.config.get('same'),
+                ticket=ticket)
+            minions = allocation.minions
+        workload.pool = MinionPool(minions)
+        return minions
+
+    def checkin(self, minions):
+        """
+        Returns minions to the shared pool, waking up anything waiting on
+        them.
+
+        @param minions - List of minions
+
+        """
+        self.pool.release(minions)
+
+    def start_thread(self, target, *args):
+        """
+        Starts a daemon thread.
+
+        @param target - Callable
+        @return - threading.Thread
+
+        """
+        thread = threading.Thread(target=target, args=args)
+        thread.daemon = True
+        thread.start()
+        return thread
+
+    def join(self, threads):
+        """
+        Waits for all threads to finish.
+
+        @param threads - List of threads
+
+        """
+        for thread in threads:
+            while thread.is_alive():
+                thread.join(self.poll_interval)
+
+
+class ConcurrentScheduler(Scheduler):
+    """
+    Runs workloads in parallel threads. Each workload is packed onto its own
+    disjoint set of minions. Workloads wait for minions in config order and
+    each starts as soon as the pool can provide its minions. A workload may
+    start ahead of an earlier one the free minions cannot satisfy yet.
+
+    """
+
+    def run(self, workloads):
+        """
+        Runs all workloads and returns once all of them have finished.
+
+        @param workloads - List of workloads in the order they should be
+            started
+
+        """
+        threads = []
+        for workload in workloads:
+            # Places in line are taken here so that config order holds no
+            # matter which thread starts acquiring first
+            ticket = self.pool.ticket() if self.fits(workload) else None
+            threads.append(self.start_thread(self._run, workload, ticket))
+        self.join(threads)
+
+    def _run(self, workload, ticket):
+        """
+        Thread target. Checks out minions for the workload, runs it and
+        then returns its minions to the shared pool.
+
+        @param workload - Workload
+        @param ticket - Ticket holding the workload's place in line or None
+
+        """
+        minions = []
+        try:
+            minions = self.checkout(workload, ticket)
+            self.runner.run_workload(workload)
+        except Exception:
+            print "Unexpected exception running %s" % workload.name
+            traceback.print_exc()
+        finally:
+            self.checkin(minions)
+
+
+class PipelineScheduler(Scheduler):
+    """
+    Runs workloads through three overlapping stages. Workload N+1 deploys on
+    free minions while workload N is measured, and workload N undeploys in
+    the background once its measurement ends.
+
+    Only one workload is measured at a time and only one workload is deployed
+    ahead of it. Deploys and undeploys only ever touch minions checked out for
+    their own workload, never those of the workload being measured.
+
+    """
+
+    def __init__(self, pool, runner):
+        super(PipelineScheduler, self).__init__(pool, runner)
+        self._measure_queue = Queue.Queue()
+        self._undeploy_queue = Queue.Queue()
+        # Released when a deployed workload starts being measured
+        self._ahead = threading.Semaphore(1)
+
+    def run(self, workloads):
+        """
+        Runs all workloads and returns once all of them have been undeployed.
+
+        @param workloads - List of workloads in the order they are measured
+
+        """
+        self.join([
+            self.start_thread(self._deploy_stage, workloads),
+            self.start_thread(self._measure_stage),
+            self.start_thread(self._undeploy_stage)
+        ])
+
+    def _guard(self, workload, func):
+        """
+        Calls func, recording unexpected exceptions on the workload instead
+        of letting them stall the pipeline.
+
+        @param workload - Workload
+        @param func - Callable returning a Boolean
+        @return - Boolean returned by func or False on exception
+
+        """
+        try:
+            return func(workload)
+        except Exception:
+            print "Unexpected exception running %s" % workload.name
+            workload.data_dict['exception_trace'] = traceback.format_exc()
+            traceback.print_exc()
+            return False
+
+    def _deploy_stage(self, workloads):
+        for workload in workloads:
+            self._ahead.acquire()
+            minions = self.checkout(workload)
+            deployed = self._guard(workload, self.runner.deploy_workload)
+            self._measure_queue.put((workload, minions, deployed))
+        self._measure_queue.put(None)
+
+    def _measure_stage(self):
+        while True:
+            item = self._measure_queue.get()
+            self._ahead.release()
+            if item is None:
+                break
+            workload, minions, deployed = item
+            if deployed:
+                self._guard(workload, self.runner.measure_workload)
+            self._undeploy_queue.put((workload, minions))
+        self._undeploy_queue.put(None)
+
+    def _undeploy_stage(self):
+        while True:
+            item = self._undeploy_queue.get()
+            if item is None:
+                break
+            workload, minions = item
+            self._guard(workload, self.runner.undeploy_workload)
+            self.runner.workloads.append(workload)
+            self.checkin(minions)
@@ -0,0 +1,186 @@
+import threading
+import time
+import unittest
+import uuid
+
+from remote.pool import MinionPool
+from scheduler import ConcurrentScheduler, PipelineScheduler
+
+
+class FakeMinion(object):
+    def __init__(self, **grains):
+        self.id_ = str(uuid.uuid4())
+        self.grains = grains
+
+    def __getitem__(self, key):
+        return self.grains.get(key)
+
+
+class FakeWorkload(object):
+    def __init__(self, name, count, until=None):
+        self.name = name
+        self.config = {'instances': [{'roles': ['role']}] * count}
+        self.data_dict = {}
+        self.pool = None
+        # Event the workload waits for while it runs
+        self.until = until
+
+
+class FakeRunner(object):
+    """Records the order workloads are run in and what they ran on."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.events = []
+        self.minions = {}
+        self.workloads = []
+        self.measuring = 0
+        self.overlapped = False
+
+    def record(self, event, workload):
+        with self.lock:
+            self.events.append((event, workload.name))
+
+    def run_workload(self, workload):
+        self.record('start', workload)
+        self.minions[workload.name] = workload.pool.free_minions()
+        if workload.until is not None:
+            workload.until.wait(5)
+        self.record('end', workload)
+
+    def deploy_workload(self, workload):
+        self.record('deploy', workload)
+        self.minions[workload.name] = workload.pool.free_minions()
+        return True
+
+    def measure_workload(self, workload):
+        with self.lock:
+            self.measuring += 1
+            self.overlapped = self.overlapped or self.measuring > 1
+        self.record('measure', workload)
+        with self.lock:
+            self.measuring -= 1
+        return True
+
+    def undeploy_workload(self, workload):
+        self.record('undeploy', workload)
+        return True
+
+
+class OverlapRunner(FakeRunner):
+    """
+    Holds each measurement until the next workload has been deployed, then
+    gives any further deploy time to start too early.
+    """
+
+    def __init__(self):
+        super(OverlapRunner, self).__init__()
+        self.deployed = {}
+        # Workloads deployed but not yet measured
+        self.ahead = 0
+        self.max_ahead = 0
+        self.overlaps = []
+
+    def deploy_workload(self, workload):
+        with self.lock:
+            self.ahead += 1
+            self.max_ahead = max(self.max_ahead, self.ahead)
+        self.deployed[workload.name].set()
+        return super(OverlapRunner, self).deploy_workload(workload)
+
+    def measure_workload(self, workload):
+        with self.lock:
+            self.ahead -= 1
+        following = workload.following
+        if following is not None:
+            if self.deployed[following].wait(5):
+                self.overlaps.append((workload.name, following))
+            time.sleep(0.1)
+        return super(OverlapRunner, self).measure_workload(workload)
+
+
+class TestConcurrentScheduler(unittest.TestCase):
+
+    def setUp(self):
+        self.pool = MinionPool([FakeMinion() for i in xrange(3)])
+        self.runner = FakeRunner()
+        self.scheduler = ConcurrentScheduler(self.pool, self.runner)
+
+    def test_disjoint(self):
+        workloads = [FakeWorkload(name, 1) for name in 'abc']
+        self.scheduler.run(workloads)
+        ids = [m.id_ for name in 'abc' for m in self.runner.minions[name]]
+        self.assertEquals(len(set(ids)), 3)
+        self.assertEquals(self.pool.available(), 3)
+
+    def test_bypass(self):
+        # 'small' fits next to 'first' while 'big' waits for every minion.
+        # 'first' only finishes once 'small' has run.
+        done = threading.Event()
+        workloads = [FakeWorkload('first', 2, until=done),
+                     FakeWorkload('big', 3),
+                     FakeWorkload('small', 1)]
+        original = self.runner.run_workload
+
+        def run_workload(workload):
+            original(workload)
+            if workload.name == 'small':
+                done.set()
+        self.runner.run_workload = run_workload
+
+        self.scheduler.run(workloads)
+        self.assertTrue(done.is_set())
+        events = self.runner.events
+        self.assertTrue(events.index(('end', 'small')) <
+                        events.index(('end', 'first')))
+        self.assertTrue(events.index(('end', 'first')) <
+                        events.index(('start', 'big')))
+        self.assertEquals(len(self.runner.minions['big']), 3)
+
+    def test_never_fits(self):
+        self.scheduler.run([FakeWorkload('huge', 4)])
+        self.assertEquals(self.runner.minions['huge'], [])
+        self.assertEquals(self.pool.available(), 3)
+
+
+class TestPipelineScheduler(unittest.TestCase):
+
+    def test_order(self):
+        pool = MinionPool([FakeMinion() for i in xrange(4)])
+        runner = FakeRunner()
+        workloads = [FakeWorkload(name, 2) for name in 'abc']
+        PipelineScheduler(pool, runner).run(workloads)
+
+        self.assertEquals([w.name for w in runner.workloads], ['a', 'b', 'c'])
+        self.assertFalse(runner.overlapped)
+        for name in 'abc':
+            stages = [event for event, workload in runner.events
+                      if workload == name]
+            self.assertEquals(stages, ['deploy', 'measure', 'undeploy'])
+        # A workload is deployed ahead of the one being measured on
+        # different minions
+        a = set(m.id_ for m in runner.minions['a'])
+        b = set(m.id_ for m in runner.minions['b'])
+        self.assertFalse(a & b)
+        self.assertEquals(pool.available(), 4)
+
+    def test_overlap(self):
+        pool = MinionPool([FakeMinion() for i in xrange(4)])
+        runner = OverlapRunner()
+        workloads = [FakeWorkload(name, 1) for name in 'abcd']
+        for workload, following in zip(workloads, 'bcd' + ' '):
+            workload.following = following.strip() or None
+            runner.deployed[workload.name] = threading.Event()
+        PipelineScheduler(pool, runner).run(workloads)
+
+        # Each workload is deployed while the one before it is measured,
+        # and never more than one workload is deployed ahead
+        self.assertEquals(runner.overlaps, [('a', 'b'), ('b', 'c'),
+                                            ('c', 'd')])
+        self.assertEquals(runner.max_ahead, 1)
+        self.assertFalse(runner.overlapped)
+        self.assertEquals(pool.available(), 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -81,4 +81,8 @@ class Workload(GatlingWorkload):
                 'active_sessions_per_second_plot': active_sessions_plot,
                 'response_times_plot': run['stats'].response_times_plot
             })
+            self.data_dict.update(self.latency_data(run['stats']))
+            self.data_dict['search_path'] = self.search_path
+            self.data_dict['injectors'] = self.injector_data(run)
+            self.data_dict.update(self.steady_data(run))
         return self.data_dict
@@ -1,6 +1,92 @@
 import cStringIO
 import os
+import re
+from cloud_workloads.common.mixlog import DEFAULT_STEADY, MixLog
+from cloud_workloads.common.mixlog import TRANSACTIONS
+from cloud_workloads.common.search import GoldenSectionSearch, LinearSearch
+from cloud_workloads.common.search import knee
+from cloud_workloads.common.steady import rebucket, window_markers
 from cloud_workloads.common.workload import Workload as BaseWorkload
+from cloud_workloads.remote.futures import gather
+from cloud_workloads.remote.handler import BaseJobException
+from cloud_workloads.remote.transfer import RemoteFile, TransferError
+
+# Search settings used unless overridden by the 'search' config value
+DEFAULT_SEARCH = {
+    # linear adds one warehouse per iteration until NOTPM gains less than
+    # mindelta. golden doubles the warehouses until NOTPM drops, then
+    # narrows down the peak by golden section search.
+    'strategy': 'linear',
+    'factor': 2,
+    # The search stops once the peak is known to within this many
+    # warehouses
+    'resolution': 1,
+    # Iterations whose NOTPM is within this fraction of the peak so far are
+    # repeated until both have been run 'repeats' times, then compared by
+    # mean NOTPM.
+    'noise': 0.05,
+    'repeats': 3
+}
+
+# Connection sweep settings used with the 'sweep' config value. Each
+# connection count tried runs a whole warehouse search. Connection counts
+# are searched for the highest peak NOTPM the same way the golden section
+# search looks for warehouses, so counts past the point where NOTPM drops
+# are never tried.
+DEFAULT_SWEEP = {
+    # First connection count. Defaults to connections.
+    'connections': None,
+    'factor': 2,
+    # The sweep stops once the best connection count is known to within
+    # this many connections
+    'resolution': 5,
+    # Most connections to try
+    'max_connections': None
+}
+
+
+def split_warehouses(first, last, count):
+    """
+    Splits a range of warehouses into contiguous, disjoint ranges of as
+    even a size as possible, one per driver. The first ranges take one more
+    warehouse when they do not divide evenly.
+
+    :param first: Integer first warehouse
+    :param last: Integer last warehouse
+    :param count: Integer number of drivers
+    :returns: List of (first, last) tuples. Fewer than count when there are
+        fewer warehouses than drivers.
+    """
+    base, extra = divmod(last - first + 1, count)
+    ranges = []
+    for i in xrange(count):
+        size = base + 1 if i < extra else base
+        if size > 0:
+            ranges.append((first, first + size - 1))
+            first += size
+    return ranges
+
+
+def driver_skew(drivers):
+    """
+    Returns how unevenly drivers run together performed. 'tpm' is the
+    spread of NOTPM per warehouse across drivers relative to its mean and
+    'start' is the spread of the times they started in seconds.
+
+    :param drivers: List of Iteration, one per driver
+    :returns: Dictionary
+    """
+    skew = {'tpm': None, 'start': None}
+    rates = [float(d['tpm']) / d['warehouses'] for d in drivers
+             if d.get('tpm') is not None and d['warehouses']]
+    if len(rates) > 1 and sum(rates) > 0:
+        mean = sum(rates) / len(rates)
+        skew['tpm'] = round((max(rates) - min(rates)) / mean, 3)
+    starts = [d['mix'].start for d in drivers
+              if d.get('mix') is not None and d['mix'].start is not None]
+    if len(starts) > 1:
+        skew['start'] = max(starts) - min(starts)
+    return skew
 
 
 class Iteration(dict):
@@ -12,6 +98,7 @@ class Iteration(dict):
     duration_tag = " minute duration"
     unknown_errors_tag = " total unknown errors"
     rollback_transactions_tag = " rollback transactions"
+    run_number_re = re.compile(r'Results can be found in output/(\d+) ')
 
     def __init__(self, output, previous_tpm, warehouses, host, connections):
         self.previous_tpm = previous_tpm
@@ -23,7 +110,8 @@ class Iteration(dict):
             'delta': None,
             'duration': None,
             'unknown_errors': None,
-            'rollback_transactions': None
+            'rollback_transactions': None,
+            'run_number': None
         })
         self._parse(output)
 
@@ -44,10 +132,65 @@ class Iteration(dict):
             elif line.endswith(self.rollback_transactions_tag):
                 self['rollback_transactions'] = line.split()[0]
 
+            else:
+                match = self.run_number_re.search(line)
+                if match is not None:
+                    self['run_number'] = int(match.group(1))
+
+    @classmethod
+    def combine(cls, drivers, previous_tpm, warehouses, host, connections):
+        """
+        Sums the results of dbt2 drivers run at the same time against
+        disjoint warehouse ranges. NOTPM is summed from what each driver
+        reported, before steady state.
+
+        :param drivers: List of Iteration, one per driver
+        :param previous_tpm: Float NOTPM of the previous iteration
+        :param warehouses: Integer last warehouse across drivers
+        :param host: String mysql host
+        :param connections: Integer connections across drivers
+        :returns: Iteration
+        """
+        result = cls([], previous_tpm, warehouses, host, connections)
+        tpms = [d.get('reported_tpm', d.get('tpm')) for d in drivers]
+        if None not in tpms:
+            result['tpm'] = sum(tpms)
+            result['delta'] = result['tpm'] - previous_tpm
+        errors = [d.get('unknown_errors') for d in drivers]
+        if None not in errors:
+            result['unknown_errors'] = sum(int(e) for e in errors)
+        rollbacks = [d.get('rollback_transactions') for d in drivers]
+        if None not in rollbacks:
+            result['rollback_transactions'] = sum(float(r) for r in rollbacks)
+        durations = [d.get('duration') for d in drivers]
+        if None not in durations:
+            result['duration'] = max(float(d) for d in durations)
+        result['drivers'] = drivers
+        return result
+
+    def update_steady(self, steady):
+        """
+        Replaces NOTPM with NOTPM over the steady state window. dbt2 divides
+        by the whole run, ramp up included.
+
+        :param steady: Dictionary from MixLog.steady or None
+        """
+        self['steady'] = steady
+        if steady is not None:
+            self['reported_tpm'] = self['tpm']
+            self['tpm'] = steady['tpm']
+            self['delta'] = self['tpm'] - self.previous_tpm
+
     def __str__(self):
+        steady = self.get('steady')
+        if steady is not None:
+            steady = "%ss" % steady['seconds']
+        else:
+            steady = 'Not found' if 'steady' in self else 'Off'
         return "\n\t".join([
             "Mysql DBT2 Result",
             "New Order Transactions per minute: %s" % self.get('tpm'),
+            "Steady state: %s" % steady,
             "Change over last: %s" % self.get('delta'),
             "Warehouses used: %s " % self.get('warehouses'),
             "Connections: %s" % self.get('connections'),
@@ -63,7 +206,7 @@ class Workload(BaseWorkload):
     """
 
     DEFAULT_STATES = {
-        'dbt2_db': ['dbt2.db'],
+        'dbt2_db': ['dbt2.db', 'dbt2.snapshot'],
         'dbt2': ['dbt2.dbt2']
     }
 
@@ -83,6 +226,8 @@ class Workload(BaseWorkload):
         'database': 'dbt2',
         'warehouses': 10,
         'mysql_path': '/usr/lib/mysql',
+        # Directory run_mysql.sh writes its output under
+        'output_base': '/tmp/dbt2',
 
         # Should be updated via pillar or workload config
         'duration': 180,
@@ -92,9 +237,12 @@ class Workload(BaseWorkload):
         'mindelta': 250
     }
 
+    # dbt2.gendata is added to the first dbt2 instance by get_minions
     DEPLOY_SEQUENCE = [
         {'state': 'dbt2.db',
-         'next': {'state': 'dbt2.dbt2'}},
+         'next': {'state': 'dbt2.dbt2',
+                  'next': {'state': 'dbt2.gendata',
+                           'next': {'state': 'dbt2.snapshot'}}}},
     ]
 
     UNDEPLOY_SEQUENCE = [
@@ -106,18 +254,76 @@ class Workload(BaseWorkload):
         'dbt2': ['dbt2_db']
     }
 
+    FACTS_PILLAR = ['db']
+
     def __init__(self, client, pool, config):
         super(Workload, self).__init__(client, pool, config)
         self._results = []
+        self.search = None
+        # Set when sweeping connections. Warehouse searches are kept by
+        # connection count.
+        self.sweep = None
+        self.searches = {}
+
+    def get_minions(self):
+        super(Workload, self).get_minions()
+
+        # Every driver installs the kit but only the first loads the data.
+        # Loading drops and recreates the database, so drivers loading it
+        # together would race.
+        drivers = [i for i in self.instances
+                   if self.config['dbt2_role'] in i['roles']]
+        if drivers:
+            drivers[0]['states'] = set(drivers[0]['states'])
+            drivers[0]['states'].add('dbt2.gendata')
 
     def deploy(self):
         super(Workload, self).deploy()
 
-        # update config information from pillar
-        minions = self.minions_with_role(self.config['dbt2_role'])
-        pillar = self.client.get_pillar(minions, 'db', {})
-        self.config.update(pillar.values()[0])
+        # update config information from pillar. Both lookups are answered
+        # from the facts collected by deploy.
+        minion = self.minions_with_role(self.config['dbt2_role'])[0]
+        facts = self.client.facts(minion, pillar=self.FACTS_PILLAR)
+        self.config.update(facts[minion.id_]['pillar'].get('db') or {})
         self.config.update({'location': self.location()})
+        self.data_dict['dataset'] = self.dataset_load()
+
+    def dataset_load(self):
+        """
+        Reads how the dbt2 dataset was loaded during deploy. The states
+        append '<kind> <seconds> <snapshot key>' lines to /var/log/dbt2-load
+        on the minion that did the work, the database minion or the driver
+        that loaded the data. kind is cold for generating and loading the
+        data, warm for restoring a snapshot and save for taking one.
+
+        :returns: Dictionary or None when nothing was reported
+        """
+        minions = (self.minions_with_role(self.config['dbt2_db_role']) +
+                   self.minions_with_role(self.config['dbt2_role']))
+        resp = self.client.cmd(minions,
+                               'cmd.run_all',
+                               arg=('cat /var/log/dbt2-load',),
+                               retcodes=set([0, 1]),
+                               timeout=60)
+        report = {}
+        for minion in minions:
+            stdout = (resp.get(minion.id_) or {}).get('stdout') or ''
+            for line in stdout.splitlines():
+                fields = line.split()
+                if len(fields) != 3 or not fields[1].isdigit():
+                    continue
+                kind, seconds, key = fields[0], int(fields[1]), fields[2]
+                report['snapshot'] = key
+                if kind == 'save':
+                    report['snapshot_seconds'] = seconds
+                else:
+                    report['load'] = kind
+                    report['seconds'] = seconds
+        if report:
+            print "%s: %s dataset load of %s took %ss" % (
+                self.name, report.get('load'), report['snapshot'],
+                report.get('seconds'))
+        return report or None
 
     @property
     def name(self):
@@ -139,87 +345,418 @@ class Workload(BaseWorkload):
         ips_dict = self.client.get_ips(minion, interface='private')
         return ips_dict.values()[0][0]
 
-    def command(self, last_warehouse):
+    def command(self, last_warehouse, connections=None, first_warehouse=None):
         """
         Assembles the command that would be run via the command line.
+        :param last_warehouse: Integer last warehouse to use
+        :param connections: Integer connections to open. Defaults to the
+            connections config value.
+        :param first_warehouse: Integer first warehouse to use. Defaults to
+            the first_warehouse config value.
         :returns: List of arguments
         """
         cmd = ("/bin/bash %s --connections %s --time %s --warehouses %s "
                "--database %s --host %s --user %s --password %s "
                "--first-warehouse %s --last-warehouse %s --lib-client-path %s "
-               "--zero-delay")
+               "--output-base %s --zero-delay")
 
         return cmd % (
             os.path.join(self.config['dbt2_path'], 'scripts/run_mysql.sh'),
-            self.config['connections'],
+            connections or self.config['connections'],
             self.config['duration'],
             self.config['warehouses'],
             self.config['database'],
             self.config['location'],
             self.config['user'],
             self.config['password'],
-            self.config['first_warehouse'],
+            first_warehouse or self.config['first_warehouse'],
             last_warehouse,
-            self.config['mysql_path'])
+            self.config['mysql_path'],
+            self.config['output_base'])
 
-    @property
-    def best_run(self):
+    def mix_log(self, runner, result):
+        """
+        Reads the mix.log of an iteration from the runner.
+
+        :param runner: Minion dbt2 ran on
+        :param result: Iteration
+        :returns: MixLog or None if it could not be read
+        """
+        if result.get('run_number') is None:
+            return None
+        path = os.path.join(self.config['output_base'], 'output',
+                            str(result['run_number']), 'driver', 'mix.log')
+        mix = MixLog()
+        try:
+            with RemoteFile(self.client, runner, path) as f:
+                mix.update(f)
+        except (TransferError, BaseJobException) as e:
+            print "Unable to read %s: %s" % (path, e)
+            return None
+        return mix
+
+    def new_search(self):
+        """
+        Returns a search over warehouses configured by the 'search' config
+        value. See DEFAULT_SEARCH.
+
+        :returns: cloud_workloads.common.search.Search
+        """
+        config = dict(DEFAULT_SEARCH)
+        config.update(self.config.get('search') or {})
+        start = int(self.config['last_warehouse'])
+        # Cannot execute command with more than the total number of
+        # warehouses available.
+        limit = int(self.config['warehouses'])
+        if config['strategy'] == 'linear':
+            return LinearSearch(start, 1, limit=limit)
+        if config['strategy'] != 'golden':
+            raise ValueError("Unknown search strategy %s" % config['strategy'])
+        return GoldenSectionSearch(start,
+                                   factor=float(config['factor']),
+                                   resolution=int(config['resolution']),
+                                   noise=float(config['noise']),
+                                   repeats=int(config['repeats']),
+                                   minimum=int(self.config['first_warehouse']),
+                                   limit=limit)
+
+    def new_sweep(self):
+        """
+        Returns a search over connections configured by the 'sweep' config
+        value. See DEFAULT_SWEEP.
+
+        :returns: cloud_workloads.common.search.GoldenSectionSearch
+        """
+        config = dict(DEFAULT_SWEEP)
+        config.update(self.config['sweep'])
+        start = config['connections'] or self.config['connections']
+        limit = config['max_connections']
+        return GoldenSectionSearch(int(start),
+                                   factor=float(config['factor']),
+                                   resolution=int(config['resolution']),
+                                   limit=int(limit) if limit is not None
+                                   else None)
+
+    def score(self, result, search):
+        """
+        Returns what a search is told about an iteration. The linear search
+        is told whether NOTPM gained at least mindelta, the golden section
+        search is told NOTPM.
+
+        :param result: Iteration
+        :param search: Search the iteration was run for
+        :returns: Boolean or number
+        """
+        if isinstance(search, GoldenSectionSearch):
+            return result.get('tpm') or 0
+        return result.get('delta') >= int(self.config['mindelta'])
+
+    def results_for(self, connections):
+        """
+        Returns the iterations run with a connection count.
+
+        :param connections: Integer connections
+        :returns: List of Iteration
+        """
+        return [it for it in self._results
+                if it['connections'] == connections]
+
+    @staticmethod
+    def peak(results, search):
+        """
+        Returns the iteration with the highest NOTPM. For the golden section
+        search it is the iteration at the peak the search confirmed whose
+        NOTPM is closest to the mean of the repeats there.
+
+        :param results: List of Iteration from one warehouse search
+        :param search: The warehouse search
+        :returns: Iteration or None
+        """
         best_run = None
-        if len(self._results) > 0:
+        if isinstance(search, GoldenSectionSearch) and \
+                search.best is not None:
+            peak = search.best
+            mean = search.mean(peak)
+            runs = [it for it in results if it['warehouses'] == peak]
+            best_run = min(runs, key=lambda it: abs((it['tpm'] or 0) - mean))
+        elif len(results) > 0:
             f = lambda it: it['tpm']
-            best_run = max(self._results, key=f)
+            best_run = max(results, key=f)
         return best_run
 
-    def run(self):
-        """Runs the workload"""
-
-        previous_tpm = 0
-        last_warehouse = int(self.config['last_warehouse'])
-        total_warehouses = int(self.config['warehouses'])
+    @property
+    def best_connections(self):
+        """
+        Returns the connection count of the best run.
 
-        runners = self.minions_with_role(self.config['dbt2_role'])
+        :returns: Integer connections
+        """
+        if self.sweep is not None and self.sweep.best is not None:
+            return self.sweep.best
+        return int(self.config['connections'])
 
-        #devnull = open(os.devnull, 'wb')
+    @property
+    def best_run(self):
+        """
+        Returns the peak iteration of the warehouse search at the best
+        connection count. See peak.
 
-        while (True):
-            # Cannot execute command with more than the total number
-            # of warehouses available.
-            if last_warehouse > total_warehouses:
-                break
+        :returns: Iteration or None
+        """
+        connections = self.best_connections
+        return self.peak(self.results_for(connections),
+                         self.searches.get(connections, self.search))
 
-            cmd = self.command(last_warehouse)
+    def run_iteration(self, runners, last_warehouse, connections,
+                      previous_tpm):
+        """
+        Runs dbt2 from every runner at once. Each runner drives its own
+        range of the warehouses with its share of the connections, the
+        runners wait for a common start time and their results are
+        combined.
+
+        :param runners: List of dbt2 minions
+        :param last_warehouse: Integer last warehouse across runners
+        :param connections: Integer connections across runners
+        :param previous_tpm: Float NOTPM of the previous iteration
+        :returns: Iteration or None if a driver failed
+        """
+        ranges = split_warehouses(int(self.config['first_warehouse']),
+                                  last_warehouse, len(runners))
+        base, extra = divmod(connections, len(ranges))
+        plan = [(runner, first, last, max(base + 1 if i < extra else base, 1))
+                for i, (runner, (first, last)) in
+                enumerate(zip(runners, ranges))]
+        barrier = ''
+        if len(plan) > 1:
+            barrier = ("while [ $(date +%%s) -lt %s ]; do sleep 0.1; done; "
+                       % self.start_at(runners[0]))
 
-            kwargs = {
-                'timeout': 2 * int(self.config['duration']),
-                'arg': (cmd,),
-            }
-            exe_resp = self.client.cmd(runners[0].id_, 'cmd.run_all', **kwargs)
-            exe_resp = exe_resp.values()[0]
+        #devnull = open(os.devnull, 'wb')
 
+        futures = []
+        for runner, first, last, count in plan:
+            cmd = barrier + self.command(last, count, first_warehouse=first)
+            futures.append(self.client.cmd_async(
+                runner.id_,
+                'cmd.run_all',
+                timeout=2 * int(self.config['duration']),
+                arg=(cmd,)))
+        exe_resps = [resp.values()[0] for resp in gather(*futures).result()]
+
+        drivers = []
+        for (runner, first, last, count), exe_resp in zip(plan, exe_resps):
             if exe_resp['retcode'] not in [0]:
                 print exe_resp.get('stderr') or "No stderr"
-                break
+                return None
             stdout = cStringIO.StringIO(exe_resp['stdout'])
+            driver = Iteration(stdout, 0, last - first + 1,
+                               self.config['location'], count)
+            driver.update({'minion': runner.id_,
+                           'first_warehouse': first,
+                           'last_warehouse': last})
+            mix = self.mix_log(runner, driver)
+            if mix is not None:
+                driver['mix'] = mix
+                if 'steady' in self.config:
+                    driver.update_steady(mix.steady(self.config['steady']))
+            drivers.append(driver)
+
+        result = Iteration.combine(drivers, previous_tpm, last_warehouse,
+                                   self.config['location'], connections)
+        result['skew'] = driver_skew(drivers)
+        if all(d.get('mix') is not None for d in drivers):
+            mix = MixLog()
+            for driver in drivers:
+                mix.merge(driver['mix'])
+            result['mix'] = mix
+            if 'steady' in self.config:
+                result.update_steady(mix.steady(self.config['steady']))
+        return result
+
+    def search_warehouses(self, runners, connections):
+        """
+        Runs iterations with a connection count until the warehouse search
+        is over.
 
-            result = Iteration(stdout, previous_tpm, last_warehouse,
-                               self.config['location'],
-                               self.config['connections'])
+        :param runners: List of dbt2 minions
+        :param connections: Integer connections
+        :returns: Boolean, False if an iteration failed
+        """
+        previous_tpm = 0
+        search = self.searches[connections] = self.new_search()
+        last_warehouse = search.next()
+
+        while last_warehouse is not None:
+            result = self.run_iteration(runners, last_warehouse, connections,
+                                        previous_tpm)
+            if result is None:
+                return False
             self._results.append(result)
 
             print result
             previous_tpm = result.get('tpm')
-            if result.get('delta') < int(self.config['mindelta']):
-                break
+            search.record(last_warehouse, self.score(result, search))
+            last_warehouse = search.next()
+        return True
+
+    def run(self):
+        """Runs the workload"""
+        runners = self.minions_with_role(self.config['dbt2_role'])
 
-            last_warehouse += 1
+        if not self.config.get('sweep'):
+            connections = int(self.config['connections'])
+            self.search_warehouses(runners, connections)
+            self.search = self.searches[connections]
+        else:
+            self.sweep = self.new_sweep()
+            connections = self.sweep.next()
+            while connections is not None:
+                if not self.search_warehouses(runners, connections):
+                    break
+                peak = self.peak(self.results_for(connections),
+                                 self.searches[connections])
+                self.sweep.record(connections,
+                                  (peak.get('tpm') or 0) if peak else 0)
+                connections = self.sweep.next()
+            self.search = self.searches.get(self.best_connections)
 
         print "\n\nBest run"
         print self.best_run
 
     @property
     def tpm_plot(self):
+        """
+        Returns the mean NOTPM of the iterations at each warehouse count
+        tried with the best connection count, in warehouse order.
+
+        :returns: List of datapoints
+        """
+        by_warehouses = {}
+        for it in self.results_for(self.best_connections):
+            if it.get('tpm') is not None:
+                by_warehouses.setdefault(it['warehouses'], []).append(
+                    it['tpm'])
+        return [{'x': warehouses,
+                 'y': round(sum(tpms) / len(tpms), 2)}
+                for warehouses, tpms in sorted(by_warehouses.iteritems())]
+
+    @property
+    def probe_plot(self):
+        """
+        Returns the NOTPM of every iteration with the best connection count
+        in the order they were run.
+
+        :returns: List of datapoints
+        """
         return [{'x': it.get('warehouses'),
-                'y': it.get('tpm')} for it in self._results]
+                 'y': it.get('tpm')}
+                for it in self.results_for(self.best_connections)]
+
+    def sweep_data(self):
+        """
+        Returns the mean NOTPM of every connections and warehouses pair
+        tried as a heatmap, the best point and the knee point. The knee is
+        the connection count past which more connections add little NOTPM,
+        taken over the peak NOTPM of each connection count.
+
+        :returns: Dictionary
+        """
+        cells = {}
+        for it in self._results:
+            if it.get('tpm') is not None:
+                key = (it['connections'], it['warehouses'])
+                cells.setdefault(key, []).append(it['tpm'])
+        means = dict((key, sum(tpms) / len(tpms))
+                     for key, tpms in cells.iteritems())
+        top = max(means.values() or [0]) or 1
+        warehouses = sorted(set(w for c, w in means))
+        rows = []
+        for connections in sorted(set(c for c, w in means)):
+            row = []
+            for w in warehouses:
+                mean = means.get((connections, w))
+                row.append({'tpm': int(round(mean)),
+                            'shade': round(max(mean, 0) / top, 2)}
+                           if mean is not None else None)
+            rows.append({'connections': connections, 'cells': row})
+
+        peaks = []
+        for connections in sorted(self.searches):
+            run = self.peak(self.results_for(connections),
+                            self.searches[connections])
+            if run is not None and run.get('tpm') is not None:
+                peaks.append((connections, run))
+
+        def point(run):
+            return {'connections': run['connections'],
+                    'warehouses': run['warehouses'],
+                    'tpm': run['tpm']}
+        best_run = self.best_run
+        knee_point = knee([(c, run['tpm']) for c, run in peaks])
+        return {
+            'heatmap': {'warehouses': warehouses, 'rows': rows},
+            'best_point': point(best_run) if best_run else None,
+            'knee_point': point(dict(peaks)[knee_point[0]])
+            if knee_point else None
+        }
+
+    def notpm_data(self, result):
+        """
+        Returns NOTPM and the throughput of every transaction type over the
+        course of an iteration for graphing, with lines marking the steady
+        state window, and response time percentiles by transaction type.
+
+        :param result: Iteration with a mix.log
+        :returns: Dictionary
+        """
+        settings = dict(DEFAULT_STEADY)
+        settings.update(self.config.get('steady') or {})
+        interval = int(settings['interval'])
+        mix = result['mix']
+        plots = []
+        for code, name in TRANSACTIONS.iteritems():
+            plots.append((name, [{'x': p['x'], 'y': p['y'] * 60.0 / interval}
+                                 for p in rebucket(mix.per_second_plot(code),
+                                                   interval)]))
+        plot = dict(plots)[TRANSACTIONS['n']]
+        steady = result.get('steady')
+        markers = []
+        if steady is not None:
+            markers = window_markers((steady['start'], steady['end']), plot)
+        return {
+            'notpm_time_plot': plot,
+            'steady_markers': markers,
+            'transaction_time_plots': plots,
+            'transactions': mix.transactions()
+        }
+
+    @staticmethod
+    def driver_data(result):
+        """
+        Returns each driver's share of an iteration for the view.
+
+        :param result: Iteration
+        :returns: List of dictionaries
+        """
+        drivers = result.get('drivers') or []
+        starts = [d['mix'].start for d in drivers
+                  if d.get('mix') is not None and d['mix'].start is not None]
+        rows = []
+        for driver in drivers:
+            mix = driver.get('mix')
+            rows.append({
+                'minion': driver['minion'],
+                'first_warehouse': driver['first_warehouse'],
+                'last_warehouse': driver['last_warehouse'],
+                'connections': driver['connections'],
+                'tpm': driver.get('tpm'),
+                'unknown_errors': driver.get('unknown_errors'),
+                'rollback_transactions': driver.get('rollback_transactions'),
+                'start_offset': mix.start - min(starts)
+                if mix is not None and mix.start is not None else None
+            })
+        return rows
 
     def data(self):
         """
@@ -228,11 +765,28 @@ class Workload(BaseWorkload):
 
         :returns: String html representation of workload output
         """
-        if not self.data_dict.get('exception_trace'):
-            best_run = self.best_run
-            self.data_dict.update({
-                'tpm': best_run.get('tpm'),
-                'warehouses': best_run.get('warehouses'),
-                'tpm_plot': self.tpm_plot
-            })
+        if self.data_dict.get('exception_trace'):
+            return self.data_dict
+
+        best_run = self.best_run
+        if best_run is None:
+            # A sweep or search where every iteration failed
+            self.data_dict['exception_trace'] = \
+                "No dbt2 iteration finished successfully."
+            return self.data_dict
+
+        self.data_dict.update({
+            'tpm': best_run.get('tpm'),
+            'warehouses': best_run.get('warehouses'),
+            'connections': best_run.get('connections'),
+            'tpm_plot': self.tpm_plot,
+            'probe_plot': self.probe_plot,
+            'steady': best_run.get('steady'),
+            'drivers': self.driver_data(best_run),
+            'skew': best_run.get('skew')
+        })
+        if best_run.get('mix') is not None:
+            self.data_dict.update(self.notpm_data(best_run))
+        if self.sweep is not None:
+            self.data_dict.update(self.sweep_data())
         return self.data_dict
@@ -5,6 +5,7 @@ from cloud_workloads.common.primitives.bench_analyzer import bench_analyzer
 from cloud_workloads.common.primitives.parser import \
     io_parser, cpu_parser, network_parser
 from cloud_workloads.common.workload import Workload as BaseWorkload
+from cloud_workloads.remote.transfer import fetch
 
 
 class Workload(BaseWorkload):
@@ -191,22 +192,26 @@ class Workload(BaseWorkload):
             })
         return kwargss
 
-    def network_commands(self):
+    def network_server_command(self):
         """
-        Assembles the command that would be run via command line.
+        Assembles the iperf server command that would be run via command
+        line.
 
-        :returns: String
+        :returns: Dictionary of salt kwargs
         """
-        target = self.minions_with_role(self.config['target_role'])
-        ips_dict = self.client.get_ips(target, interface='private')
-        remote_host = ips_dict.values()[0][0]
-
-        return {
-            'remote': {'arg': ('iperf -s',),
-                       'timeout': 360},
-            'local':  {'arg': ('iperf -c %s -d -f m' % remote_host,),
-                       'timeout': 360}
-        }
+        return {'arg': ('iperf -s',),
+                'timeout': 360}
+
+    def network_client_command(self, remote_host):
+        """
+        Assembles the iperf client command that would be run via command
+        line.
+
+        :param remote_host: String address of the iperf server
+        :returns: Dictionary of salt kwargs
+        """
+        return {'arg': ('iperf -c %s -d -f m' % remote_host,),
+                'timeout': 360}
 
     def run_cpu(self):
 
@@ -221,13 +226,8 @@ class Workload(BaseWorkload):
         cpu_data = cpu_parser(cStringIO.StringIO(cpu_resp['stdout']))
 
         # Step 2 is to get the contents of that file
-        kwargs = {
-            'arg': ('cat %s' % cpu_data['json_data_file'],)
-        }
-        data_resp = self.client.cmd(runner.id_, 'cmd.run_all', **kwargs)
-        data_resp = data_resp.values()[0]
-
-        cpu_data.update_with_json(data_resp['stdout'])
+        cpu_data.update_with_json(
+            fetch(self.client, runner, cpu_data['json_data_file']))
 
         #take output and analyze it. Basically take weighted averages of
         #results
@@ -297,16 +297,18 @@ class Workload(BaseWorkload):
 
     def run_network(self):
 
-        #Get the local and remote commands that we'll need to run
-        network_kwargss = self.network_commands()
+        # Look up the target's address while the iperf server starts
+        target = self.minions_with_role(self.config['target_role'])
+        ips = self.client.get_ips_async(target, interface='private')
 
         # Start the listening iperf server
-        remote_runner = self.minions_with_role(self.config['target_role'])[0]
-        remote_kwargs = network_kwargss['remote']
+        remote_runner = target[0]
+        remote_kwargs = self.network_server_command()
         self.client.job(remote_runner.id_, 'cmd.run_all', **remote_kwargs)
 
         runner = self.minions_with_role(self.config['runner_role'])[0]
-        runner_kwargs = network_kwargss['local']
+        remote_host = ips.result().values()[0][0]
+        runner_kwargs = self.network_client_command(remote_host)
         runner_resp = self.client.cmd(runner.id_,
                                       'cmd.run_all',
                                       **runner_kwargs)
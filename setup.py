@@ -27,6 +27,7 @@ setup(
     scripts=[
         'bin/cloud-workloads-configure',
         'bin/cloud-workloads-runner',
+        'bin/cloud-workloads-stats',
         'bin/cloud-workloads-minion-installer'
     ]
 )
@@ -0,0 +1,37 @@
+"""
+Execution module helpers used by cloud-workloads.
+=================================================
+"""
+
+import hashlib
+import json
+
+
+def setval_by_minion(key, values):
+    """
+    Sets a grain to the value for this minion found in a dictionary keyed by
+    minion id. Lets a single publish set a different value on every minion.
+
+    CLI Example:
+
+    .. code-block:: bash
+
+        salt '*' workloads.setval_by_minion roles '{"minion1": ["web"]}'
+
+    """
+    return __salt__['grains.setval'](key, values[__grains__['id']])
+
+
+def grains_hash():
+    """
+    Returns a hash of this minion's grains. Lets the runner check a cached
+    copy of the grains without transferring them.
+
+    CLI Example:
+
+    .. code-block:: bash
+
+        salt '*' workloads.grains_hash
+
+    """
+    return hashlib.sha1(json.dumps(__grains__, sort_keys=True)).hexdigest()
@@ -0,0 +1,96 @@
+#!/bin/bash
+{% from "dbt2/db.jinja" import dbt2 with context %}
+#
+# Saves and restores the dbt2 dataset as a logical dump of the dbt2
+# database, keyed by warehouses and schema version. Only the dbt2 tables
+# are kept, so the rest of the server, its system tablespace and its redo
+# logs are never touched. Users and stored procedures are created on every
+# deploy.
+#
+# A restore loads into a scratch database first and only moves the tables
+# over once the whole dump has loaded.
+#
+# Load times are appended to /var/log/dbt2-load for the workload to report.
+
+usage() {
+  echo ''
+  echo 'usage: dbt2_snapshot.sh save|restore'
+  echo ''
+  echo 'save     Snapshots a fully loaded dataset unless a snapshot exists'
+  echo 'restore  Replaces the dataset with the snapshot if there is one'
+  echo ''
+}
+
+SNAPSHOT={{ dbt2.snapshot }}
+DATABASE={{ dbt2.database }}
+SCRATCH={{ dbt2.database }}_restore
+WAREHOUSES={{ dbt2.warehouses }}
+REPORT=/var/log/dbt2-load
+# Maintenance account, since the dbt2 user may not exist yet on restore
+CREDENTIALS=--defaults-file=/etc/mysql/debian.cnf
+
+if command -v pigz > /dev/null 2>&1; then
+  COMPRESS=pigz
+else
+  COMPRESS=gzip
+fi
+
+loaded_warehouses() {
+  mysql $CREDENTIALS -N $DATABASE -e 'SELECT COUNT(*) FROM warehouse' \
+    2> /dev/null
+}
+
+case "$1" in
+  save)
+    # Only complete datasets are saved
+    if [ -f $SNAPSHOT ] || [ "$(loaded_warehouses)" != "$WAREHOUSES" ]; then
+      exit 0
+    fi
+    START=$(date +%s)
+    mkdir -p $(dirname $SNAPSHOT)
+    set -o pipefail
+    mysqldump $CREDENTIALS --single-transaction --skip-triggers $DATABASE \
+      | $COMPRESS > $SNAPSHOT.tmp
+    STATUS=$?
+    if [ $STATUS -ne 0 ]; then
+      rm -f $SNAPSHOT.tmp
+      exit $STATUS
+    fi
+    mv $SNAPSHOT.tmp $SNAPSHOT
+    echo "save $(( $(date +%s) - START )) {{ dbt2.snapshot_key }}" >> $REPORT
+    ;;
+  restore)
+    if [ ! -f $SNAPSHOT ]; then
+      exit 0
+    fi
+    START=$(date +%s)
+    set -o pipefail
+    mysql $CREDENTIALS -e "DROP DATABASE IF EXISTS $SCRATCH;
+                           CREATE DATABASE $SCRATCH" || exit 1
+    $COMPRESS -dc $SNAPSHOT | mysql $CREDENTIALS $SCRATCH
+    STATUS=$?
+    if [ $STATUS -ne 0 ]; then
+      # A broken snapshot is dropped so the next deploy loads from scratch
+      echo "Unable to restore $SNAPSHOT, removing it"
+      mysql $CREDENTIALS -e "DROP DATABASE IF EXISTS $SCRATCH"
+      rm -f $SNAPSHOT
+      exit $STATUS
+    fi
+    # Swap the loaded tables in
+    TABLES=$(mysql $CREDENTIALS -N -e "SELECT table_name FROM
+      information_schema.tables WHERE table_schema = '$SCRATCH'")
+    RENAMES=""
+    for TABLE in $TABLES; do
+      RENAMES="$RENAMES${RENAMES:+, }$SCRATCH.$TABLE TO $DATABASE.$TABLE"
+    done
+    mysql $CREDENTIALS -e "DROP DATABASE IF EXISTS $DATABASE;
+                           CREATE DATABASE $DATABASE;
+                           RENAME TABLE $RENAMES;
+                           DROP DATABASE $SCRATCH" || exit 1
+    echo "warm $(( $(date +%s) - START )) {{ dbt2.snapshot_key }}" >> $REPORT
+    ;;
+  *)
+    usage
+    exit 1
+    ;;
+esac